@@ -1,6 +1,20 @@
 import os
 import json
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
+
+from data_process.anomaly_detection import DEFAULT_DETECTORS, detect_batch
+from data_process.columnar_store import ColumnarStore, micros_to_timestamp
+from data_process.instrumentation import instrumented, metrics
+from data_process.readings import read_batch
+from data_process.rollups import open_rollups
+from data_process.sqlite_store import SqliteStore
+from data_process.storage import open_store
+from analytics.streaming import analyze_data_streaming
+
+try:
+    import numpy as np
+except ImportError:  # Fall back to the pure-Python analytics path
+    np = None
 
 
 def calculate_average(values: List[float]) -> float:
@@ -46,16 +60,178 @@ def detect_anomalies(values: List[float], threshold: float = 0.2) -> List[Dict]:
     
     return anomalies
 
-def analyze_data(filename: str = 'machine_data.json') -> Dict:
+def analyze_values(values: List[float], threshold: float = 0.2) -> Dict:
+    """
+    Compute the statistics of one measurement using plain Python.
+    
+    Args:
+        values (List[float]): Machine values
+        threshold (float): Percentage deviation to consider an anomaly
+    
+    Returns:
+        Dict: Average, min, max, number of readings and anomalies
+    """
+    return {
+        'average': calculate_average(values),
+        'min': min(values),
+        'max': max(values),
+        'total_readings': len(values),
+        'anomalies': detect_anomalies(values, threshold)
+    }
+
+def analyze_values_vectorized(values: List[float], threshold: float = 0.2) -> Dict:
+    """
+    Compute the statistics of one measurement with NumPy.
+    
+    Loads the values into an array once and computes every statistic and the
+    anomaly mask in vectorized passes. The result is identical to
+    ``analyze_values``: the sum is accumulated sequentially like ``sum()``,
+    min/max and anomaly values are taken from the original list, and only
+    the flagged deviations are rounded in Python.
+    
+    Args:
+        values (List[float]): Machine values, as a list, typed array or NumPy array
+        threshold (float): Percentage deviation to consider an anomaly
+    
+    Returns:
+        Dict: Average, min, max, number of readings and anomalies
+    """
+    array = np.asarray(values, dtype=np.float64)
+    count = len(array)
+    average = float(np.cumsum(array)[-1]) / count
+    
+    anomalies = []
+    if count >= 2:
+        if average == 0:
+            raise ZeroDivisionError("float division by zero")
+        deviation = np.abs(array - average) / average
+        indices = np.flatnonzero(deviation > threshold)
+        anomalies = [
+            {
+                'index': i,
+                'value': _value_at(values, i),
+                'deviation_percentage': round(d * 100, 2)
+            }
+            for i, d in zip(indices.tolist(), deviation[indices].tolist())
+        ]
+    
+    return {
+        'average': round(average, 2),
+        'min': _value_at(values, int(np.argmin(array))),
+        'max': _value_at(values, int(np.argmax(array))),
+        'total_readings': count,
+        'anomalies': anomalies
+    }
+
+def _value_at(values, index: int):
+    value = values[index]
+    # NumPy scalars become plain Python numbers
+    return value.item() if hasattr(value, 'item') else value
+
+def analyze_columns(store: ColumnarStore, machine_id: Optional[str] = None,
+                    start: Optional[str] = None, end: Optional[str] = None) -> Dict:
+    """
+    Analyze a columnar store straight from its memory-mapped columns.
+    
+    Args:
+        store (ColumnarStore): Store to analyze
+        machine_id (str): Only analyze readings of this machine
+        start (str): ISO timestamp of the first reading to analyze
+        end (str): ISO timestamp to stop before
+    
+    Returns:
+        Dict: Comprehensive analysis results, as returned by ``analyze_data``
+    """
+    columns = store.columns(*store.row_range(start, end))
+    if machine_id is not None:
+        mask = store.machine_mask(columns, machine_id)
+        columns = {name: column[mask] for name, column in columns.items()}
+    
+    if len(columns['timestamp']) == 0:
+        raise ValueError("Empty dataset provided")
+    
+    return {
+        'temperature': analyze_values_vectorized(columns['temperature']),
+        'speed': analyze_values_vectorized(columns['speed']),
+        'period': {
+            'start': micros_to_timestamp(columns['timestamp'][0]),
+            'end': micros_to_timestamp(columns['timestamp'][-1])
+        }
+    }
+
+def analyze_sqlite(store: SqliteStore, machine_id: Optional[str] = None,
+                   start: Optional[str] = None, end: Optional[str] = None, threshold: float = 0.2) -> Dict:
+    """
+    Analyze an SQLite store with the aggregation done inside SQLite.
+    
+    Sums, min and max come from one aggregate query, and the anomaly filter
+    runs as a query too, so only the flagged readings are loaded. Integer
+    readings are stored and summed exactly, so they give the same result
+    as ``analyze_values``. Float readings are summed in SQLite's own order,
+    so their average can differ in the last bits, which may change the
+    rounded average or a reading right at the threshold.
+    
+    Args:
+        store (SqliteStore): Store to analyze
+        machine_id (str): Only analyze readings of this machine
+        start (str): ISO timestamp of the first reading to analyze
+        end (str): ISO timestamp to stop before
+        threshold (float): Percentage deviation to consider an anomaly
+    
+    Returns:
+        Dict: Comprehensive analysis results, as returned by ``analyze_data``
+    """
+    aggregates = store.aggregate(start, end, machine_id)
+    if aggregates is None:
+        raise ValueError("Empty dataset provided")
+    
+    count = aggregates['count']
+    analysis = {}
+    for field in ('temperature', 'speed'):
+        average = aggregates[field]['sum'] / count
+        anomalies = []
+        if count >= 2:
+            if average == 0:
+                raise ZeroDivisionError("float division by zero")
+            anomalies = [
+                {
+                    'index': index,
+                    'value': value,
+                    'deviation_percentage': round(abs(value - average) / average * 100, 2)
+                }
+                for index, value in store.find_deviations(field, average, threshold, start, end, machine_id)
+            ]
+        analysis[field] = {
+            'average': round(average, 2),
+            'min': aggregates[field]['min'],
+            'max': aggregates[field]['max'],
+            'total_readings': count,
+            'anomalies': anomalies
+        }
+    analysis['period'] = {'start': aggregates['first'], 'end': aggregates['last']}
+    return analysis
+
+@instrumented
+def analyze_data(filename: str = 'machine_data.json', machine_id: Optional[str] = None,
+                 streaming: bool = False, start: Optional[str] = None, end: Optional[str] = None) -> Dict:
     """
     Perform comprehensive data analysis on machine values.
     
     Args:
-        filename (str): Path to the JSON file containing machine data
+        filename (str): Name of the data file (segmented log, legacy JSON
+            array, ``.columns`` columnar store or SQLite database)
+        machine_id (str): Only analyze readings of this machine
+        streaming (bool): Read the data in chunks with bounded memory instead
+            of loading it all (see ``analyze_data_streaming``)
+        start (str): ISO timestamp of the first reading to analyze
+        end (str): ISO timestamp to stop before; only readings in
+            ``[start, end)`` are read from storage
     
     Returns:
         Dict: Comprehensive analysis results
     """
+    if streaming:
+        return analyze_data_streaming(filename, machine_id, start=start, end=end)
 
     # Path to the 'data' folder at the same level as our 'current' folder
     base_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -63,46 +239,110 @@ def analyze_data(filename: str = 'machine_data.json') -> Dict:
     filepath = os.path.join(data_folder, filename)
 
     try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        store = open_store(filepath)
+        if isinstance(store, ColumnarStore):
+            return analyze_columns(store, machine_id, start, end)
+        if isinstance(store, SqliteStore):
+            return analyze_sqlite(store, machine_id, start, end)
+        # Packed into typed columns as they are read, no reading dicts are kept; only the
+        # measurements and the first and last timestamps are needed, so none is parsed
+        batch = read_batch(store, start, end, machine_id, timestamps=False)
     except (FileNotFoundError, json.JSONDecodeError):
         print(f"Error reading data from {filename}")
+        metrics.inc('read_errors_total', function='analyze_data')
         return {}
     
-    if not data:
+    if not len(batch):
         raise ValueError("Empty dataset provided")
     
-    # Temperature and speed values
-    temperature_values = [entry['temperature'] for entry in data]
-    speed_values = [entry['speed'] for entry in data]
-    
-    # Determine period (start and end)
-    period_start = data[0]['timestamp'] if data else None
-    period_end = data[-1]['timestamp'] if data else None
+    analyze = analyze_values_vectorized if np is not None else analyze_values
     
     analysis = {
-        'temperature': {
-            'average': calculate_average(temperature_values),
-            'min': min(temperature_values),
-            'max': max(temperature_values),
-            'total_readings': len(temperature_values),
-            'anomalies': detect_anomalies(temperature_values)
-        },
-        'speed': {
-            'average': calculate_average(speed_values),
-            'min': min(speed_values),
-            'max': max(speed_values),
-            'total_readings': len(speed_values),
-            'anomalies': detect_anomalies(speed_values)
-        },
+        'temperature': analyze(batch.temperature),
+        'speed': analyze(batch.speed),
         'period': {
-            'start': period_start,
-            'end': period_end
+            'start': batch.first,
+            'end': batch.last
         }
     }
     
     return analysis
 
+@instrumented
+def summarize_data(filename: str = 'machine_data.json', start: Optional[str] = None, end: Optional[str] = None,
+                   machine_id: Optional[str] = None) -> Dict:
+    """
+    Summarize a time range from the pre-aggregated 1m/1h/1d rollups.
+    
+    The range is covered with the coarsest complete buckets available, so
+    long ranges read a handful of buckets instead of every reading. For
+    readings stored in time order, the averages, min, max and counts match
+    ``analyze_data`` over the same range. A reading stored after a later one
+    is left out of the rollups if its bucket was already closed, so it is
+    missing here but not from ``analyze_data``. Anomalies need the individual
+    readings and are not included, but the status histogram is.
+    
+    Args:
+        filename (str): Name of the data file
+        start (str): ISO timestamp of the first reading to include
+        end (str): ISO timestamp to stop before
+        machine_id (str): Only summarize readings of this machine
+    
+    Returns:
+        Dict: Average, min, max and total readings per measurement, status
+        counts and the period covered
+    """
+    # Path to the 'data' folder at the same level as our 'current' folder
+    base_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    filepath = os.path.join(base_directory, 'data', filename)
+    
+    try:
+        summary = open_rollups(filepath).summarize(open_store(filepath), start, end, machine_id)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"Error reading data from {filename}")
+        metrics.inc('read_errors_total', function='summarize_data')
+        return {}
+    
+    if summary is None:
+        raise ValueError("Empty dataset provided")
+    
+    return summary
+
+@instrumented
+def scan_anomalies(filename: str = 'machine_data.json', machine_id: Optional[str] = None,
+                   start: Optional[str] = None, end: Optional[str] = None,
+                   detectors: Tuple[Tuple[str, Dict], ...] = DEFAULT_DETECTORS) -> List[Dict]:
+    """
+    Run the streaming anomaly detectors over stored history in vectorized passes.
+    
+    Each machine's series is scored as one array, with the same detections
+    the live detectors produce when they see the same readings from the
+    start. Detectors start empty at ``start``, so they need their window of
+    readings before flagging anything.
+    
+    Args:
+        filename (str): Name of the data file
+        machine_id (str): Only scan readings of this machine
+        start (str): ISO timestamp of the first reading to scan
+        end (str): ISO timestamp to stop before
+        detectors (Tuple[Tuple[str, Dict], ...]): ``(name, params)`` of the detectors to run
+    
+    Returns:
+        List[Dict]: Detections in reading order
+    """
+    # Path to the 'data' folder at the same level as our 'current' folder
+    base_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    filepath = os.path.join(base_directory, 'data', filename)
+    
+    try:
+        readings = open_store(filepath).read_range(start, end, machine_id)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"Error reading data from {filename}")
+        metrics.inc('read_errors_total', function='scan_anomalies')
+        return []
+    
+    return detect_batch(readings, detectors)
+
 if __name__ == "__main__":
     try:
         results = analyze_data()
@@ -0,0 +1,276 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from data_process.instrumentation import instrumented, metrics
+from data_process.readings import ReadingBatch
+from data_process.storage import SegmentedLog, data_file_path, open_store
+from analytics.data_analytics import analyze_data
+from analytics.streaming import RunningStats
+
+FIELDS = ('temperature', 'speed')
+
+# Partial aggregates are keyed by machine_id when grouping, else by this key
+_ALL = None
+
+
+class PartialAnalysis:
+    """
+    Mergeable aggregates of the readings of one part of a data file.
+
+    Holds a ``RunningStats`` per field and the first and last timestamps, so
+    partials of consecutive parts combine into the partial of the whole.
+    """
+
+    def __init__(self):
+        self.stats = {field: RunningStats() for field in FIELDS}
+        self.first = None
+        self.last = None
+
+    @property
+    def count(self) -> int:
+        return self.stats[FIELDS[0]].count
+
+    def update(self, readings: List[Dict]) -> None:
+        """
+        Add consecutive readings.
+
+        Args:
+            readings (List[Dict]): Readings in time order
+        """
+        if not readings:
+            return
+        for field, field_stats in self.stats.items():
+            field_stats.update(reading[field] for reading in readings)
+        if self.first is None:
+            self.first = readings[0]['timestamp']
+        self.last = readings[-1]['timestamp']
+
+    def update_batch(self, batch: ReadingBatch) -> None:
+        """
+        Add consecutive readings held in a compact batch.
+
+        Args:
+            batch (ReadingBatch): Readings in time order
+        """
+        if not len(batch):
+            return
+        for field, field_stats in self.stats.items():
+            field_stats.update(getattr(batch, field))
+        if self.first is None:
+            self.first = batch.first
+        self.last = batch.last
+
+    def merge(self, other: 'PartialAnalysis') -> 'PartialAnalysis':
+        """
+        Combine with the partial of the readings that follow this part.
+
+        Args:
+            other (PartialAnalysis): Partial of a later part
+
+        Returns:
+            PartialAnalysis: This instance, now covering both parts
+        """
+        for field, field_stats in self.stats.items():
+            field_stats.merge(other.stats[field])
+        if self.first is None:
+            self.first = other.first
+        if other.last is not None:
+            self.last = other.last
+        return self
+
+
+def _segment_partials(directory: str, segment: int, start: Optional[str], end: Optional[str],
+                      machine_id: Optional[str], by_machine: bool) -> Dict[Optional[str], PartialAnalysis]:
+    groups: Dict[Optional[str], ReadingBatch] = {}
+    for reading in SegmentedLog(directory).iter_segment(segment, start, end, machine_id):
+        key = reading.get('machine_id') if by_machine else _ALL
+        batch = groups.get(key)
+        if batch is None:
+            batch = groups[key] = ReadingBatch(timestamps=False)
+        batch.append(reading)
+
+    partials = {}
+    for key, batch in groups.items():
+        partials[key] = PartialAnalysis()
+        partials[key].update_batch(batch)
+    return partials
+
+
+def _segment_anomalies(directory: str, segment: int, start: Optional[str], end: Optional[str],
+                       machine_id: Optional[str], by_machine: bool, averages: Dict[Optional[str], Dict[str, float]],
+                       limits: Dict[Optional[str], int], threshold: float) -> Dict[Optional[str], Dict[str, List]]:
+    anomalies: Dict[Optional[str], Dict[str, List]] = {}
+    indices: Dict[Optional[str], int] = {}
+    for reading in SegmentedLog(directory).iter_segment(segment, start, end, machine_id):
+        key = reading.get('machine_id') if by_machine else _ALL
+        index = indices.get(key, 0)
+        indices[key] = index + 1
+        # Only the readings counted in the first pass are judged, like analyze_data_streaming
+        if key not in averages or index >= limits.get(key, 0):
+            continue
+        for field, average in averages[key].items():
+            value = reading[field]
+            deviation = abs(value - average) / average
+            if deviation > threshold:
+                anomalies.setdefault(key, {}).setdefault(field, []).append({
+                    'index': index,
+                    'value': value,
+                    'deviation_percentage': round(deviation * 100, 2)
+                })
+    return anomalies
+
+
+def _run(executor: Optional[ProcessPoolExecutor], function, tasks: List[Tuple]) -> List:
+    if executor is None:
+        return [function(*task) for task in tasks]
+    return list(executor.map(function, *zip(*tasks)))
+
+
+def _analyze_parallel(filename: str, machine_id: Optional[str], start: Optional[str], end: Optional[str],
+                      by_machine: bool, workers: Optional[int], threshold: float) -> Optional[Dict]:
+    store = open_store(data_file_path(filename))
+    if not isinstance(store, SegmentedLog):
+        return None
+    segments = store.range_segments(start, end)
+    workers = min(workers or os.cpu_count() or 1, max(len(segments), 1))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    try:
+        # First pass: per-segment partials, merged in segment order
+        tasks = [(store.directory, segment, start, end, machine_id, by_machine) for segment in segments]
+        merged: Dict[Optional[str], PartialAnalysis] = {}
+        offsets: List[Dict[Optional[str], int]] = []
+        counts: List[Dict[Optional[str], int]] = []
+        for partials in _run(executor, _segment_partials, tasks):
+            offsets.append({key: partial.count for key, partial in merged.items()})
+            counts.append({key: partial.count for key, partial in partials.items()})
+            for key, partial in partials.items():
+                merged.setdefault(key, PartialAnalysis()).merge(partial)
+
+        averages = {
+            key: {field: stats.mean for field, stats in partial.stats.items()}
+            for key, partial in merged.items() if partial.count >= 2
+        }
+        found = {key: {field: [] for field in FIELDS} for key in merged}
+        if averages:
+            # Second pass: flag anomalies against the merged averages
+            tasks = [task + (averages, limits, threshold) for task, limits in zip(tasks, counts)]
+            for segment_offsets, anomalies in zip(offsets, _run(executor, _segment_anomalies, tasks)):
+                for key, fields in anomalies.items():
+                    offset = segment_offsets.get(key, 0)
+                    for field, entries in fields.items():
+                        for entry in entries:
+                            entry['index'] += offset
+                        found[key][field].extend(entries)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return {key: _analysis(partial, found[key]) for key, partial in merged.items()}
+
+
+def _analysis(partial: PartialAnalysis, anomalies: Dict[str, List]) -> Dict:
+    analysis = {
+        field: {
+            'average': round(stats.mean, 2),
+            'min': stats.minimum,
+            'max': stats.maximum,
+            'total_readings': stats.count,
+            'anomalies': anomalies[field]
+        }
+        for field, stats in partial.stats.items()
+    }
+    analysis['period'] = {'start': partial.first, 'end': partial.last}
+    return analysis
+
+
+@instrumented
+def analyze_data_parallel(filename: str = 'machine_data.json', machine_id: Optional[str] = None,
+                          start: Optional[str] = None, end: Optional[str] = None,
+                          workers: Optional[int] = None, threshold: float = 0.2) -> Dict:
+    """
+    Analyze a data file on several cores, one log segment per task.
+
+    Worker processes compute mergeable partial aggregates (count, sum, sum
+    of squares, min, max) for their segments, which are merged in segment
+    order into the same result ``analyze_data`` returns. Only those partials
+    travel back to this process; a second parallel pass over the segments
+    then flags anomalies against the merged averages. Averages are summed
+    per segment, so they can differ from ``analyze_data`` in the last bits.
+    Columnar and legacy JSON files are analyzed by ``analyze_data`` itself.
+
+    Args:
+        filename (str): Name of the data file
+        machine_id (str): Only analyze readings of this machine
+        start (str): ISO timestamp of the first reading to analyze
+        end (str): ISO timestamp to stop before
+        workers (int): Number of worker processes, defaults to the number of
+            CPUs; 1 analyzes in this process
+        threshold (float): Percentage deviation to consider an anomaly
+
+    Returns:
+        Dict: Comprehensive analysis results
+    """
+    try:
+        results = _analyze_parallel(filename, machine_id, start, end, False, workers, threshold)
+    except FileNotFoundError:
+        print(f"Error reading data from {filename}")
+        metrics.inc('read_errors_total', function='analyze_data_parallel')
+        return {}
+    if results is None:
+        return analyze_data(filename, machine_id, start=start, end=end)
+    if _ALL not in results:
+        raise ValueError("Empty dataset provided")
+    return results[_ALL]
+
+
+@instrumented
+def analyze_machines_parallel(filename: str = 'machine_data.json', start: Optional[str] = None,
+                              end: Optional[str] = None, workers: Optional[int] = None,
+                              threshold: float = 0.2) -> Dict[str, Dict]:
+    """
+    Analyze every machine of a data file on several cores in one pass over the file.
+
+    Work is still split by segment; each worker keeps partial aggregates
+    per machine_id, so the file is read once however many machines it holds.
+    Each machine's result matches ``analyze_data(machine_id=...)``.
+
+    Args:
+        filename (str): Name of the data file
+        start (str): ISO timestamp of the first reading to analyze
+        end (str): ISO timestamp to stop before
+        workers (int): Number of worker processes, defaults to the number of CPUs
+        threshold (float): Percentage deviation to consider an anomaly
+
+    Returns:
+        Dict[str, Dict]: Analysis results by machine_id; readings without a
+        machine_id are listed under ``None``
+    """
+    try:
+        results = _analyze_parallel(filename, None, start, end, True, workers, threshold)
+    except FileNotFoundError:
+        print(f"Error reading data from {filename}")
+        metrics.inc('read_errors_total', function='analyze_machines_parallel')
+        return {}
+    if results is None:
+        raise ValueError("Per-machine parallel analysis needs a segmented log")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze a data file on every core")
+    parser.add_argument('filename', nargs='?', default='machine_data.json', help="Name of the data file")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes")
+    parser.add_argument('--by-machine', action='store_true', help="Report every machine separately")
+    args = parser.parse_args()
+    try:
+        if args.by_machine:
+            results = analyze_machines_parallel(args.filename, workers=args.workers)
+        else:
+            results = analyze_data_parallel(args.filename, workers=args.workers)
+        print(json.dumps(results, indent=2))
+    except ValueError as e:
+        print(f"Error: {e}")
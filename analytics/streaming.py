@@ -0,0 +1,215 @@
+import json
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from data_process.storage import ReadingStore, SegmentedLog, data_file_path, open_store
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class RunningStats:
+    """
+    Mergeable single-pass statistics of a stream of values.
+
+    Values are summed sequentially, in the order they arrive, and min/max
+    keep the first extreme seen, so the results match ``sum()``, ``min()``
+    and ``max()`` over the same values in the same order.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.sum_squares = 0
+        self.minimum = None
+        self.maximum = None
+
+    def update(self, values: Iterable[float]) -> None:
+        """
+        Add a chunk of values.
+
+        Args:
+            values (Iterable[float]): Values in stream order
+        """
+        for value in values:
+            self.count += 1
+            self.total += value
+            self.sum_squares += value * value
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """
+        Combine with the statistics of the values that follow this stream.
+
+        Args:
+            other (RunningStats): Statistics of a later part of the stream
+
+        Returns:
+            RunningStats: This instance, now covering both parts
+        """
+        self.count += other.count
+        self.total += other.total
+        self.sum_squares += other.sum_squares
+        if other.minimum is not None and (self.minimum is None or other.minimum < self.minimum):
+            self.minimum = other.minimum
+        if other.maximum is not None and (self.maximum is None or other.maximum > self.maximum):
+            self.maximum = other.maximum
+        return self
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the values seen so far."""
+        if not self.count:
+            return 0.0
+        return max(self.sum_squares / self.count - self.mean ** 2, 0.0)
+
+
+def iter_chunks(store: ReadingStore, chunk_size: int = DEFAULT_CHUNK_SIZE, machine_id: Optional[str] = None,
+                start: Optional[str] = None, end: Optional[str] = None) -> Iterator[List[Dict]]:
+    """
+    Stream the readings of a store in lists of at most ``chunk_size``.
+
+    Args:
+        store (ReadingStore): Store to read
+        chunk_size (int): Maximum readings per chunk
+        machine_id (str): Only yield readings of this machine
+        start (str): ISO timestamp of the first reading to yield
+        end (str): ISO timestamp to stop before
+
+    Yields:
+        List[Dict]: Consecutive chunks of readings, oldest first
+    """
+    yield from _chunked(_records(store, machine_id, start, end), chunk_size)
+
+
+def _records(store: ReadingStore, machine_id: Optional[str], start: Optional[str],
+             end: Optional[str]) -> Iterator[Dict]:
+    if start is None and end is None:
+        return (
+            record for record in store.iter_records()
+            if machine_id is None or record.get('machine_id') == machine_id
+        )
+    return store.iter_range(start, end, machine_id)
+
+
+def _chunked(records: Iterable[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parts(store: ReadingStore, machine_id: Optional[str], start: Optional[str],
+           end: Optional[str]) -> List[Callable[[], Iterator[Dict]]]:
+    if isinstance(store, SegmentedLog):
+        # Pinned once, so both passes read the same segments whatever retention does in between
+        return [partial(store.iter_segment, segment, start, end, machine_id)
+                for segment in store.range_segments(start, end)]
+    return [partial(_records, store, machine_id, start, end)]
+
+
+def _anomalies_pass(parts: List[Callable[[], Iterator[Dict]]], counts: List[int], averages: Dict[str, float],
+                    threshold: float, chunk_size: int) -> Dict[str, List[Dict]]:
+    anomalies = {field: [] for field in averages}
+    offset = 0
+    for part, limit in zip(parts, counts):
+        index = 0
+        for chunk in _chunked(part(), chunk_size):
+            # Ignore readings appended after the first pass
+            for entry in chunk[:limit - index]:
+                for field, average in averages.items():
+                    value = entry[field]
+                    deviation = abs(value - average) / average
+                    if deviation > threshold:
+                        anomalies[field].append({
+                            'index': offset + index,
+                            'value': value,
+                            'deviation_percentage': round(deviation * 100, 2)
+                        })
+                index += 1
+            if index >= limit:
+                break
+        # Indices stay those of the first pass even if a segment was removed since
+        offset += limit
+    return anomalies
+
+
+def analyze_data_streaming(filename: str = 'machine_data.json', machine_id: Optional[str] = None,
+                           threshold: float = 0.2, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           start: Optional[str] = None, end: Optional[str] = None) -> Dict:
+    """
+    Analyze machine data in chunks with memory bounded by ``chunk_size``.
+
+    A first pass computes averages, min, max, counts and the period; a second
+    pass flags anomalies against the final averages. Both passes read the
+    log segments listed at the start, so readings appended or removed by
+    retention in between do not shift the indices. The result is the same
+    as ``analyze_data`` for the same file.
+
+    Args:
+        filename (str): Name of the data file
+        machine_id (str): Only analyze readings of this machine
+        threshold (float): Percentage deviation to consider an anomaly
+        chunk_size (int): Number of readings held in memory at a time
+        start (str): ISO timestamp of the first reading to analyze
+        end (str): ISO timestamp to stop before
+
+    Returns:
+        Dict: Comprehensive analysis results
+    """
+    store = open_store(data_file_path(filename))
+    temperature = RunningStats()
+    speed = RunningStats()
+    period_start = period_end = None
+    stats = {'temperature': temperature, 'speed': speed}
+    anomalies = {field: [] for field in stats}
+
+    try:
+        parts = _parts(store, machine_id, start, end)
+        counts = []
+        for part in parts:
+            count = temperature.count
+            for chunk in _chunked(part(), chunk_size):
+                if period_start is None:
+                    period_start = chunk[0]['timestamp']
+                period_end = chunk[-1]['timestamp']
+                temperature.update(entry['temperature'] for entry in chunk)
+                speed.update(entry['speed'] for entry in chunk)
+            counts.append(temperature.count - count)
+
+        if temperature.count >= 2:
+            averages = {field: field_stats.mean for field, field_stats in stats.items()}
+            anomalies = _anomalies_pass(parts, counts, averages, threshold, chunk_size)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"Error reading data from {filename}")
+        return {}
+
+    if not temperature.count:
+        raise ValueError("Empty dataset provided")
+
+    analysis = {
+        field: {
+            'average': round(field_stats.mean, 2),
+            'min': field_stats.minimum,
+            'max': field_stats.maximum,
+            'total_readings': field_stats.count,
+            'anomalies': anomalies[field]
+        }
+        for field, field_stats in stats.items()
+    }
+    analysis['period'] = {
+        'start': period_start,
+        'end': period_end
+    }
+
+    return analysis
@@ -0,0 +1,166 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from data_process.status_events import open_status_events
+from data_process.storage import data_file_path, timestamp_to_micros
+
+MACHINE_JOB_STATES = ('RUNNING',)
+API_JOB_STATES = ('STARTED', 'IN_PROGRESS', 'PAUSED')
+
+_MICROS_PER_SECOND = 1000000
+
+
+def utilization(events, start: str, end: Optional[str] = None, machine_id: Optional[str] = None,
+                job_states: Iterable[str] = MACHINE_JOB_STATES) -> Dict:
+    """
+    Compute time in each state, transitions and job durations over a time range.
+
+    Works on run-length status events, where each event carries the status
+    it replaces (``previous``) and when that status was entered (``since``).
+    Only the events inside the range are read, plus the first later event of
+    machines that changed status after the range, so the cost depends on how
+    often statuses change, not on how many readings were taken. A machine is
+    counted from its first recorded status on.
+
+    A job is a stretch of consecutive statuses in ``job_states``. Jobs that
+    were already underway when the range starts are measured from the
+    status they had at that point.
+
+    Args:
+        events (StatusEvents or StatusStore): Source with ``iter_events(start, end, machine_id)``
+            and ``current()``
+        start (str): ISO timestamp where the range starts
+        end (str): ISO timestamp where the range ends, defaults to now
+        machine_id (str): Only include this machine
+        job_states (Iterable[str]): Statuses that make up a job
+
+    Returns:
+        Dict: Seconds spent in each state (summed over machines), each
+        state's share of that time, transition counts, and the number and
+        mean duration in seconds of the jobs that ended in the range
+    """
+    end = end or datetime.now().isoformat()
+    start_micros = timestamp_to_micros(start)
+    end_micros = timestamp_to_micros(end)
+    if end_micros < start_micros:
+        raise ValueError("Range end is before its start")
+    job_states = set(job_states)
+
+    changes: Dict[str, List[Dict]] = {}
+    for event in events.iter_events(start, end, machine_id):
+        changes.setdefault(event.get('machine_id') or '', []).append(event)
+
+    # Status of every machine when the range starts, as (status, entered at)
+    initial = {}
+    for key, machine_events in changes.items():
+        first = machine_events[0]
+        if first.get('previous') is not None:
+            initial[key] = (first['previous'], timestamp_to_micros(first['since']))
+
+    unresolved = set()
+    for key, state in events.current().items():
+        if key in changes or (machine_id is not None and key != machine_id):
+            continue
+        since = timestamp_to_micros(state['since'])
+        if since <= start_micros:
+            initial[key] = (state['status'], since)
+        elif since >= end_micros:
+            unresolved.add(key)
+    if unresolved:
+        # These changed status after the range; their next event tells what they were in it
+        for event in events.iter_events(end, None, machine_id):
+            key = event.get('machine_id') or ''
+            if key not in unresolved:
+                continue
+            unresolved.discard(key)
+            if event.get('previous') is not None and timestamp_to_micros(event['since']) < start_micros:
+                initial[key] = (event['previous'], timestamp_to_micros(event['since']))
+            if not unresolved:
+                break
+
+    seconds: Dict[str, float] = {}
+    transitions: Dict[str, int] = {}
+    jobs = []
+    for key in initial.keys() | changes.keys():
+        status, entered = initial.get(key, (None, None))
+        position = max(entered, start_micros) if entered is not None else None
+        job_start = entered if status in job_states else None
+        for event in changes.get(key, []):
+            micros = timestamp_to_micros(event['timestamp'])
+            if status is not None:
+                seconds[status] = seconds.get(status, 0) + (micros - position) / _MICROS_PER_SECOND
+                transition = f"{status}->{event['status']}"
+                transitions[transition] = transitions.get(transition, 0) + 1
+            status, position = event['status'], micros
+            if status in job_states and job_start is None:
+                job_start = micros
+            elif status not in job_states and job_start is not None:
+                jobs.append((micros - job_start) / _MICROS_PER_SECOND)
+                job_start = None
+        if status is not None:
+            seconds[status] = seconds.get(status, 0) + (end_micros - position) / _MICROS_PER_SECOND
+
+    observed = sum(seconds.values())
+    return {
+        'period': {'start': start, 'end': end},
+        'machines': len(initial.keys() | changes.keys()),
+        'time_in_state': {status: round(value, 2) for status, value in sorted(seconds.items())},
+        'utilization': {
+            status: round(value / observed, 4) if observed else 0 for status, value in sorted(seconds.items())
+        },
+        'transitions': dict(sorted(transitions.items())),
+        'transition_count': sum(transitions.values()),
+        'jobs': {
+            'completed': len(jobs),
+            'mean_duration': round(sum(jobs) / len(jobs), 2) if jobs else None
+        }
+    }
+
+
+def machine_utilization(filename: str = 'machine_data.json', start: Optional[str] = None,
+                        end: Optional[str] = None, machine_id: Optional[str] = None) -> Dict:
+    """
+    Utilization of the machines reporting to a data file, from their reading statuses.
+
+    Reads the run-length status events kept next to the data file, so no
+    raw reading is read. A job is a run of ``RUNNING`` readings.
+
+    Args:
+        filename (str): Name of the data file
+        start (str): ISO timestamp where the range starts, defaults to the first status change
+        end (str): ISO timestamp where the range ends, defaults to now
+        machine_id (str): Only include this machine
+
+    Returns:
+        Dict: See ``utilization``
+
+    Raises:
+        FileNotFoundError: If no start is given and no status change has been recorded
+        ValueError: If the range ends before it starts
+    """
+    events = open_status_events(data_file_path(filename))
+    if start is None:
+        first = next(events.iter_events(), None)
+        if first is None:
+            raise FileNotFoundError("No status events recorded")
+        start = first['timestamp']
+    return utilization(events, start, end, machine_id, MACHINE_JOB_STATES)
+
+
+def job_utilization(store, start: str, end: Optional[str] = None, machine_id: Optional[str] = None) -> Dict:
+    """
+    Utilization of the machines from the job statuses set through the API.
+
+    A job lasts from ``STARTED`` until the machine reaches a status outside
+    ``API_JOB_STATES``, usually ``COMPLETED``.
+
+    Args:
+        store (StatusStore): Status store recording the job status changes
+        start (str): ISO timestamp where the range starts
+        end (str): ISO timestamp where the range ends, defaults to now
+        machine_id (str): Only include this machine
+
+    Returns:
+        Dict: See ``utilization``
+    """
+    return utilization(store, start, end, machine_id, API_JOB_STATES)
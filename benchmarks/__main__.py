@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+
+from benchmarks.harness import DEFAULT_TOLERANCE, compare, format_value, load_results, result_key, save_results
+from benchmarks.suite import BENCHMARKS, DEFAULT_SIZES, FULL_SIZES, run
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def parse_sizes(value: str):
+    return tuple(int(float(size)) for size in value.split(','))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Machine data performance benchmarks")
+    parser.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES,
+                        help="Comma-separated numbers of readings, e.g. 1e3,1e4,1e5")
+    parser.add_argument('--full', action='store_true', help="Run every size from 1e3 to 1e7 readings")
+    parser.add_argument('--only', default=None, help=f"Comma-separated benchmarks out of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--min-time', type=float, default=0.5, help="Seconds to time each benchmark and size")
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline results to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slowdown tolerated before failing")
+    args = parser.parse_args(argv)
+
+    def progress(result):
+        print(f"{result_key(result):<36} {format_value(result['value'], result['unit']):>18}", flush=True)
+
+    sizes = FULL_SIZES if args.full else args.sizes
+    only = args.only.split(',') if args.only else None
+    results = run(sizes, only, args.min_time, progress)
+
+    if args.output:
+        save_results(args.output, results)
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        baseline = load_results(args.baseline)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one")
+        return 0
+
+    comparisons = compare(results, baseline, args.tolerance)
+    print()
+    for comparison in comparisons:
+        flag = 'REGRESSION' if comparison['regression'] else ''
+        print(f"{comparison['key']:<36} {comparison['change']:+8.1%} {flag}")
+    regressions = [comparison for comparison in comparisons if comparison['regression']]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_MIN_TIME = 0.5
+DEFAULT_MAX_CALLS = 1000
+DEFAULT_TOLERANCE = 0.25
+
+
+def time_calls(func: Callable, min_time: float = DEFAULT_MIN_TIME, max_calls: int = DEFAULT_MAX_CALLS,
+               min_calls: int = 3) -> List[float]:
+    """
+    Call a function repeatedly and time every call.
+
+    Calls continue until ``min_time`` seconds were spent and at least
+    ``min_calls`` calls were made, or ``max_calls`` is reached.
+
+    Args:
+        func (Callable): Function to call without arguments
+        min_time (float): Seconds to keep calling for
+        max_calls (int): Maximum number of calls
+        min_calls (int): Minimum number of calls
+
+    Returns:
+        List[float]: Seconds taken by each call
+    """
+    durations = []
+    spent = 0.0
+    while len(durations) < max_calls and (spent < min_time or len(durations) < min_calls):
+        started = time.perf_counter()
+        func()
+        duration = time.perf_counter() - started
+        durations.append(duration)
+        spent += duration
+    return durations
+
+
+def latency_result(name: str, size: Optional[int], durations: List[float]) -> Dict:
+    """
+    Summarize call durations as a median latency result, lower being better.
+
+    Args:
+        name (str): Benchmark name
+        size (int): Number of stored readings the calls ran against
+        durations (List[float]): Seconds taken by each call
+
+    Returns:
+        Dict: Result entry
+    """
+    return {
+        'name': name,
+        'size': size,
+        'metric': 'median_latency',
+        'value': statistics.median(durations),
+        'unit': 's',
+        'higher_is_better': False,
+        'calls': len(durations),
+        'p95': _percentile(durations, 0.95)
+    }
+
+
+def throughput_result(name: str, size: Optional[int], durations: List[float]) -> Dict:
+    """
+    Summarize call durations as calls per second, higher being better.
+
+    Args:
+        name (str): Benchmark name
+        size (int): Number of stored readings the calls ran against
+        durations (List[float]): Seconds taken by each call
+
+    Returns:
+        Dict: Result entry
+    """
+    return {
+        'name': name,
+        'size': size,
+        'metric': 'throughput',
+        'value': len(durations) / sum(durations),
+        'unit': 'ops/s',
+        'higher_is_better': True,
+        'calls': len(durations),
+        'p95': _percentile(durations, 0.95)
+    }
+
+
+def _percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def result_key(result: Dict) -> str:
+    """Identify a result across runs, e.g. ``analyze_data[100000]``."""
+    return f"{result['name']}[{result['size']}]" if result['size'] is not None else result['name']
+
+
+def environment() -> Dict:
+    """
+    Describe the machine and code a run was made on.
+
+    Returns:
+        Dict: Python version, platform, CPU count, NumPy version and git commit
+    """
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': numpy_version,
+        'commit': commit
+    }
+
+
+def save_results(path: str, results: List[Dict]) -> None:
+    """
+    Write results and their environment to a JSON file.
+
+    Args:
+        path (str): Output file
+        results (List[Dict]): Result entries
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+def load_results(path: str) -> List[Dict]:
+    """
+    Read the results saved by ``save_results``.
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    with open(path, 'r') as f:
+        return json.load(f)['results']
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    Compare results with a baseline run.
+
+    Args:
+        results (List[Dict]): Result entries of this run
+        baseline (List[Dict]): Result entries of the baseline run
+        tolerance (float): Relative slowdown tolerated before a result counts as a regression
+
+    Returns:
+        List[Dict]: ``{'key', 'value', 'baseline', 'change', 'regression'}`` per
+        result that has a baseline; ``change`` is the relative improvement,
+        negative when slower
+    """
+    baseline_by_key = {result_key(result): result for result in baseline}
+    comparisons = []
+    for result in results:
+        reference = baseline_by_key.get(result_key(result))
+        if reference is None or reference['metric'] != result['metric'] or not reference['value']:
+            continue
+        if result['higher_is_better']:
+            change = result['value'] / reference['value'] - 1
+        else:
+            change = reference['value'] / result['value'] - 1 if result['value'] else float('inf')
+        comparisons.append({
+            'key': result_key(result),
+            'value': result['value'],
+            'baseline': reference['value'],
+            'change': change,
+            'regression': change < -tolerance
+        })
+    return comparisons
+
+
+def format_value(value: float, unit: str) -> str:
+    if unit == 's':
+        return f"{value * 1000:.3f} ms"
+    return f"{value:,.1f} {unit}"
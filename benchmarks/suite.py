@@ -0,0 +1,173 @@
+import os
+import random
+import shutil
+import sys
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional
+from unittest.mock import patch
+
+from analytics.data_analytics import analyze_data, detect_anomalies
+from data_process.data_generator import save_data_to_json
+from data_process.data_processor import data_version, process_machine_data
+from data_process.storage import SegmentedLog, data_file_path
+from benchmarks.harness import latency_result, throughput_result, time_calls
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+FULL_SIZES = (1000, 10000, 100000, 1000000, 10000000)
+
+FILE_PREFIX = 'benchmark_'
+PREFILL_CHUNK = 100000
+
+# Folders kept next to a data file by the generator and ingest paths
+_DERIVED_SUFFIXES = ('.rollups', '.status', '.anomalies')
+
+
+def make_readings(first: int, count: int, machines: int = 10) -> List[Dict]:
+    """
+    Build synthetic readings one second apart.
+
+    Args:
+        first (int): Index of the first reading, which sets its timestamp
+        count (int): Number of readings
+        machines (int): Number of machine ids to cycle through
+
+    Returns:
+        List[Dict]: Readings in time order
+    """
+    rng = random.Random(first)
+    start = datetime(2023, 1, 1)
+    return [
+        {
+            'timestamp': (start + timedelta(seconds=i)).isoformat(),
+            'temperature': round(rng.uniform(20.0, 30.0), 2),
+            'speed': round(rng.uniform(40.0, 60.0), 2),
+            'status': rng.choice(['IDLE', 'RUNNING', 'PAUSED']),
+            'machine_id': f'machine-{i % machines}'
+        }
+        for i in range(first, first + count)
+    ]
+
+
+class DataFile:
+    """
+    Benchmark data file in the project's data folder, removed with everything derived from it.
+
+    Args:
+        name (str): Benchmark name, used in the file name
+        size (int): Number of readings to store up front
+    """
+
+    def __init__(self, name: str, size: int):
+        self.filename = f'{FILE_PREFIX}{name}_{size}.json'
+        self.filepath = data_file_path(self.filename)
+        self.size = size
+
+    def __enter__(self) -> 'DataFile':
+        self.remove()
+        log = SegmentedLog(os.path.splitext(self.filepath)[0])
+        for first in range(0, self.size, PREFILL_CHUNK):
+            log.append_many(make_readings(first, min(PREFILL_CHUNK, self.size - first)))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.remove()
+
+    def remove(self) -> None:
+        shutil.rmtree(os.path.splitext(self.filepath)[0], ignore_errors=True)
+        for suffix in _DERIVED_SUFFIXES:
+            shutil.rmtree(self.filepath + suffix, ignore_errors=True)
+
+
+def bench_save_data(size: int, min_time: float) -> Dict:
+    """Writes per second of ``save_data_to_json`` on a file already holding ``size`` readings."""
+    with DataFile('save_data', size) as data_file:
+        # The first call also catches the rollups and status events up with the stored readings
+        save_data_to_json(data_file.filename)
+        durations = time_calls(partial(save_data_to_json, data_file.filename), min_time)
+    return throughput_result('save_data_to_json', size, durations)
+
+
+def bench_process_data(size: int, min_time: float) -> Dict:
+    """Latency of ``process_machine_data`` for one machine, read from storage."""
+    with DataFile('process_data', size) as data_file:
+        durations = time_calls(partial(process_machine_data, data_file.filename, 5, machine_id='machine-3'), min_time)
+    return latency_result('process_machine_data', size, durations)
+
+
+def bench_analyze_data(size: int, min_time: float) -> Dict:
+    """Latency of a full-history ``analyze_data``."""
+    with DataFile('analyze_data', size) as data_file:
+        durations = time_calls(partial(analyze_data, data_file.filename), min_time, min_calls=1)
+    return latency_result('analyze_data', size, durations)
+
+
+def bench_detect_anomalies(size: int, min_time: float) -> Dict:
+    """Latency of ``detect_anomalies`` over ``size`` values."""
+    values = [reading['temperature'] for reading in make_readings(0, size)]
+    durations = time_calls(partial(detect_anomalies, values), min_time, min_calls=1)
+    return latency_result('detect_anomalies', size, durations)
+
+
+def bench_api_data(size: int, min_time: float) -> List[Dict]:
+    """Requests per second of ``GET /api/data`` through the Flask test client, cached and uncached."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+    from app import app
+    from controllers import data_controller
+
+    with DataFile('api_data', size) as data_file:
+        client = app.test_client()
+        url = '/api/data?machine_id=machine-3'
+        with patch.object(data_controller, 'process_machine_data',
+                          partial(process_machine_data, data_file.filename)), \
+                patch.object(data_controller, 'data_version', partial(data_version, data_file.filename)):
+            data_controller.response_cache.clear()
+            cached = time_calls(lambda: client.get(url), min_time)
+
+            def uncached():
+                data_controller.response_cache.clear()
+                client.get(url)
+            fresh = time_calls(uncached, min_time)
+    return [throughput_result('api_data_cached', size, cached), throughput_result('api_data', size, fresh)]
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'save_data_to_json': bench_save_data,
+    'process_machine_data': bench_process_data,
+    'analyze_data': bench_analyze_data,
+    'detect_anomalies': bench_detect_anomalies,
+    'api_data': bench_api_data
+}
+
+
+def run(sizes: Iterable[int] = DEFAULT_SIZES, only: Optional[Iterable[str]] = None, min_time: float = 0.5,
+        progress: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """
+    Run the benchmark suite.
+
+    Args:
+        sizes (Iterable[int]): Numbers of stored readings (or values) to run every benchmark at
+        only (Iterable[str]): Names of the benchmarks to run, defaults to all
+        min_time (float): Seconds to spend timing each benchmark and size
+        progress (Callable[[Dict], None]): Called with every result as it is made
+
+    Returns:
+        List[Dict]: Result entries
+
+    Raises:
+        ValueError: If an unknown benchmark is requested
+    """
+    names = list(only) if only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+
+    results = []
+    for name in names:
+        for size in sizes:
+            produced = BENCHMARKS[name](size, min_time)
+            for result in produced if isinstance(produced, list) else [produced]:
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    return results
@@ -0,0 +1,636 @@
+import bisect
+import math
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # Batch detection falls back to the streaming detectors
+    np = None
+
+try:
+    from data_process.rolling_window import DEFAULT_FIELDS, RollingWindow
+    from data_process.storage import ReadingStore, SegmentedLog, micros_to_timestamp, open_store, timestamp_to_micros
+except ImportError:  # Running as a script from inside data_process/
+    from rolling_window import DEFAULT_FIELDS, RollingWindow
+    from storage import ReadingStore, SegmentedLog, micros_to_timestamp, open_store, timestamp_to_micros
+
+ANOMALIES_SUFFIX = '.anomalies'
+WARMUP_READINGS = 5000
+
+# Scales the median absolute deviation to the standard deviation of normal data
+MAD_SCALE = 1.4826
+
+# Rows of sliding windows materialized at once by the batch detectors
+_BATCH_ROWS = 4096
+
+
+class Detector:
+    """
+    Streaming anomaly detector for one series of values.
+
+    Each value is scored against the state built from the values before it,
+    then added to that state, so an outlier never hides itself. Scores are
+    distances from the expected value in units of the series' spread, and a
+    value is flagged when its score exceeds ``threshold``. State is bounded,
+    whatever the length of the series.
+
+    ``batch`` scores a whole series at once and gives the same results as
+    feeding the values one by one into a new detector.
+
+    Args:
+        threshold (float): Score above which a value is flagged
+    """
+
+    name = None
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+
+    def update(self, value: float) -> Optional[Dict]:
+        """
+        Score a new value, then add it to the detector's state.
+
+        Args:
+            value (float): New value
+
+        Returns:
+            Optional[Dict]: ``{'expected', 'score'}`` if the value is anomalous
+        """
+        scored = self._score(value)
+        self._add(value)
+        if scored is not None and scored[1] > self.threshold:
+            return {'expected': scored[0], 'score': scored[1]}
+        return None
+
+    def batch(self, values: Sequence[float]) -> List[Tuple[int, float, float]]:
+        """
+        Find the anomalies of a whole series, as a new detector would.
+
+        Args:
+            values (Sequence[float]): Series in time order
+
+        Returns:
+            List[Tuple[int, float, float]]: ``(index, expected, score)`` of every flagged value
+        """
+        detector = self._fresh()
+        flagged = []
+        for i, value in enumerate(values):
+            detection = detector.update(value)
+            if detection is not None:
+                flagged.append((i, detection['expected'], detection['score']))
+        return flagged
+
+    def _fresh(self) -> 'Detector':
+        raise NotImplementedError
+
+    def _score(self, value: float) -> Optional[Tuple[float, float]]:
+        raise NotImplementedError
+
+    def _add(self, value: float) -> None:
+        raise NotImplementedError
+
+
+class RollingZScoreDetector(Detector):
+    """
+    Flags values far from the mean of the last ``window`` values, in standard deviations.
+
+    Keeps a ``RollingWindow``, so each update costs O(1).
+
+    Args:
+        window (int): Number of preceding values the mean and deviation cover
+        threshold (float): Number of standard deviations to flag at
+    """
+
+    name = 'zscore'
+
+    def __init__(self, window: int = 60, threshold: float = 3.0):
+        super().__init__(threshold)
+        self.window = window
+        self._values = RollingWindow(window)
+
+    def _fresh(self) -> 'RollingZScoreDetector':
+        return RollingZScoreDetector(self.window, self.threshold)
+
+    def _score(self, value: float) -> Optional[Tuple[float, float]]:
+        if self._values.count < self.window:
+            return None
+        deviation = self._values.stddev
+        if deviation == 0:
+            return None
+        return self._values.mean, abs(value - self._values.mean) / deviation
+
+    def _add(self, value: float) -> None:
+        self._values.push(value)
+
+    def batch(self, values: Sequence[float]) -> List[Tuple[int, float, float]]:
+        if np is None:
+            return super().batch(values)
+        array = np.asarray(values, dtype=np.float64)
+        flagged = []
+        for first, windows in _preceding_windows(array, self.window):
+            means = windows.mean(axis=1)
+            deviations = windows.std(axis=1)
+            current = array[first:first + len(windows)]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = np.abs(current - means) / deviations
+            flagged.extend(_flagged(first, means, scores, (deviations > 0) & (scores > self.threshold)))
+        return flagged
+
+
+class EwmaDetector(Detector):
+    """
+    Flags values far from an exponentially weighted moving average.
+
+    Tracks an exponentially weighted mean and variance in O(1) time and
+    space per update; recent values weigh most, so the baseline follows
+    slow drifts.
+
+    Args:
+        alpha (float): Weight of each new value, between 0 and 1
+        threshold (float): Number of weighted standard deviations to flag at
+        warmup (int): Values to see before flagging anything
+    """
+
+    name = 'ewma'
+
+    def __init__(self, alpha: float = 0.1, threshold: float = 3.0, warmup: int = 30):
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be between 0 and 1")
+        super().__init__(threshold)
+        self.alpha = alpha
+        self.warmup = warmup
+        self._count = 0
+        self._mean = 0.0
+        self._variance = 0.0
+
+    def _fresh(self) -> 'EwmaDetector':
+        return EwmaDetector(self.alpha, self.threshold, self.warmup)
+
+    def _score(self, value: float) -> Optional[Tuple[float, float]]:
+        if self._count < self.warmup or self._variance <= 0:
+            return None
+        return self._mean, abs(value - self._mean) / math.sqrt(self._variance)
+
+    def _add(self, value: float) -> None:
+        self._count += 1
+        if self._count == 1:
+            self._mean = value
+            return
+        difference = value - self._mean
+        self._variance = (1 - self.alpha) * (self._variance + self.alpha * difference * difference)
+        self._mean += self.alpha * difference
+
+    def batch(self, values: Sequence[float]) -> List[Tuple[int, float, float]]:
+        if np is None or len(values) < 2:
+            return super().batch(values)
+        array = np.asarray(values, dtype=np.float64)
+        decay = 1 - self.alpha
+
+        # means[t] and variances[t] are the state after values[:t + 1]
+        means = _decaying_sum(self.alpha * array[1:], decay, array[0])
+        means = np.concatenate(([array[0]], means))
+        differences = array[1:] - means[:-1]
+        variances = _decaying_sum(decay * self.alpha * differences * differences, decay, 0.0)
+        variances = np.concatenate(([0.0], variances))
+
+        # Value t is scored against the state after the t values before it
+        expected = means[:-1]
+        spread = variances[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.abs(array[1:] - expected) / np.sqrt(spread)
+        mask = (np.arange(1, len(array)) >= self.warmup) & (spread > 0) & (scores > self.threshold)
+        return _flagged(1, expected, scores, mask)
+
+
+class MedianMadDetector(Detector):
+    """
+    Flags values far from the median of the last ``window`` values, in scaled MADs.
+
+    The median absolute deviation (MAD) is barely moved by the outliers it
+    looks for, unlike the standard deviation. The window is kept sorted:
+    values are placed and removed by binary search, and the MAD is found by
+    a binary search over the two sorted halves around the median, so each
+    update costs O(log n) comparisons.
+
+    Args:
+        window (int): Number of preceding values the median and MAD cover
+        threshold (float): Number of scaled MADs to flag at
+    """
+
+    name = 'mad'
+
+    def __init__(self, window: int = 60, threshold: float = 3.5):
+        super().__init__(threshold)
+        self.window = window
+        self._arrivals: Deque[float] = deque()
+        self._sorted: List[float] = []
+
+    def _fresh(self) -> 'MedianMadDetector':
+        return MedianMadDetector(self.window, self.threshold)
+
+    def _score(self, value: float) -> Optional[Tuple[float, float]]:
+        if len(self._sorted) < self.window:
+            return None
+        median = _median(self._sorted)
+        spread = MAD_SCALE * _sorted_mad(self._sorted, median)
+        if spread == 0:
+            return None
+        return median, abs(value - median) / spread
+
+    def _add(self, value: float) -> None:
+        if len(self._arrivals) == self.window:
+            oldest = self._arrivals.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._arrivals.append(value)
+        bisect.insort(self._sorted, value)
+
+    def batch(self, values: Sequence[float]) -> List[Tuple[int, float, float]]:
+        if np is None:
+            return super().batch(values)
+        array = np.asarray(values, dtype=np.float64)
+        flagged = []
+        for first, windows in _preceding_windows(array, self.window):
+            medians = np.median(windows, axis=1)
+            spreads = MAD_SCALE * np.median(np.abs(windows - medians[:, None]), axis=1)
+            current = array[first:first + len(windows)]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = np.abs(current - medians) / spreads
+            flagged.extend(_flagged(first, medians, scores, (spreads > 0) & (scores > self.threshold)))
+        return flagged
+
+
+def _preceding_windows(array, window: int):
+    """Yield ``(first, windows)`` where ``windows[k]`` holds the ``window`` values before ``first + k``."""
+    if len(array) <= window:
+        return
+    windows = sliding_window_view(array, window)[:-1]
+    for start in range(0, len(windows), _BATCH_ROWS):
+        yield window + start, windows[start:start + _BATCH_ROWS]
+
+
+def _decaying_sum(inputs, decay: float, initial: float):
+    """
+    Compute ``y[t] = decay * y[t - 1] + inputs[t]`` with ``y[-1] = initial``, vectorized.
+
+    Works in blocks short enough that ``decay ** -length`` stays far from
+    overflowing, solving each block in closed form with a cumulative sum.
+    """
+    block = max(1, int(12 * math.log(10) / -math.log(decay)))
+    outputs = np.empty(len(inputs))
+    previous = initial
+    for start in range(0, len(inputs), block):
+        chunk = inputs[start:start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        outputs[start:start + len(chunk)] = powers * (previous + np.cumsum(chunk / powers))
+        previous = outputs[start + len(chunk) - 1]
+    return outputs
+
+
+def _flagged(first: int, expected, scores, mask) -> List[Tuple[int, float, float]]:
+    indices = np.flatnonzero(mask)
+    return list(zip((indices + first).tolist(), expected[indices].tolist(), scores[indices].tolist()))
+
+
+def _median(values: List[float]) -> float:
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def _sorted_mad(values: List[float], median: float) -> float:
+    # Deviations below the median grow leftwards and above it rightwards: two sorted runs
+    split = bisect.bisect_left(values, median)
+    below = lambda i: median - values[split - 1 - i]
+    above = lambda j: values[split + j] - median
+    count = len(values)
+    middle = count // 2
+    if count % 2:
+        return _kth_smallest(below, split, above, count - split, middle)
+    return (_kth_smallest(below, split, above, count - split, middle - 1)
+            + _kth_smallest(below, split, above, count - split, middle)) / 2
+
+
+def _kth_smallest(a: Callable[[int], float], a_length: int, b: Callable[[int], float], b_length: int,
+                  k: int) -> float:
+    """Find the k-th smallest (0-based) element of two sorted sequences in O(log n) steps."""
+    low, high = max(0, k + 1 - b_length), min(k + 1, a_length)
+    while True:
+        # Take i elements from a and k + 1 - i from b
+        i = (low + high) // 2
+        j = k + 1 - i
+        if i > 0 and j < b_length and a(i - 1) > b(j):
+            high = i - 1
+        elif j > 0 and i < a_length and b(j - 1) > a(i):
+            low = i + 1
+        else:
+            if i == 0:
+                return b(j - 1)
+            if j == 0:
+                return a(i - 1)
+            return max(a(i - 1), b(j - 1))
+
+
+DETECTORS: Dict[str, Callable[..., Detector]] = {
+    RollingZScoreDetector.name: RollingZScoreDetector,
+    EwmaDetector.name: EwmaDetector,
+    MedianMadDetector.name: MedianMadDetector
+}
+
+DEFAULT_DETECTORS: Tuple[Tuple[str, Dict], ...] = (
+    ('zscore', {'window': 60, 'threshold': 3.0}),
+    ('ewma', {'alpha': 0.1, 'threshold': 3.0, 'warmup': 30}),
+    ('mad', {'window': 60, 'threshold': 3.5})
+)
+
+
+def register_detector(name: str, factory: Callable[..., Detector]) -> None:
+    """
+    Make a detector available by name to monitors and batch scans.
+
+    Args:
+        name (str): Name used in detector configurations and detection records
+        factory (Callable[..., Detector]): Builds the detector from its parameters
+    """
+    DETECTORS[name] = factory
+
+
+def make_detector(name: str, **params) -> Detector:
+    """
+    Build a registered detector.
+
+    Args:
+        name (str): Detector name, e.g. ``zscore``, ``ewma`` or ``mad``
+        **params: Detector parameters
+
+    Returns:
+        Detector: New detector with empty state
+
+    Raises:
+        ValueError: If no detector is registered under that name
+    """
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector '{name}'. Available detectors: {', '.join(DETECTORS)}")
+    return DETECTORS[name](**params)
+
+
+def _detection(reading: Dict, field: str, detector: str, expected: float, score: float) -> Dict:
+    detection = {
+        'timestamp': reading['timestamp'],
+        'field': field,
+        'detector': detector,
+        'value': reading[field],
+        'expected': round(expected, 4),
+        'score': round(score, 2)
+    }
+    if reading.get('machine_id'):
+        detection['machine_id'] = reading['machine_id']
+    return detection
+
+
+class AnomalyMonitor:
+    """
+    Runs a set of detectors on every numeric field of every machine, one reading at a time.
+
+    Each machine gets its own detectors, so a fleet's machines are judged
+    against their own history. Detections are appended to a segmented log
+    when a directory is given, where any process can query them by time.
+
+    Args:
+        directory (str): Folder of the detection log, or None to keep no log
+        detectors (Iterable[Tuple[str, Dict]]): ``(name, params)`` of the detectors to run
+        fields (Iterable[str]): Numeric reading fields to watch
+    """
+
+    def __init__(self, directory: Optional[str] = None,
+                 detectors: Iterable[Tuple[str, Dict]] = DEFAULT_DETECTORS,
+                 fields: Iterable[str] = DEFAULT_FIELDS):
+        self.detectors = tuple((name, dict(params)) for name, params in detectors)
+        self.fields = tuple(fields)
+        self.log = SegmentedLog(directory) if directory else None
+
+        # Fail on unknown detectors or bad parameters now rather than on the first reading
+        for name, params in self.detectors:
+            make_detector(name, **params)
+
+        self._lock = threading.Lock()
+        self._machines: Dict[str, Dict[str, List[Tuple[str, Detector]]]] = {}
+
+    def update(self, reading: Dict) -> List[Dict]:
+        """
+        Run the detectors on a new reading.
+
+        Args:
+            reading (Dict): Machine reading
+
+        Returns:
+            List[Dict]: Detections for the reading
+        """
+        return self.update_many([reading])
+
+    def update_many(self, readings: List[Dict], record: bool = True) -> List[Dict]:
+        """
+        Run the detectors on new readings and log their detections in one write.
+
+        Args:
+            readings (List[Dict]): Machine readings, oldest first
+            record (bool): Append the detections to the log
+
+        Returns:
+            List[Dict]: Detections, in reading order
+        """
+        detections = []
+        with self._lock:
+            for reading in readings:
+                detectors = self._detectors(reading.get('machine_id') or '')
+                for field in self.fields:
+                    for name, detector in detectors[field]:
+                        flagged = detector.update(reading[field])
+                        if flagged is not None:
+                            detections.append(_detection(reading, field, name, flagged['expected'], flagged['score']))
+            if record and self.log is not None:
+                self.log.append_many(detections)
+        return detections
+
+    def warm_up(self, store: ReadingStore, count: int = WARMUP_READINGS) -> None:
+        """
+        Prime the detectors with the newest stored readings, without logging detections.
+
+        Args:
+            store (ReadingStore): Raw readings of the data file
+            count (int): Number of readings to replay
+        """
+        try:
+            self.update_many(store.tail(count), record=False)
+        except FileNotFoundError:
+            pass
+
+    def iter_detections(self, start: Optional[str] = None, end: Optional[str] = None,
+                        machine_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate over the logged detections with ``start <= timestamp < end``.
+
+        Args:
+            start (str): ISO timestamp of the first detection to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only include detections of this machine
+        """
+        if self.log is None:
+            return
+        try:
+            yield from self.log.iter_range(start, end, machine_id)
+        except FileNotFoundError:
+            return
+
+    def _detectors(self, key: str) -> Dict[str, List[Tuple[str, Detector]]]:
+        detectors = self._machines.get(key)
+        if detectors is None:
+            detectors = self._machines[key] = {
+                field: [(name, make_detector(name, **params)) for name, params in self.detectors]
+                for field in self.fields
+            }
+        return detectors
+
+
+def detect_batch(readings: List[Dict], detectors: Iterable[Tuple[str, Dict]] = DEFAULT_DETECTORS,
+                 fields: Iterable[str] = DEFAULT_FIELDS) -> List[Dict]:
+    """
+    Run detectors over stored readings in vectorized passes.
+
+    Readings are split per machine and every field is scored as one array,
+    so the detections equal those an ``AnomalyMonitor`` with the same
+    detectors would have produced for the same readings.
+
+    Args:
+        readings (List[Dict]): Machine readings in time order
+        detectors (Iterable[Tuple[str, Dict]]): ``(name, params)`` of the detectors to run
+        fields (Iterable[str]): Numeric reading fields to watch
+
+    Returns:
+        List[Dict]: Detections, in reading order
+    """
+    detectors = [(name, make_detector(name, **params)) for name, params in detectors]
+    positions: Dict[str, List[int]] = {}
+    for i, reading in enumerate(readings):
+        positions.setdefault(reading.get('machine_id') or '', []).append(i)
+
+    found = []
+    for indices in positions.values():
+        machine_readings = [readings[i] for i in indices]
+        for field_order, field in enumerate(fields):
+            values = [reading[field] for reading in machine_readings]
+            for detector_order, (name, detector) in enumerate(detectors):
+                for index, expected, score in detector.batch(values):
+                    reading = machine_readings[index]
+                    found.append(((indices[index], field_order, detector_order),
+                                  _detection(reading, field, name, expected, score)))
+    found.sort(key=lambda item: item[0])
+    return [detection for _, detection in found]
+
+
+_monitors: Dict[str, AnomalyMonitor] = {}
+_monitors_lock = threading.Lock()
+
+
+def anomaly_directory(filepath: str) -> str:
+    """
+    Map a data file path such as ``data/machine_data.json`` to its detection log folder.
+    """
+    return filepath + ANOMALIES_SUFFIX
+
+
+def get_anomaly_monitor(filepath: str) -> AnomalyMonitor:
+    """
+    Get the process-wide anomaly monitor for a data file path.
+
+    The monitor is primed with the newest stored readings the first time it
+    is requested, so get it before appending new readings. Writers get it
+    when they start (see ``derived_log_updater``), so the replay does not
+    hold up their first write.
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+
+    Returns:
+        AnomalyMonitor: Monitor fed by the generator writing that file
+    """
+    with _monitors_lock:
+        monitor = _monitors.get(filepath)
+        if monitor is None:
+            monitor = _monitors[filepath] = AnomalyMonitor(anomaly_directory(filepath))
+            monitor.warm_up(open_store(filepath))
+        return monitor
+
+
+def open_anomalies(filepath: str) -> AnomalyMonitor:
+    """
+    Get the anomaly detections of a data file path for reading.
+
+    Returns:
+        AnomalyMonitor: The in-process monitor if there is one, otherwise a reader of its log
+    """
+    return _monitors.get(filepath) or AnomalyMonitor(anomaly_directory(filepath))
+
+
+def anomalies_version(filepath: str) -> Optional[tuple]:
+    """
+    Get a token that changes whenever detections are logged for a data file path.
+
+    Args:
+        filepath (str): Data file path
+
+    Returns:
+        Optional[tuple]: Version of the detection log, or None if nothing has been logged
+    """
+    try:
+        return SegmentedLog(anomaly_directory(filepath)).version()
+    except FileNotFoundError:
+        return None
+
+
+def query_anomalies(filepath: str, start: Optional[str] = None, end: Optional[str] = None,
+                    machine_id: Optional[str] = None, field: Optional[str] = None,
+                    detector: Optional[str] = None) -> List[Dict]:
+    """
+    Get the logged detections of a data file over a time range.
+
+    Args:
+        filepath (str): Data file path
+        start (str): ISO timestamp of the first detection to include
+        end (str): ISO timestamp to stop before
+        machine_id (str): Only include detections of this machine
+        field (str): Only include detections on this field
+        detector (str): Only include detections of this detector
+
+    Returns:
+        List[Dict]: Detections in time order
+    """
+    return [
+        detection for detection in open_anomalies(filepath).iter_detections(start, end, machine_id)
+        if (field is None or detection['field'] == field) and (detector is None or detection['detector'] == detector)
+    ]
+
+
+def latest_anomalies(filepath: str, reading: Dict) -> List[Dict]:
+    """
+    Get the logged detections of one reading.
+
+    Args:
+        filepath (str): Data file path
+        reading (Dict): Stored machine reading
+
+    Returns:
+        List[Dict]: ``{'field', 'detector', 'value', 'expected', 'score'}`` of every detection
+    """
+    machine_id = reading.get('machine_id')
+    # Machines of a fleet tick share the timestamp, so read every detection at it
+    end = micros_to_timestamp(timestamp_to_micros(reading['timestamp']) + 1)
+    return [
+        {key: detection[key] for key in ('field', 'detector', 'value', 'expected', 'score')}
+        for detection in open_anomalies(filepath).iter_detections(reading['timestamp'], end, machine_id)
+        # Without a machine_id the log returns every machine's detections; keep the untagged ones
+        if detection.get('machine_id') == machine_id
+    ]
@@ -0,0 +1,353 @@
+import json
+import os
+import sys
+import threading
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only required once a columnar store is opened
+    np = None
+
+try:
+    from data_process.storage import (
+        COLUMNAR_SUFFIX, ReadingStore, data_file_path, micros_to_timestamp, open_store, timestamp_to_micros
+    )
+except ImportError:  # Running as a script from inside data_process/
+    from storage import (
+        COLUMNAR_SUFFIX, ReadingStore, data_file_path, micros_to_timestamp, open_store, timestamp_to_micros
+    )
+
+# Column name -> little-endian fixed-width dtype of its file
+COLUMNS = {
+    'timestamp': '<i8',
+    'temperature': '<f8',
+    'speed': '<f8',
+    'status': 'u1',
+    'machine': '<i4'
+}
+META_FILE = 'meta.json'
+NO_MACHINE = -1
+READ_CHUNK_ROWS = 65536
+
+
+class ColumnarStore(ReadingStore):
+    """
+    Readings stored as one fixed-width binary file per column.
+
+    Timestamps are int64 microseconds since the epoch, temperature and speed
+    float64, status a uint8 code and machine an int32 code; the code tables
+    live in ``meta.json``. Readers map the column files with ``numpy.memmap``,
+    so slicing a window or scanning history needs no parsing and almost no
+    copying. The row count is the length of the shortest column, so a row is
+    only visible once every column has been written.
+
+    Args:
+        directory (str): Folder holding the column files
+    """
+
+    def __init__(self, directory: str):
+        if np is None:
+            raise ImportError("NumPy is required for the columnar store")
+
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._meta: Optional[Dict] = None
+        self._codes: Dict[str, Dict[str, int]] = {}
+
+    def exists(self) -> bool:
+        return os.path.isfile(os.path.join(self.directory, META_FILE))
+
+    def column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def load_meta(self) -> Dict:
+        """
+        Read the status and machine code tables.
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        with open(os.path.join(self.directory, META_FILE), 'r') as f:
+            return json.load(f)
+
+    def count(self) -> int:
+        """
+        Number of complete rows.
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        if not self.exists():
+            raise FileNotFoundError(self.directory)
+        return min(
+            os.path.getsize(self.column_path(name)) // np.dtype(dtype).itemsize
+            for name, dtype in COLUMNS.items()
+        )
+
+    def version(self) -> Optional[tuple]:
+        """
+        Version token from the row count and the code tables' mtime.
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        return (self.count(), os.stat(os.path.join(self.directory, META_FILE)).st_mtime_ns)
+
+    def columns(self, start: int = 0, stop: Optional[int] = None) -> Dict:
+        """
+        Map a range of rows of every column without copying.
+
+        Args:
+            start (int): First row
+            stop (int): Row after the last one, defaults to the end
+
+        Returns:
+            Dict: Read-only arrays keyed by column name
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        count = self.count()
+        rows = slice(start, stop).indices(count)
+        result = {}
+        for name, dtype in COLUMNS.items():
+            if count == 0:
+                result[name] = np.empty(0, dtype=dtype)
+            else:
+                result[name] = np.memmap(self.column_path(name), dtype=dtype, mode='r', shape=(count,))[rows[0]:rows[1]]
+        return result
+
+    def machine_mask(self, columns: Dict, machine_id: str):
+        """
+        Boolean mask of the rows belonging to one machine.
+        """
+        machines = self.load_meta()['machines']
+        if machine_id not in machines:
+            return np.zeros(len(columns['machine']), dtype=bool)
+        return columns['machine'] == machines.index(machine_id)
+
+    def to_records(self, columns: Dict) -> List[Dict]:
+        """
+        Convert column arrays back into reading dicts.
+        """
+        meta = self.load_meta()
+        statuses = meta['statuses']
+        machines = meta['machines']
+        records = []
+        for timestamp, temperature, speed, status, machine in zip(
+            columns['timestamp'].tolist(),
+            columns['temperature'].tolist(),
+            columns['speed'].tolist(),
+            columns['status'].tolist(),
+            columns['machine'].tolist()
+        ):
+            record = {
+                'timestamp': micros_to_timestamp(timestamp),
+                'temperature': temperature,
+                'speed': speed,
+                'status': statuses[status]
+            }
+            if machine != NO_MACHINE:
+                record['machine_id'] = machines[machine]
+            records.append(record)
+        return records
+
+    def iter_records(self) -> Iterator[Dict]:
+        count = self.count()
+        return self._iter_rows(0, count)
+
+    def _iter_rows(self, first: int, last: int) -> Iterator[Dict]:
+        for start in range(first, last, READ_CHUNK_ROWS):
+            yield from self.to_records(self.columns(start, min(start + READ_CHUNK_ROWS, last)))
+
+    def tail(self, count: int, machine_id: Optional[str] = None) -> List[Dict]:
+        """
+        Read the newest readings by slicing the end of the mapped columns.
+
+        Args:
+            count (int): Maximum number of readings to return
+            machine_id (str): Only return readings of this machine
+
+        Returns:
+            List[Dict]: Up to ``count`` most recent readings, oldest first
+        """
+        if count <= 0:
+            return []
+        if machine_id is None:
+            return self.to_records(self.columns(-count))
+
+        columns = self.columns()
+        rows = np.flatnonzero(self.machine_mask(columns, machine_id))[-count:]
+        return self.to_records({name: column[rows] for name, column in columns.items()})
+
+    def row_range(self, start: Optional[str] = None, end: Optional[str] = None):
+        """
+        Find the rows with ``start <= timestamp < end`` by binary search.
+
+        Rows are expected to be appended in time order.
+
+        Args:
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+
+        Returns:
+            Tuple[int, int]: First row and the row after the last one
+        """
+        timestamps = self.columns()['timestamp']
+        first = 0 if start is None else int(np.searchsorted(timestamps, timestamp_to_micros(start), 'left'))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, timestamp_to_micros(end), 'left'))
+        return first, max(first, last)
+
+    def iter_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                   machine_id: Optional[str] = None) -> Iterator[Dict]:
+        first, last = self.row_range(start, end)
+        if machine_id is None:
+            return self._iter_rows(first, last)
+        columns = self.columns(first, last)
+        rows = np.flatnonzero(self.machine_mask(columns, machine_id))
+        return iter(self.to_records({name: column[rows] for name, column in columns.items()}))
+
+    def append_many(self, records: List[Dict]) -> None:
+        """
+        Append readings to every column file.
+
+        Args:
+            records (List[Dict]): Machine readings to persist, oldest first
+        """
+        if not records:
+            return
+
+        with self._lock:
+            meta = self._load_writer_meta()
+            known = (len(meta['statuses']), len(meta['machines']))
+            status_codes = [self._code_for('statuses', record['status']) for record in records]
+            machine_codes = [
+                self._code_for('machines', record['machine_id']) if 'machine_id' in record else NO_MACHINE
+                for record in records
+            ]
+            if len(meta['statuses']) > 256:
+                for value in meta['statuses'][known[0]:]:
+                    del self._codes['statuses'][value]
+                for value in meta['machines'][known[1]:]:
+                    del self._codes['machines'][value]
+                del meta['statuses'][known[0]:]
+                del meta['machines'][known[1]:]
+                raise ValueError("Columnar store supports at most 256 distinct statuses")
+            # New codes must be on disk before any row refers to them
+            if (len(meta['statuses']), len(meta['machines'])) != known:
+                self._save_meta(meta)
+
+            count = len(records)
+            columns = {
+                'timestamp': np.fromiter((timestamp_to_micros(r['timestamp']) for r in records), np.int64, count),
+                'temperature': np.fromiter((r['temperature'] for r in records), np.float64, count),
+                'speed': np.fromiter((r['speed'] for r in records), np.float64, count),
+                'status': np.array(status_codes, dtype=np.uint8),
+                'machine': np.array(machine_codes, dtype=np.int32)
+            }
+            for name, dtype in COLUMNS.items():
+                with open(self.column_path(name), 'ab') as f:
+                    f.write(columns[name].astype(dtype, copy=False).tobytes())
+
+    def create(self) -> None:
+        """
+        Create the store on disk if it does not exist yet.
+        """
+        with self._lock:
+            if not self.exists():
+                self._save_meta(self._load_writer_meta())
+
+    def _load_writer_meta(self) -> Dict:
+        if self._meta is not None:
+            return self._meta
+
+        os.makedirs(self.directory, exist_ok=True)
+        if self.exists():
+            self._meta = self.load_meta()
+            # Cut every column back to the last complete row after a crash
+            rows = self.count()
+            for name, dtype in COLUMNS.items():
+                with open(self.column_path(name), 'rb+') as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+        else:
+            self._meta = {'statuses': [], 'machines': []}
+            for name in COLUMNS:
+                open(self.column_path(name), 'ab').close()
+        self._codes = {
+            table: {value: code for code, value in enumerate(values)}
+            for table, values in self._meta.items()
+        }
+        return self._meta
+
+    def _code_for(self, table: str, value: str) -> int:
+        code = self._codes[table].get(value)
+        if code is None:
+            code = self._codes[table][value] = len(self._meta[table])
+            self._meta[table].append(value)
+        return code
+
+    def _save_meta(self, meta: Dict) -> None:
+        path = os.path.join(self.directory, META_FILE)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, path)
+
+
+_stores: Dict[str, ColumnarStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_columnar(filepath: str) -> ColumnarStore:
+    """
+    Get the writable columnar store at a path, shared per process.
+
+    Args:
+        filepath (str): Store path, e.g. ``data/machine_data.columns``
+
+    Returns:
+        ColumnarStore: Store for the given path
+    """
+    with _stores_lock:
+        store = _stores.get(filepath)
+        if store is None:
+            store = _stores[filepath] = ColumnarStore(filepath)
+        return store
+
+
+def convert_to_columnar(source: str, target: str, batch_size: int = READ_CHUNK_ROWS) -> int:
+    """
+    Copy every reading of an existing data file into a new columnar store.
+
+    Args:
+        source (str): Path of the legacy JSON file or segmented log to read
+        target (str): Path of the columnar store to create
+        batch_size (int): Number of readings written per append
+
+    Returns:
+        int: Number of readings converted
+    """
+    store = ColumnarStore(target)
+    if store.exists():
+        raise FileExistsError(f"Columnar store {target} already exists")
+    store.create()
+
+    converted = 0
+    batch = []
+    for record in open_store(source).iter_records():
+        batch.append(record)
+        if len(batch) == batch_size:
+            store.append_many(batch)
+            converted += len(batch)
+            batch = []
+    store.append_many(batch)
+    return converted + len(batch)
+
+
+# Main execution
+if __name__ == "__main__":
+    source_name = sys.argv[1] if len(sys.argv) > 1 else 'machine_data.json'
+    target_name = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source_name)[0] + COLUMNAR_SUFFIX
+    total = convert_to_columnar(data_file_path(source_name), data_file_path(target_name))
+    print(f"Converted {total} readings from {source_name} to {target_name}")
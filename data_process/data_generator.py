@@ -5,74 +5,221 @@ from datetime import datetime
 import threading
 import os
 
-def generate_machine_data():
+try:
+    from data_process.anomaly_detection import get_anomaly_monitor
+    from data_process.instrumentation import instrumented, metrics
+    from data_process.rolling_window import get_aggregator, update_aggregators
+    from data_process.rollups import get_rollups
+    from data_process.scheduler import get_scheduler
+    from data_process.status_events import get_status_events
+    from data_process.storage import data_file_path, open_writer
+except ImportError:  # Running as a script from inside data_process/
+    from anomaly_detection import get_anomaly_monitor
+    from instrumentation import instrumented, metrics
+    from rolling_window import get_aggregator, update_aggregators
+    from rollups import get_rollups
+    from scheduler import get_scheduler
+    from status_events import get_status_events
+    from storage import data_file_path, open_writer
+
+def generate_machine_data(machine_id=None):
     """
     Generate simulated machine data with random variations.
     
+    Args:
+        machine_id (str): Id of the machine to tag the reading with, if any
+    
     Returns:
         dict: A dictionary containing machine data with timestamp
     """
-    return {
+    data = {
         'timestamp': datetime.now().isoformat(),
         'temperature': round(random.uniform(20.0, 30.0), 2),
         'speed': round(random.uniform(40.0, 60.0), 2),
         'status': random.choice(['IDLE', 'RUNNING', 'PAUSED'])
     }
+    if machine_id is not None:
+        data['machine_id'] = machine_id
+    
+    return data
 
-def save_data_to_json(filename='machine_data.json', max_entries=10):
+def derived_log_updater(filepath):
     """
-    Save generated machine data to a JSON file.
+    Get a function that feeds stored readings to the logs derived from a data file.
+    
+    The derived logs are the file's 1m/1h/1d rollups, its status change
+    events and its anomaly detections. They are loaded here, so they catch
+    up with the readings already stored before any new ones arrive; call
+    the returned function only with readings once they are in storage, so
+    the derived logs never get ahead of it.
     
     Args:
-        filename (str): Name of the file to save data
-        max_entries (int): Maximum number of entries to keep
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+    
+    Returns:
+        Callable[[List[dict]], None]: Updates the derived logs with readings in time order
     """
+    rollups = get_rollups(filepath)
+    status_events = get_status_events(filepath)
+    anomalies = get_anomaly_monitor(filepath)
+    
+    def update(readings):
+        rollups.update_many(readings)
+        status_events.update_many(readings)
+        anomalies.update_many(readings)
+    
+    return update
 
-    # Path to the 'data' folder 
-    base_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_folder = os.path.join(base_directory, 'data')
+@instrumented
+def save_data_to_json(filename='machine_data.json', max_entries=None):
+    """
+    Save generated machine data to the segmented log behind a data file.
+    
+    Each reading is appended as one record, so a write costs the same no
+    matter how much history is kept. The reading is also fed to the rolling
+    aggregator for the file so in-process readers can skip storage, to the
+    file's 1m/1h/1d rollups, to its status change events and to its anomaly
+    detectors.
+    
+    Args:
+        filename (str): Name of the data file; readings go to the log folder
+            of the same name (``machine_data.json`` -> ``data/machine_data/``)
+        max_entries (int): Retention bound of the log: at least this many
+            recent entries are kept and older whole segments are dropped, so
+            fewer than ``2 * max_entries`` remain (see ``SegmentedLog``). The
+            bound is set once per log. None, the default, keeps the whole
+            history; the JSON array file of earlier versions kept exactly the
+            last 10 entries.
+    
+    Raises:
+        ValueError: If the log already has a different retention bound
+    """
+    filepath = data_file_path(filename)
 
-    # Check if the 'data' folder exists, if not, create it
-    os.makedirs(data_folder, exist_ok=True)
+    # Generate and append new data
+    new_data = generate_machine_data()
+    writer = open_writer(filepath, max_records=max_entries)
+    update_derived_logs = derived_log_updater(filepath)
+    writer.append(new_data)
+    metrics.inc('readings_written_total')
+    get_aggregator(filepath).update(new_data)
+    update_derived_logs([new_data])
+    
+    return new_data
 
-    # Full path to the JSON file
-    filepath = os.path.join(data_folder, filename)
+@instrumented
+def save_fleet_data(fleet, filename='machine_data.json', max_entries=None):
+    """
+    Save one tick of readings for every machine in a fleet.
+    
+    The whole tick is generated in one vectorized call and appended to the
+    log in a single write. Each reading also feeds its machine's rolling
+    aggregator.
+    
+    Args:
+        fleet (MachineFleet): Simulated fleet
+        filename (str): Name of the data file
+        max_entries (int): Retention bound of the log, see
+            ``save_data_to_json``; None keeps the whole history
+    
+    Returns:
+        List[dict]: The readings that were saved
+    """
+    filepath = data_file_path(filename)
+    readings = fleet.generate()
+    writer = open_writer(filepath, max_records=max_entries)
+    update_derived_logs = derived_log_updater(filepath)
+    writer.append_many(readings)
+    metrics.inc('readings_written_total', len(readings))
+    update_aggregators(filepath, readings)
+    update_derived_logs(readings)
+    
+    return readings
 
-    try:
-        with open(filepath, 'r') as f:
-            existing_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        existing_data = []
+@instrumented
+def publish_machine_data(buffer, filename='machine_data.json'):
+    """
+    Publish generated machine data to an in-memory reading buffer.
     
-    # Generate and append new data
+    Persistence is left to the buffer's background flusher, so nothing
+    touches the disk here. The rolling aggregator is updated right away;
+    the rollups, status events and anomaly detections are updated by the
+    flusher once the reading is committed (see ``derived_log_updater``).
+    
+    Args:
+        buffer (ReadingBuffer): Buffer shared with the processor
+        filename (str): Name of the data file the buffer is flushed to
+    """
+    filepath = data_file_path(filename)
     new_data = generate_machine_data()
-    existing_data.append(new_data)
+    buffer.publish(new_data)
+    metrics.inc('readings_written_total')
+    get_aggregator(filepath).update(new_data)
+    
+    return new_data
+
+@instrumented
+def publish_fleet_data(fleet, buffer, filename='machine_data.json'):
+    """
+    Publish one tick of readings for every machine in a fleet to a reading buffer.
     
-    # Keep only last max_entries for simplicity and performance reasons
-    existing_data = existing_data[-max_entries:]
+    As with ``publish_machine_data``, the derived logs are updated by the
+    flusher once the readings are committed.
     
-    with open(filepath, 'w') as f:
-        json.dump(existing_data, f, indent=2)
+    Args:
+        fleet (MachineFleet): Simulated fleet
+        buffer (ReadingBuffer): Buffer shared with the processor
+        filename (str): Name of the data file the buffer is flushed to
     
-    return new_data
+    Returns:
+        List[dict]: The readings that were published
+    """
+    filepath = data_file_path(filename)
+    readings = fleet.generate()
+    buffer.publish_many(readings)
+    metrics.inc('readings_written_total', len(readings))
+    update_aggregators(filepath, readings)
+    
+    return readings
 
-def continuous_data_generation(interval=5, filename='machine_data.json'):
+def continuous_data_generation(interval=5, filename='machine_data.json', buffer=None, scheduler=None,
+                               fleet=None):
     """
     Continuously generate and save machine data at specified intervals.
     
     Args:
         interval (int): Interval between data generations in seconds
         filename (str): JSON file to save data
+        buffer (ReadingBuffer): Publish readings to this buffer instead of
+            writing them to storage directly; its ``BufferFlusher`` should
+            update the derived logs, see ``derived_log_updater``
+        scheduler (Scheduler): Scheduler to run on, defaults to the shared one
+        fleet (MachineFleet): Generate a reading for every machine of this
+            fleet on each tick instead of a single anonymous reading
+    
+    Returns:
+        Job: Scheduled job, which can be cancelled
     """
+    if buffer is None:
+        # Catch the derived logs up now rather than in the first tick
+        derived_log_updater(data_file_path(filename))
+    
     def generate_job():
-        save_data_to_json(filename)
-        # Schedule next run
-        threading.Timer(interval, generate_job).start()
+        if fleet is not None:
+            if buffer is None:
+                save_fleet_data(fleet, filename)
+            else:
+                publish_fleet_data(fleet, buffer, filename)
+        elif buffer is None:
+            save_data_to_json(filename)
+        else:
+            publish_machine_data(buffer, filename)
     
-    # Start the first job
-    generate_job()
+    # Runs now and then at a fixed rate on the shared scheduler
+    return (scheduler or get_scheduler()).every(interval, generate_job)
 
 # Main execution
 if __name__ == "__main__":
     print("Starting continuous machine data generation...")
-    continuous_data_generation()
\ No newline at end of file
+    continuous_data_generation()
+    threading.Event().wait()
\ No newline at end of file
@@ -1,9 +1,23 @@
+import collections
 import json
 import time
 import threading
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
 
+try:
+    from data_process.anomaly_detection import latest_anomalies
+    from data_process.instrumentation import instrumented, metrics
+    from data_process.rolling_window import find_aggregator
+    from data_process.scheduler import get_scheduler
+    from data_process.storage import data_file_path, open_store
+except ImportError:  # Running as a script from inside data_process/
+    from anomaly_detection import latest_anomalies
+    from instrumentation import instrumented, metrics
+    from rolling_window import find_aggregator
+    from scheduler import get_scheduler
+    from storage import data_file_path, open_store
+
 def calculate_moving_average(window: List[float], decimals: int = 2) -> float:
     """
     Calculate moving average for a given window of values.
@@ -17,74 +31,196 @@ def calculate_moving_average(window: List[float], decimals: int = 2) -> float:
     """
     return round(sum(window) / len(window), decimals) if window else 0
 
-def process_machine_data(filename: str = 'machine_data.json', window_size: int = 5) -> Dict:
+def build_processed_data(latest: Dict, temperature_average: float, speed_average: float,
+                         anomalies: Optional[List[Dict]] = None) -> Dict:
+    """
+    Build the processed data payload for the latest reading.
+    
+    Args:
+        latest (Dict): Most recent machine reading
+        temperature_average (float): Moving average of the temperature
+        speed_average (float): Moving average of the speed
+        anomalies (List[Dict]): Detections for the latest reading, if known
+    
+    Returns:
+        dict: Processed data with moving averages
+    """
+    processed_data = {
+        'timestamp': latest['timestamp'],
+        'temperature': {
+            'latest': latest['temperature'],
+            'moving_average': temperature_average
+        },
+        'speed': {
+            'latest': latest['speed'],
+            'moving_average': speed_average
+        },
+        'status': latest['status']
+    }
+    if 'machine_id' in latest:
+        processed_data['machine_id'] = latest['machine_id']
+    if anomalies is not None:
+        processed_data['anomalies'] = anomalies
+    
+    return processed_data
+
+@instrumented
+def process_machine_data(filename: str = 'machine_data.json', window_size: int = 5, buffer=None,
+                         machine_id: Optional[str] = None, start: Optional[str] = None,
+                         end: Optional[str] = None) -> Dict:
     """
     Read and process machine data, calculating moving averages.
     
+    Averages come from the in-process rolling aggregator of the data file,
+    or of ``machine_id``, when the generator runs in the same process and
+    has filled the window; otherwise the last ``window_size`` readings are
+    taken from ``buffer`` if given, or read from storage. When ``start`` or
+    ``end`` is given, the window is the last ``window_size`` readings of that
+    time range, read from storage.
+    
+    Without a ``machine_id``, a window holding readings of several machines
+    of a fleet is not averaged; nothing is returned for it.
+    
+    The ``anomalies`` the streaming detectors logged for the latest reading
+    are included as well.
+    
     Args:
         filename (str): JSON file containing machine data
         window_size (int): Number of recent readings for moving average
+        buffer (ReadingBuffer): In-memory buffer shared with the generator
+        machine_id (str): Only process readings of this machine
+        start (str): ISO timestamp of the first reading to consider
+        end (str): ISO timestamp to stop before
     
     Returns:
         dict: Processed data with moving averages
     """
+    filepath = data_file_path(filename)
+    time_range = start is not None or end is not None
 
-    base_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_folder = os.path.join(base_directory, 'data')
-    filepath = os.path.join(data_folder, filename)
+    # Rolling aggregators follow the stream of one machine (or of anonymous readings), not time ranges
+    current = None
+    aggregator = find_aggregator(filepath, machine_id) if not time_range else None
+    if aggregator is not None:
+        current = aggregator.moving_averages(window_size)
+    if current is not None:
+        latest, averages = current
+        return build_processed_data(latest, averages['temperature'], averages['speed'],
+                                    latest_anomalies(filepath, latest))
 
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        print(f"Error: Could not read the data file. Might be in the process of creation.")
-        return {}
+    if buffer is not None and not time_range:
+        data = buffer.latest(window_size, machine_id)
+    else:
+        try:
+            if time_range:
+                # Only the requested range is read; the deque keeps its last window
+                data = list(collections.deque(open_store(filepath).iter_range(start, end, machine_id),
+                                              maxlen=window_size))
+            else:
+                # Only the newest window is read, regardless of how much history is stored
+                data = open_store(filepath).tail(window_size, machine_id)
+        except (FileNotFoundError, json.JSONDecodeError):
+            print(f"Error: Could not read the data file. Might be in the process of creation.")
+            metrics.inc('read_errors_total', function='process_machine_data')
+            return {}
     
     # Ensure we have enough data. Our window size should be less than the total data entries
     if len(data) < window_size:
         print(f"Not enough data. Need at least {window_size} entries.")
         return {}
     
+    # An average across different machines means nothing
+    if machine_id is None and len({entry.get('machine_id') for entry in data}) > 1:
+        print("Readings of several machines. Pass a machine_id to process one of them.")
+        return {}
+    
     # Extract recent data for moving averages
     recent_temperatures = [entry['temperature'] for entry in data[-window_size:]]
     recent_speeds = [entry['speed'] for entry in data[-window_size:]]
     
-    processed_data = {
-        'timestamp': data[-1]['timestamp'],
-        'temperature': {
-            'latest': data[-1]['temperature'],
-            'moving_average': calculate_moving_average(recent_temperatures)
-        },
-        'speed': {
-            'latest': data[-1]['speed'],
-            'moving_average': calculate_moving_average(recent_speeds)
-        },
-        'status': data[-1]['status']
-    }
+    return build_processed_data(
+        data[-1],
+        calculate_moving_average(recent_temperatures),
+        calculate_moving_average(recent_speeds),
+        latest_anomalies(filepath, data[-1])
+    )
 
+@instrumented
+def process_fleet_data(machine_ids: List[str], filename: str = 'machine_data.json',
+                       window_size: int = 5) -> Dict[str, Dict]:
+    """
+    Process the latest readings of every machine of a fleet.
+    
+    Answered from the per-machine rolling aggregators the generator feeds in
+    the same process, so a report costs one lookup per machine instead of a
+    scan of the shared buffer or storage per machine. Machines whose window
+    has not filled yet are left out.
+    
+    Args:
+        machine_ids (List[str]): Machines to report on
+        filename (str): JSON file containing machine data
+        window_size (int): Number of recent readings for moving average
+    
+    Returns:
+        Dict[str, Dict]: Processed data by machine_id, as returned by
+        ``process_machine_data``
+    """
+    filepath = data_file_path(filename)
+    processed = {}
+    for machine_id in machine_ids:
+        aggregator = find_aggregator(filepath, machine_id)
+        current = aggregator.moving_averages(window_size) if aggregator is not None else None
+        if current is not None:
+            latest, averages = current
+            processed[machine_id] = build_processed_data(latest, averages['temperature'], averages['speed'],
+                                                         latest_anomalies(filepath, latest))
+    return processed
 
-    return processed_data
+def data_version(filename: str = 'machine_data.json') -> Optional[tuple]:
+    """
+    Get a token that changes whenever the readings behind a data file change.
+    
+    Args:
+        filename (str): Name of the data file
+    
+    Returns:
+        Optional[tuple]: Storage version (see ``ReadingStore.version``), or
+        None if the file does not exist or its version cannot be told
+    """
+    try:
+        return open_store(data_file_path(filename)).version()
+    except FileNotFoundError:
+        return None
 
-def continuous_data_processing(interval: int = 10, filename: str = 'machine_data.json'):
+def continuous_data_processing(interval: int = 10, filename: str = 'machine_data.json', buffer=None,
+                               scheduler=None, fleet=None):
     """
     Continuously process machine data at specified intervals.
     
     Args:
         interval (int): Interval between data processing in seconds
         filename (str): JSON file containing machine data
+        buffer (ReadingBuffer): Consume readings from this buffer instead of storage
+        scheduler (Scheduler): Scheduler to run on, defaults to the shared one
+        fleet (MachineFleet): Report every machine of this fleet separately
+            (see ``process_fleet_data``)
+    
+    Returns:
+        Job: Scheduled job, which can be cancelled
     """
     def process_job():
-        processed_data = process_machine_data(filename)
+        if fleet is not None:
+            processed_data = process_fleet_data(fleet.machine_ids, filename)
+        else:
+            processed_data = process_machine_data(filename, buffer=buffer)
         if processed_data:
             print(json.dumps(processed_data, indent=2))
-        
-        # Schedule next run
-        threading.Timer(interval, process_job).start()
     
-    # Start the first job
-    process_job()
+    # Runs now and then at a fixed rate on the shared scheduler
+    return (scheduler or get_scheduler()).every(interval, process_job)
 
 # Main execution
 if __name__ == "__main__":
     print("Starting continuous machine data processing...")
-    continuous_data_processing()
\ No newline at end of file
+    continuous_data_processing()
+    threading.Event().wait()
\ No newline at end of file
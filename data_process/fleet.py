@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional outside of fleet simulation
+    np = None
+
+STATUSES = ('IDLE', 'RUNNING', 'PAUSED')
+TEMPERATURE_RANGE = (20.0, 30.0)
+SPEED_RANGE = (40.0, 60.0)
+
+
+def machine_id_for(index: int, prefix: str = 'machine-') -> str:
+    """
+    Build the machine_id of the machine at a given fleet position.
+    """
+    return f'{prefix}{index:05d}'
+
+
+class MachineFleet:
+    """
+    Simulates a fleet of machines, producing every machine's reading per tick.
+
+    Each machine has its own baseline temperature and speed, a slow drift and
+    a noise level. Its offset from the baseline follows a mean-reverting random
+    walk, and its status changes at random with a small probability per tick.
+    All machines are stepped together with NumPy array operations.
+
+    Args:
+        size (int): Number of machines in the fleet
+        seed (int): Seed for reproducible simulations
+        status_change_probability (float): Chance a machine changes status per tick
+        id_prefix (str): Prefix of the generated machine ids
+    """
+
+    def __init__(self, size: int, seed: Optional[int] = None, status_change_probability: float = 0.1,
+                 id_prefix: str = 'machine-'):
+        if np is None:
+            raise ImportError("NumPy is required for fleet simulation")
+        if size <= 0:
+            raise ValueError("Fleet size must be positive")
+
+        self.size = size
+        self.status_change_probability = status_change_probability
+        self.machine_ids = [machine_id_for(i, id_prefix) for i in range(size)]
+
+        self._rng = np.random.default_rng(seed)
+        self._temperature = _MachineSignal(self._rng, size, TEMPERATURE_RANGE)
+        self._speed = _MachineSignal(self._rng, size, SPEED_RANGE)
+        self._status = self._rng.integers(0, len(STATUSES), size)
+
+    def tick(self) -> Dict:
+        """
+        Advance every machine by one reading.
+
+        Returns:
+            Dict: Column arrays ``temperature``, ``speed`` and ``status``
+            (indices into ``STATUSES``), one entry per machine
+        """
+        changes = self._rng.random(self.size) < self.status_change_probability
+        self._status = np.where(changes, self._rng.integers(0, len(STATUSES), self.size), self._status)
+
+        return {
+            'temperature': self._temperature.step(),
+            'speed': self._speed.step(),
+            'status': self._status
+        }
+
+    def generate(self) -> List[Dict]:
+        """
+        Generate one reading per machine, all sharing the same timestamp.
+
+        Returns:
+            List[Dict]: Machine readings with a machine_id each
+        """
+        columns = self.tick()
+        timestamp = datetime.now().isoformat()
+        return [
+            {
+                'machine_id': machine_id,
+                'timestamp': timestamp,
+                'temperature': temperature,
+                'speed': speed,
+                'status': STATUSES[status]
+            }
+            for machine_id, temperature, speed, status in zip(
+                self.machine_ids,
+                columns['temperature'].tolist(),
+                columns['speed'].tolist(),
+                columns['status'].tolist()
+            )
+        ]
+
+
+class _MachineSignal:
+    """
+    Per-machine baseline plus a drifting, mean-reverting noisy offset.
+    """
+
+    REVERSION = 0.9
+
+    def __init__(self, rng, size: int, value_range):
+        low, high = value_range
+        span = high - low
+        self._rng = rng
+        self._low = low
+        self._high = high
+        self._baseline = rng.uniform(low + 0.25 * span, high - 0.25 * span, size)
+        self._drift = rng.normal(0.0, 0.01 * span, size)
+        self._noise = rng.uniform(0.01 * span, 0.05 * span, size)
+        self._offset = np.zeros(size)
+
+    def step(self):
+        shock = self._rng.standard_normal(self._offset.shape[0]) * self._noise
+        self._offset = self.REVERSION * self._offset + self._drift + shock
+        return np.round(np.clip(self._baseline + self._offset, self._low, self._high), 2)
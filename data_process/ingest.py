@@ -0,0 +1,263 @@
+import json
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Numeric checks fall back to plain Python
+    np = None
+
+try:
+    from data_process.anomaly_detection import get_anomaly_monitor
+    from data_process.fleet import STATUSES
+    from data_process.rolling_window import update_aggregators
+    from data_process.rollups import get_rollups
+    from data_process.status_events import get_status_events
+    from data_process.storage import data_file_path, open_writer, timestamp_to_micros
+except ImportError:  # Running as a script from inside data_process/
+    from anomaly_detection import get_anomaly_monitor
+    from fleet import STATUSES
+    from rolling_window import update_aggregators
+    from rollups import get_rollups
+    from status_events import get_status_events
+    from storage import data_file_path, open_writer, timestamp_to_micros
+
+NUMERIC_FIELDS = ('temperature', 'speed')
+FIELDS = ('timestamp',) + NUMERIC_FIELDS + ('status', 'machine_id')
+MAX_BATCH_SIZE = 100000
+# Ingested readings get a data file of their own, since the simulator writes machine_data.json
+INGEST_FILENAME = 'ingested_data.json'
+
+_ingest_lock = threading.Lock()
+
+
+def parse_batch(body: bytes) -> Tuple[List, Dict[int, str]]:
+    """
+    Parse a request body holding a JSON array or newline-delimited JSON.
+
+    Args:
+        body (bytes): Raw request body
+
+    Returns:
+        Tuple[List, Dict[int, str]]: Parsed rows, and parse errors by row index;
+        rows that could not be parsed are None
+
+    Raises:
+        ValueError: If the body is neither a JSON array nor NDJSON
+    """
+    text = body.decode('utf-8')
+    if text.lstrip().startswith('['):
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array of readings")
+        return rows, {}
+
+    rows = []
+    errors = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            errors[len(rows)] = f"Invalid JSON: {e.msg}"
+            rows.append(None)
+    return rows, errors
+
+
+def validate_readings(rows: List, statuses=STATUSES) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Validate a batch of readings column by column.
+
+    Each field is gathered into one column, and every check runs over a
+    whole column at once: with NumPy, the missing-value, type, finiteness
+    and status checks are array operations (``np.isin`` and ``np.isfinite``)
+    and the rejected rows come from one combined mask. A row is reported
+    with the first problem found.
+
+    Args:
+        rows (List): Decoded readings
+        statuses (Iterable[str]): Accepted status values
+
+    Returns:
+        Tuple[List[Dict], List[Dict]]: Valid readings in their original order,
+        restricted to the known fields, and ``{'index', 'error'}`` entries for
+        the rejected rows, ordered by index
+    """
+    valid, _, errors = _validate(rows, statuses)
+    return valid, errors
+
+
+def _validate(rows: List, statuses) -> Tuple[List[Dict], List[int], List[Dict]]:
+    # Also returns the parsed timestamps of the valid readings, so they are parsed only once
+    objects = [isinstance(row, dict) for row in rows]
+    records = [row if ok else {} for row, ok in zip(rows, objects)]
+    columns = {field: [record.get(field) for record in records] for field in FIELDS}
+    parsed = [_parse_timestamp(value) for value in columns['timestamp']]
+
+    find_problems = _find_problems_vectorized if np is not None else _find_problems
+    errors = find_problems(objects, columns, parsed, list(statuses))
+
+    valid = []
+    micros = []
+    machine_ids = columns['machine_id']
+    for i, record in enumerate(records):
+        if i in errors:
+            continue
+        micros.append(parsed[i])
+        reading = {
+            'timestamp': record['timestamp'],
+            'temperature': record['temperature'],
+            'speed': record['speed'],
+            'status': record['status']
+        }
+        if machine_ids[i] is not None:
+            reading['machine_id'] = machine_ids[i]
+        valid.append(reading)
+    return valid, micros, [{'index': i, 'error': errors[i]} for i in sorted(errors)]
+
+
+def _find_problems_vectorized(objects: List[bool], columns: Dict[str, List], parsed: List[Optional[int]],
+                              statuses: List[str]) -> Dict[int, str]:
+    count = len(objects)
+
+    def column(values) -> 'np.ndarray':
+        # fromiter keeps nested lists as single objects, where np.array would unpack them
+        return np.fromiter(values, dtype=object, count=count)
+
+    checks = [(~np.fromiter(objects, dtype=bool, count=count), "Reading must be a JSON object")]
+    timestamps = column(columns['timestamp'])
+    checks.append((np.equal(timestamps, None), "Missing field 'timestamp'"))
+    checks.append((np.equal(column(parsed), None), "'timestamp' must be an ISO 8601 timestamp"))
+
+    for field in NUMERIC_FIELDS:
+        values = column(columns[field])
+        numeric = np.isin(column(type(value) for value in values), (int, float))
+        finite = np.isfinite(np.where(numeric, values, 0.0).astype(np.float64))
+        checks.append((np.equal(values, None), f"Missing field '{field}'"))
+        checks.append((~numeric, f"'{field}' must be a number"))
+        checks.append((~finite, f"'{field}' must be finite"))
+
+    status_values = column(columns['status'])
+    checks.append((np.equal(status_values, None), "Missing field 'status'"))
+    checks.append((~np.isin(status_values, statuses), f"'status' must be one of: {', '.join(statuses)}"))
+
+    machine_ids = column(columns['machine_id'])
+    strings = np.equal(column(type(value) for value in machine_ids), str)
+    checks.append((~(np.equal(machine_ids, None) | strings), "'machine_id' must be a string"))
+
+    # Later checks are applied first, so each row ends up with its first problem
+    first = np.full(count, len(checks))
+    for order in range(len(checks) - 1, -1, -1):
+        first[checks[order][0]] = order
+    rejected = np.flatnonzero(first < len(checks))
+    return {i: checks[order][1] for i, order in zip(rejected.tolist(), first[rejected].tolist())}
+
+
+def _find_problems(objects: List[bool], columns: Dict[str, List], parsed: List[Optional[int]],
+                   statuses: List[str]) -> Dict[int, str]:
+    errors: Dict[int, str] = {}
+
+    def reject(mask: List[bool], message: str) -> None:
+        for i, failed in enumerate(mask):
+            if failed and i not in errors:
+                errors[i] = message
+
+    reject([not ok for ok in objects], "Reading must be a JSON object")
+    reject([value is None for value in columns['timestamp']], "Missing field 'timestamp'")
+    reject([value is None for value in parsed], "'timestamp' must be an ISO 8601 timestamp")
+
+    for field in NUMERIC_FIELDS:
+        values = columns[field]
+        reject([value is None for value in values], f"Missing field '{field}'")
+        numeric = [type(value) in (int, float) for value in values]
+        reject([not ok for ok in numeric], f"'{field}' must be a number")
+        reject([ok and not math.isfinite(value) for value, ok in zip(values, numeric)], f"'{field}' must be finite")
+
+    reject([value is None for value in columns['status']], "Missing field 'status'")
+    reject([not any(value == status for status in statuses) for value in columns['status']],
+           f"'status' must be one of: {', '.join(statuses)}")
+    reject([value is not None and not isinstance(value, str) for value in columns['machine_id']],
+           "'machine_id' must be a string")
+    return errors
+
+
+def ingest_readings(rows: List, filename: str = INGEST_FILENAME,
+                    parse_errors: Optional[Dict[int, str]] = None) -> Dict:
+    """
+    Validate a batch of readings and commit the valid ones in a single append.
+
+    The batch is sorted by timestamp before it is written, because storage
+    expects readings in time order; readings older than the newest stored
+    one are rejected for the same reason. Accepted readings also feed the
+    rolling aggregators, the rollups, the status events and the anomaly
+    detectors of the data file.
+
+    Writers keep the state of a data file and of its derived logs in memory
+    and only serialize the threads of their own process, so the process
+    calling this must be the only writer of the data file. That is why
+    ingest defaults to ``ingested_data.json`` rather than the
+    ``machine_data.json`` the simulator writes.
+
+    Args:
+        rows (List): Decoded readings
+        filename (str): Name of the data file to append to
+        parse_errors (Dict[int, str]): Rows that already failed to parse
+
+    Returns:
+        Dict: Number of ``accepted`` and ``rejected`` readings and the
+        per-row ``errors``
+    """
+    valid, micros, errors = _validate(rows, STATUSES)
+    if parse_errors:
+        # Unparseable rows are None and were rejected as non-objects; report why they failed instead
+        errors = [
+            {'index': error['index'], 'error': parse_errors.get(error['index'], error['error'])}
+            for error in errors
+        ]
+
+    filepath = data_file_path(filename)
+    with _ingest_lock:
+        writer = open_writer(filepath)
+        rollups = get_rollups(filepath)
+        status_events = get_status_events(filepath)
+        anomalies = get_anomaly_monitor(filepath)
+
+        rejected = {error['index'] for error in errors}
+        indices = [i for i in range(len(rows)) if i not in rejected]
+        order = sorted(range(len(valid)), key=micros.__getitem__)
+
+        newest = _newest_micros(writer)
+        accepted = []
+        for position in order:
+            if newest is not None and micros[position] < newest:
+                errors.append({'index': indices[position], 'error': "Reading is older than the newest stored reading"})
+            else:
+                accepted.append(valid[position])
+
+        writer.append_many(accepted)
+        update_aggregators(filepath, accepted)
+        rollups.update_many(accepted)
+        status_events.update_many(accepted)
+        anomalies.update_many(accepted)
+
+    errors.sort(key=lambda error: error['index'])
+    return {'accepted': len(accepted), 'rejected': len(errors), 'errors': errors}
+
+
+def _parse_timestamp(value) -> Optional[int]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return timestamp_to_micros(value)
+    except ValueError:
+        return None
+
+
+def _newest_micros(store) -> Optional[int]:
+    try:
+        newest = store.tail(1)
+    except FileNotFoundError:
+        return None
+    return timestamp_to_micros(newest[0]['timestamp']) if newest else None
@@ -1,30 +1,53 @@
+import argparse
+import signal
 import threading
-from data_generator import continuous_data_generation
+from data_generator import continuous_data_generation, derived_log_updater
 from data_processor import continuous_data_processing
+from fleet import MachineFleet
+from reading_buffer import DEFAULT_MAX_BATCH, BufferFlusher, ReadingBuffer
+from scheduler import Scheduler
+from storage import DURABILITY_MODES, DURABILITY_NONE, data_file_path, open_writer
 
-def main():
+DATA_FILENAME = 'machine_data.json'
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def main(machines=1, durability=DURABILITY_NONE):
     """
     Main application to run data generation and processing concurrently.
+    
+    Both jobs run at a fixed rate on one scheduler and share recent readings
+    through an in-memory ring buffer; a background flusher persists them to
+    storage in group commits, and once more on shutdown (Ctrl+C or SIGTERM),
+    and feeds each commit to the rollups, status events and anomaly detectors.
+    
+    Args:
+        machines (int): Number of machines to simulate; more than one
+            simulates a fleet with a machine_id on each reading
+        durability (str): Durability mode of the data file, see ``SegmentedLog``
     """
     print("Starting Machine Data Monitoring System...")
     
-    # Start data generation in a separate thread
-    data_gen_thread = threading.Thread(
-        target=continuous_data_generation, 
-        kwargs={'interval': 10, 'filename': 'machine_data.json'}
-    )
-    data_gen_thread.daemon = True
+    fleet = MachineFleet(machines) if machines > 1 else None
+    
+    buffer = ReadingBuffer(capacity=max(machines, 1) * 60)
+    filepath = data_file_path(DATA_FILENAME)
+    writer = open_writer(filepath, durability=durability)
+    # Rollups, status events and anomaly detections catch up with storage now and follow its commits
+    flusher = BufferFlusher(buffer, writer, interval=5, max_batch=DEFAULT_MAX_BATCH,
+                            on_commit=derived_log_updater(filepath))
+    flusher.start()
+    signal.signal(signal.SIGTERM, _interrupt)
     
-    # Start data processing in a separate thread
-    data_proc_thread = threading.Thread(
-        target=continuous_data_processing, 
-        kwargs={'interval': 10, 'filename': 'machine_data.json'}
-    )
-    data_proc_thread.daemon = True
+    scheduler = Scheduler()
+    scheduler.start()
     
-    # Start both threads
-    data_gen_thread.start()
-    data_proc_thread.start()
+    # Schedule data generation and processing
+    continuous_data_generation(interval=10, filename=DATA_FILENAME, buffer=buffer, scheduler=scheduler,
+                               fleet=fleet)
+    continuous_data_processing(interval=10, filename=DATA_FILENAME, buffer=buffer, scheduler=scheduler,
+                               fleet=fleet)
     
     # Keep main thread running
     try:
@@ -32,6 +55,13 @@ def main():
             threading.Event().wait()
     except KeyboardInterrupt:
         print("\nStopping Machine Data Monitoring System...")
+        scheduler.stop()
+        flusher.stop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Machine Data Monitoring System")
+    parser.add_argument('--machines', type=int, default=1, help="Number of machines to simulate")
+    parser.add_argument('--durability', choices=DURABILITY_MODES, default=DURABILITY_NONE,
+                        help="When commits are fsynced: never, on an interval or on every commit")
+    args = parser.parse_args()
+    main(args.machines, args.durability)
\ No newline at end of file
@@ -0,0 +1,221 @@
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+try:
+    from data_process.instrumentation import metrics
+    from data_process.storage import ReadingStore
+except ImportError:  # Running as a script from inside data_process/
+    from instrumentation import metrics
+    from storage import ReadingStore
+
+DEFAULT_BUFFER_CAPACITY = 3600
+DEFAULT_MAX_BATCH = 10000
+
+
+class ReadingBuffer:
+    """
+    Thread-safe ring buffer of the most recent readings.
+
+    The generator publishes into it and the processor reads the latest window
+    from it, so neither has to go through the data file. Readings published
+    since the last flush are also queued for ``BufferFlusher`` to persist.
+
+    Args:
+        capacity (int): Number of recent readings kept in memory
+    """
+
+    def __init__(self, capacity: int = DEFAULT_BUFFER_CAPACITY):
+        self.capacity = capacity
+        self._readings: Deque[Dict] = deque(maxlen=capacity)
+        self._pending: List[Dict] = []
+        self._published = 0
+        self._lock = threading.Lock()
+        self._batch_size: Optional[int] = None
+        self._on_batch: Optional[Callable[[], None]] = None
+
+    def on_batch(self, size: int, callback: Callable[[], None]) -> None:
+        """
+        Call a function whenever at least ``size`` readings are pending.
+
+        Args:
+            size (int): Number of pending readings that makes a batch
+            callback (Callable[[], None]): Called from the publishing thread
+        """
+        self._batch_size = size
+        self._on_batch = callback
+
+    def publish(self, reading: Dict) -> None:
+        """
+        Add a new reading.
+
+        Args:
+            reading (Dict): Machine reading
+        """
+        with self._lock:
+            self._readings.append(reading)
+            self._pending.append(reading)
+            self._published += 1
+            full = self._batch_size is not None and len(self._pending) >= self._batch_size
+        if full:
+            self._on_batch()
+
+    def publish_many(self, readings: List[Dict]) -> None:
+        """
+        Add a batch of readings, e.g. one fleet tick.
+
+        Args:
+            readings (List[Dict]): Machine readings, oldest first
+        """
+        with self._lock:
+            self._readings.extend(readings)
+            self._pending.extend(readings)
+            self._published += len(readings)
+            full = self._batch_size is not None and len(self._pending) >= self._batch_size
+        if full:
+            self._on_batch()
+
+    @property
+    def pending(self) -> int:
+        """Number of readings waiting to be flushed."""
+        return len(self._pending)
+
+    def latest(self, count: int, machine_id: Optional[str] = None) -> List[Dict]:
+        """
+        Get the most recent readings, oldest first.
+
+        Args:
+            count (int): Maximum number of readings to return
+            machine_id (str): Only return readings of this machine
+
+        Returns:
+            List[Dict]: Up to ``count`` most recent readings
+        """
+        if count <= 0:
+            return []
+        with self._lock:
+            if machine_id is None:
+                size = len(self._readings)
+                return [self._readings[i] for i in range(max(0, size - count), size)]
+
+            newest_first = []
+            for reading in reversed(self._readings):
+                if reading.get('machine_id') == machine_id:
+                    newest_first.append(reading)
+                    if len(newest_first) == count:
+                        break
+            return newest_first[::-1]
+
+    @property
+    def published(self) -> int:
+        """Total number of readings published so far."""
+        return self._published
+
+    def take_pending(self) -> List[Dict]:
+        """
+        Take the readings published since the previous call.
+
+        Returns:
+            List[Dict]: Readings not yet handed to the flusher, oldest first
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+    def restore_pending(self, readings: List[Dict]) -> None:
+        """
+        Put readings that could not be flushed back in front of the queue.
+
+        Args:
+            readings (List[Dict]): Readings previously returned by ``take_pending``
+        """
+        with self._lock:
+            self._pending[:0] = readings
+
+
+class BufferFlusher:
+    """
+    Background thread that persists buffered readings to a store in group commits.
+
+    Pending readings are committed in a single append once ``max_batch`` of
+    them have accumulated, or ``interval`` seconds after the previous commit,
+    whichever comes first; so the commit rate adapts to the publish rate and
+    no reading waits longer than ``interval``. How far a commit is persisted
+    (OS cache or fsync) is up to the store's durability mode. When a tick
+    has nothing to commit, the store is asked to ``sync`` the commits it has
+    not fsynced yet.
+
+    Args:
+        buffer (ReadingBuffer): Buffer to drain
+        store (ReadingStore): Store receiving the readings
+        interval (float): Maximum seconds between commits
+        max_batch (int): Pending readings that trigger a commit right away,
+            or None to commit on the interval only
+        on_commit (Callable[[List[Dict]], None]): Called with the readings of
+            every successful commit, e.g. to update logs derived from them;
+            a failed commit puts its readings back without calling it
+    """
+
+    def __init__(self, buffer: ReadingBuffer, store: ReadingStore, interval: float = 1.0,
+                 max_batch: Optional[int] = DEFAULT_MAX_BATCH,
+                 on_commit: Optional[Callable[[List[Dict]], None]] = None):
+        self.buffer = buffer
+        self.store = store
+        self.interval = interval
+        self.max_batch = max_batch
+        self.on_commit = on_commit
+        self.commits = 0
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.max_batch is not None:
+            self.buffer.on_batch(self.max_batch, self._wake.set)
+        self._thread = threading.Thread(target=self._run, name='buffer-flusher', daemon=True)
+        self._thread.start()
+
+    def flush(self) -> int:
+        """
+        Persist all pending readings in a single append.
+
+        Returns:
+            int: Number of readings written
+        """
+        pending = self.buffer.take_pending()
+        if not pending:
+            return 0
+        try:
+            with metrics.timer('buffer_commit_duration_seconds'):
+                self.store.append_many(pending)
+        except OSError:
+            self.buffer.restore_pending(pending)
+            raise
+        self.commits += 1
+        metrics.inc('buffer_committed_readings_total', len(pending))
+        if self.on_commit is not None:
+            self.on_commit(pending)
+        return len(pending)
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, then flush and sync whatever is still pending.
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self.store.sync()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                if not self.flush():
+                    self.store.sync()
+            except OSError as e:
+                print(f"Error: Could not flush readings: {e}")
@@ -0,0 +1,214 @@
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    from data_process.fleet import STATUSES
+    from data_process.storage import ReadingStore, micros_to_timestamp, timestamp_to_micros
+except ImportError:  # Running as a script from inside data_process/
+    from fleet import STATUSES
+    from storage import ReadingStore, micros_to_timestamp, timestamp_to_micros
+
+NO_MACHINE = -1
+# Status codes are stored as uint8
+MAX_STATUSES = 256
+
+
+class ReadingBatch:
+    """
+    Readings held column by column in compact typed arrays.
+
+    A reading dict with its ISO timestamp and status strings takes several
+    hundred bytes of objects; here a reading takes 29 bytes: int64
+    microseconds since the epoch, 64-bit temperature and speed, a uint8
+    status code and an int32 machine code. The codes index the ``statuses``
+    and ``machines`` tables of the batch, like the code tables of the
+    columnar store, so each distinct string is held once. The columns support
+    the buffer protocol and can be handed to NumPy without copying.
+
+    A measurement column holds int64 values as long as every reading had an
+    integer there, and is converted to float64 at the first float, so
+    integer readings come back as the ints they were. In a column that mixes
+    both, integers come back as floats of the same value.
+
+    The stored timestamps of the first and last readings are kept as they
+    were, so a period reports them verbatim; ``to_records`` converts back to
+    dicts at the JSON boundary. Parsing every timestamp is the costliest part
+    of packing a reading, so it can be skipped when only the measurements
+    are needed.
+
+    Args:
+        records (Iterable[Dict]): Readings in time order
+        timestamps (bool): Keep the microseconds of every reading; without
+            them ``micros`` is None and readings cannot be converted back
+    """
+
+    __slots__ = ('micros', 'temperature', 'speed', 'status', 'machine', 'statuses', 'machines',
+                 'first', 'last', '_status_codes', '_machine_codes')
+
+    def __init__(self, records: Iterable[Dict] = (), timestamps: bool = True):
+        self.micros: Optional[array] = array('q') if timestamps else None
+        self.temperature = array('q')
+        self.speed = array('q')
+        self.status = array('B')
+        self.machine = array('i')
+        # A reading without a status gets the code of None
+        self.statuses: List[Optional[str]] = list(STATUSES)
+        self.machines: List[str] = []
+        self.first: Optional[str] = None
+        self.last: Optional[str] = None
+        self._status_codes = {status: code for code, status in enumerate(self.statuses)}
+        self._machine_codes: Dict[str, int] = {}
+        self.extend(records)
+
+    def __len__(self) -> int:
+        return len(self.temperature)
+
+    def append(self, record: Dict) -> None:
+        self.extend((record,))
+
+    def extend(self, records: Iterable[Dict]) -> None:
+        """
+        Add readings in time order.
+
+        Args:
+            records (Iterable[Dict]): Machine readings
+
+        Raises:
+            ValueError: If the readings use more than 256 distinct statuses
+        """
+        # Bound methods hoisted out of the loop, it runs once per stored reading
+        micros = self.micros.append if self.micros is not None else None
+        temperature = self.temperature.append
+        speed = self.speed.append
+        status = self.status.append
+        machine = self.machine.append
+        status_codes = self._status_codes
+        machine_codes = self._machine_codes
+        first = timestamp = previous = None
+
+        for record in records:
+            timestamp = record['timestamp']
+            # A fleet tick stores one timestamp for every machine, parse it once
+            if timestamp != previous:
+                if first is None:
+                    first = timestamp
+                previous = timestamp
+                if micros is not None:
+                    timestamp_micros = timestamp_to_micros(timestamp)
+            if micros is not None:
+                micros(timestamp_micros)
+            try:
+                temperature(record['temperature'])
+            except (TypeError, OverflowError):
+                temperature = self._to_floats('temperature', record['temperature'])
+            try:
+                speed(record['speed'])
+            except (TypeError, OverflowError):
+                speed = self._to_floats('speed', record['speed'])
+
+            value = record.get('status')
+            code = status_codes.get(value)
+            if code is None:
+                code = self._add_status(value)
+            status(code)
+
+            machine_id = record.get('machine_id')
+            if machine_id is None:
+                machine(NO_MACHINE)
+            else:
+                code = machine_codes.get(machine_id)
+                if code is None:
+                    code = machine_codes[machine_id] = len(self.machines)
+                    self.machines.append(machine_id)
+                machine(code)
+
+        if timestamp is not None:
+            if self.first is None:
+                self.first = first
+            self.last = timestamp
+
+    def _to_floats(self, field: str, value) -> Callable[[float], None]:
+        # An integer column met a float (or an int beyond int64): convert it and add the value
+        column = array('d', getattr(self, field))
+        column.append(value)
+        setattr(self, field, column)
+        return column.append
+
+    def _add_status(self, status: Optional[str]) -> int:
+        if len(self.statuses) >= MAX_STATUSES:
+            raise ValueError(f"More than {MAX_STATUSES} distinct statuses")
+        code = self._status_codes[status] = len(self.statuses)
+        self.statuses.append(status)
+        return code
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the column buffers in bytes."""
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.micros, self.temperature, self.speed, self.status, self.machine)
+            if column is not None
+        )
+
+    def timestamp(self, index: int) -> str:
+        """
+        ISO timestamp of a reading, rebuilt from its microseconds.
+
+        Raises:
+            TypeError: If the batch was built without timestamps
+        """
+        return micros_to_timestamp(self.micros[index])
+
+    def record(self, index: int) -> Dict:
+        """
+        Convert one reading back into a reading dict.
+        """
+        record = {
+            'timestamp': self.timestamp(index),
+            'temperature': self.temperature[index],
+            'speed': self.speed[index]
+        }
+        status = self.statuses[self.status[index]]
+        if status is not None:
+            record['status'] = status
+        machine = self.machine[index]
+        if machine != NO_MACHINE:
+            record['machine_id'] = self.machines[machine]
+        return record
+
+    def to_records(self) -> List[Dict]:
+        """
+        Convert every reading back into reading dicts.
+        """
+        return [self.record(i) for i in range(len(self))]
+
+
+def read_batch(store: ReadingStore, start: Optional[str] = None, end: Optional[str] = None,
+               machine_id: Optional[str] = None, timestamps: bool = True) -> ReadingBatch:
+    """
+    Read readings from a store straight into a compact batch.
+
+    Each reading is parsed, packed into the batch and dropped, so only the
+    batch stays in memory.
+
+    Args:
+        store (ReadingStore): Store to read
+        start (str): ISO timestamp of the first reading to include
+        end (str): ISO timestamp to stop before
+        machine_id (str): Only read readings of this machine
+        timestamps (bool): Keep the microseconds of every reading, see ``ReadingBatch``
+
+    Returns:
+        ReadingBatch: Readings in time order
+
+    Raises:
+        FileNotFoundError: If the store does not exist
+    """
+    if start is None and end is None:
+        records = (
+            record for record in store.iter_records()
+            if machine_id is None or record.get('machine_id') == machine_id
+        )
+    else:
+        records = store.iter_range(start, end, machine_id)
+    return ReadingBatch(records, timestamps)
@@ -0,0 +1,268 @@
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_WINDOW_SIZES = (5, 60, 3600)
+# Per-machine aggregators skip the 3600-reading window so large fleets stay small in memory
+MACHINE_WINDOW_SIZES = (5, 60)
+DEFAULT_FIELDS = ('temperature', 'speed')
+
+
+class RollingWindow:
+    """
+    Running statistics over the last ``size`` values pushed.
+
+    Values live in a ring buffer. Sum, mean and variance are updated with
+    Welford-style add/remove steps and min/max with monotonic queues, so each
+    push costs O(1) amortized. The running sums are recomputed exactly every
+    time the ring buffer wraps around to keep floating-point drift bounded.
+
+    Args:
+        size (int): Number of most recent values covered by the window
+    """
+
+    def __init__(self, size: int):
+        if size <= 0:
+            raise ValueError("Window size must be positive")
+
+        self.size = size
+        self._values: List[float] = [0.0] * size
+        self._pushed = 0
+        self._count = 0
+        self._total = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min_candidates: Deque[Tuple[int, float]] = deque()
+        self._max_candidates: Deque[Tuple[int, float]] = deque()
+
+    def push(self, value: float) -> None:
+        """
+        Add a value, evicting the oldest one once the window is full.
+
+        Args:
+            value (float): New value
+        """
+        slot = self._pushed % self.size
+        if self._count == self.size:
+            self._remove(self._values[slot])
+        self._values[slot] = value
+        self._add(value)
+
+        seq = self._pushed
+        self._pushed += 1
+        _push_candidate(self._min_candidates, seq, value, self.size, lambda old, new: old >= new)
+        _push_candidate(self._max_candidates, seq, value, self.size, lambda old, new: old <= new)
+
+        if slot == self.size - 1:
+            self._resync()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def total(self) -> float:
+        return self._total
+
+    @property
+    def mean(self) -> float:
+        return self._total / self._count if self._count else 0
+
+    @property
+    def minimum(self) -> Optional[float]:
+        return self._min_candidates[0][1] if self._min_candidates else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return self._max_candidates[0][1] if self._max_candidates else None
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the values in the window."""
+        return max(self._m2 / self._count, 0.0) if self._count else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def snapshot(self, decimals: int = 2) -> Dict:
+        """
+        Summarize the window.
+
+        Args:
+            decimals (int): Number of decimal places to round
+
+        Returns:
+            Dict: Count, sum, average, min, max and variance of the window
+        """
+        return {
+            'count': self._count,
+            'sum': round(self._total, decimals),
+            'average': round(self.mean, decimals),
+            'min': self.minimum,
+            'max': self.maximum,
+            'variance': round(self.variance, decimals)
+        }
+
+    def _add(self, value: float) -> None:
+        self._count += 1
+        self._total += value
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+    def _remove(self, value: float) -> None:
+        self._count -= 1
+        self._total -= value
+        if self._count == 0:
+            self._total = self._mean = self._m2 = 0.0
+            return
+        delta = value - self._mean
+        self._mean -= delta / self._count
+        self._m2 -= delta * (value - self._mean)
+
+    def _resync(self) -> None:
+        values = self._values[:self._count]
+        self._total = sum(values)
+        self._mean = self._total / self._count
+        self._m2 = sum((value - self._mean) ** 2 for value in values)
+
+
+def _push_candidate(candidates: Deque[Tuple[int, float]], seq: int, value: float, size: int, dominated) -> None:
+    while candidates and dominated(candidates[-1][1], value):
+        candidates.pop()
+    candidates.append((seq, value))
+    while candidates[0][0] <= seq - size:
+        candidates.popleft()
+
+
+class RollingAggregator:
+    """
+    Rolling statistics for several reading fields over several window sizes.
+
+    Fed one reading at a time as readings are generated, so consumers can ask
+    for current moving averages without going back to storage.
+
+    Args:
+        window_sizes (Iterable[int]): Window sizes to maintain, in readings
+        fields (Iterable[str]): Numeric reading fields to aggregate
+    """
+
+    def __init__(self, window_sizes: Iterable[int] = DEFAULT_WINDOW_SIZES,
+                 fields: Iterable[str] = DEFAULT_FIELDS):
+        self.window_sizes = tuple(sorted(set(window_sizes)))
+        self.fields = tuple(fields)
+        self.latest: Optional[Dict] = None
+
+        self._lock = threading.Lock()
+        self._windows = {
+            field: {size: RollingWindow(size) for size in self.window_sizes}
+            for field in self.fields
+        }
+
+    def update(self, reading: Dict) -> None:
+        """
+        Feed a new reading into every window.
+
+        Args:
+            reading (Dict): Machine reading
+        """
+        with self._lock:
+            for field, windows in self._windows.items():
+                value = reading[field]
+                for window in windows.values():
+                    window.push(value)
+            self.latest = reading
+
+    def moving_averages(self, window_size: int, decimals: int = 2) -> Optional[Tuple[Dict, Dict[str, float]]]:
+        """
+        Get the latest reading and the moving average of every field.
+
+        Args:
+            window_size (int): Window size to average over
+            decimals (int): Number of decimal places to round
+
+        Returns:
+            Optional[Tuple[Dict, Dict[str, float]]]: Latest reading and averages
+            by field, or None if the window is not tracked or not yet full
+        """
+        with self._lock:
+            if window_size not in self.window_sizes or self.latest is None:
+                return None
+            windows = {field: self._windows[field][window_size] for field in self.fields}
+            if any(window.count < window_size for window in windows.values()):
+                return None
+            averages = {field: round(window.mean, decimals) for field, window in windows.items()}
+            return self.latest, averages
+
+    def snapshot(self, decimals: int = 2) -> Dict:
+        """
+        Summarize every field over every window size.
+
+        Args:
+            decimals (int): Number of decimal places to round
+
+        Returns:
+            Dict: Window statistics keyed by field, then by window size
+        """
+        with self._lock:
+            return {
+                field: {size: window.snapshot(decimals) for size, window in windows.items()}
+                for field, windows in self._windows.items()
+            }
+
+
+_aggregators: Dict[Tuple[str, Optional[str]], RollingAggregator] = {}
+_aggregators_lock = threading.Lock()
+
+
+def get_aggregator(filepath: str, machine_id: Optional[str] = None) -> RollingAggregator:
+    """
+    Get the process-wide rolling aggregator for a data file path.
+
+    Readings without a machine_id share the file's aggregator; every machine
+    of a fleet has its own, over ``MACHINE_WINDOW_SIZES``.
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+        machine_id (str): Machine whose readings the aggregator follows
+
+    Returns:
+        RollingAggregator: Aggregator fed by the generator writing that file
+    """
+    key = (filepath, machine_id)
+    with _aggregators_lock:
+        aggregator = _aggregators.get(key)
+        if aggregator is None:
+            window_sizes = DEFAULT_WINDOW_SIZES if machine_id is None else MACHINE_WINDOW_SIZES
+            aggregator = _aggregators[key] = RollingAggregator(window_sizes)
+        return aggregator
+
+
+def find_aggregator(filepath: str, machine_id: Optional[str] = None) -> Optional[RollingAggregator]:
+    """
+    Get an existing rolling aggregator without creating one.
+
+    Returns:
+        Optional[RollingAggregator]: Aggregator, or None if nothing fed it yet
+    """
+    with _aggregators_lock:
+        return _aggregators.get((filepath, machine_id))
+
+
+def update_aggregators(filepath: str, readings: Iterable[Dict]) -> None:
+    """
+    Feed readings to the aggregator of their machine, or to the file's if they have none.
+
+    Args:
+        filepath (str): Data file path
+        readings (Iterable[Dict]): Machine readings, oldest first
+    """
+    aggregators: Dict[Optional[str], RollingAggregator] = {}
+    for reading in readings:
+        machine_id = reading.get('machine_id')
+        aggregator = aggregators.get(machine_id)
+        if aggregator is None:
+            aggregator = aggregators[machine_id] = get_aggregator(filepath, machine_id)
+        aggregator.update(reading)
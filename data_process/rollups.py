@@ -0,0 +1,454 @@
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from data_process.instrumentation import metrics
+    from data_process.storage import (
+        ReadingStore, SegmentedLog, micros_to_timestamp, open_store, timestamp_to_micros
+    )
+except ImportError:  # Running as a script from inside data_process/
+    from instrumentation import metrics
+    from storage import ReadingStore, SegmentedLog, micros_to_timestamp, open_store, timestamp_to_micros
+
+# Tier name -> bucket width in seconds, finest first. Each width divides the next.
+TIERS = (('1m', 60), ('1h', 3600), ('1d', 86400))
+ROLLUP_SUFFIX = '.rollups'
+FIELDS = ('temperature', 'speed')
+MAX_SERIES_POINTS = 1000
+
+_MICROS_PER_SECOND = 1000000
+
+metrics.describe('rollup_late_readings_total', "Readings left out of the rollups because their bucket was closed")
+
+
+class RollupBucket:
+    """
+    Count, sum, min, max and status histogram of the readings in one time bucket.
+
+    Args:
+        start (int): Bucket start in microseconds since the epoch
+        machine_id (str): Machine the bucket belongs to, if any
+    """
+
+    def __init__(self, start: int, machine_id: Optional[str] = None):
+        self.start = start
+        self.machine_id = machine_id
+        self.count = 0
+        self.first: Optional[str] = None
+        self.last: Optional[str] = None
+        self.fields = {field: {'sum': 0.0, 'min': None, 'max': None} for field in FIELDS}
+        self.statuses: Dict[str, int] = {}
+
+    def add(self, reading: Dict) -> None:
+        """
+        Count a reading into the bucket.
+
+        Args:
+            reading (Dict): Machine reading
+        """
+        self.count += 1
+        if self.first is None:
+            self.first = reading['timestamp']
+        self.last = reading['timestamp']
+        for field, stats in self.fields.items():
+            value = reading[field]
+            stats['sum'] += value
+            if stats['min'] is None or value < stats['min']:
+                stats['min'] = value
+            if stats['max'] is None or value > stats['max']:
+                stats['max'] = value
+        self.statuses[reading['status']] = self.statuses.get(reading['status'], 0) + 1
+
+    def merge(self, other: 'RollupBucket') -> 'RollupBucket':
+        """
+        Combine with the bucket of a later or concurrent set of readings.
+
+        Args:
+            other (RollupBucket): Bucket to fold in
+
+        Returns:
+            RollupBucket: This instance, now covering both
+        """
+        if not other.count:
+            return self
+        self.count += other.count
+        if self.first is None or timestamp_to_micros(other.first) < timestamp_to_micros(self.first):
+            self.first = other.first
+        if self.last is None or timestamp_to_micros(other.last) > timestamp_to_micros(self.last):
+            self.last = other.last
+        for field, stats in self.fields.items():
+            theirs = other.fields[field]
+            stats['sum'] += theirs['sum']
+            if stats['min'] is None or theirs['min'] < stats['min']:
+                stats['min'] = theirs['min']
+            if stats['max'] is None or theirs['max'] > stats['max']:
+                stats['max'] = theirs['max']
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        return self
+
+    def to_record(self) -> Dict:
+        """
+        Serialize the bucket as stored in a tier log.
+        """
+        record = {
+            'timestamp': micros_to_timestamp(self.start),
+            'count': self.count,
+            'first': self.first,
+            'last': self.last,
+            'statuses': dict(self.statuses)
+        }
+        record.update({field: dict(stats) for field, stats in self.fields.items()})
+        if self.machine_id is not None:
+            record['machine_id'] = self.machine_id
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict) -> 'RollupBucket':
+        """
+        Rebuild a bucket from its stored record.
+        """
+        bucket = cls(timestamp_to_micros(record['timestamp']), record.get('machine_id'))
+        bucket.count = record['count']
+        bucket.first = record['first']
+        bucket.last = record['last']
+        bucket.statuses = dict(record['statuses'])
+        bucket.fields = {field: dict(record[field]) for field in FIELDS}
+        return bucket
+
+    def summary(self, decimals: int = 2) -> Dict:
+        """
+        Summarize the bucket like ``analyze_data`` does, without anomalies.
+
+        Args:
+            decimals (int): Number of decimal places of the averages
+
+        Returns:
+            Dict: Average, min, max and number of readings per field, the
+            status histogram and the period covered
+        """
+        summary = {
+            field: {
+                'average': round(stats['sum'] / self.count, decimals) if self.count else 0,
+                'min': stats['min'],
+                'max': stats['max'],
+                'total_readings': self.count
+            }
+            for field, stats in self.fields.items()
+        }
+        summary['statuses'] = dict(self.statuses)
+        summary['period'] = {'start': self.first, 'end': self.last}
+        return summary
+
+
+class Rollups:
+    """
+    Pre-aggregated 1-minute, 1-hour and 1-day buckets of a data file.
+
+    Every reading is counted into the open bucket of its machine in each tier.
+    When a reading for a later bucket arrives, the tier's open buckets are
+    closed and appended to the tier's segmented log, so each tier log holds
+    complete buckets in time order. Readings must arrive in time order, as
+    storage keeps them: a reading arriving late, for a bucket of the finest
+    tier that is already closed, is left out of every tier and counted in
+    ``late_readings`` rather than counted into the wrong bucket.
+
+    Queries cover a time range with the coarsest complete buckets available
+    and fall back to finer tiers, then to the raw readings, only for the
+    edges of the range and for the time after the last closed bucket. The
+    answers are therefore exact for readings stored in time order, and a
+    month-long range reads about thirty daily buckets plus a few hundred
+    finer ones.
+
+    Args:
+        directory (str): Folder holding one segmented log per tier
+        tiers (Iterable[Tuple[str, int]]): Tier names and bucket widths in
+            seconds, finest first
+    """
+
+    def __init__(self, directory: str, tiers: Iterable[Tuple[str, int]] = TIERS):
+        self.directory = directory
+        self.tiers = tuple(tiers)
+        self.widths = {name: seconds * _MICROS_PER_SECOND for name, seconds in self.tiers}
+
+        self._lock = threading.Lock()
+        self._logs = {name: SegmentedLog(os.path.join(directory, name)) for name, _ in self.tiers}
+        self._current: Dict[str, Optional[int]] = {name: None for name, _ in self.tiers}
+        self._open: Dict[str, Dict[Optional[str], RollupBucket]] = {name: {} for name, _ in self.tiers}
+        self.late_readings = 0
+
+    def update(self, reading: Dict) -> None:
+        """
+        Count a new reading into every tier.
+
+        Args:
+            reading (Dict): Machine reading
+        """
+        self.update_many([reading])
+
+    def update_many(self, readings: List[Dict]) -> None:
+        """
+        Count new readings into every tier, closing the buckets they leave behind.
+
+        Args:
+            readings (List[Dict]): Machine readings, oldest first
+        """
+        with self._lock:
+            self._update(readings, {name: None for name in self.widths})
+
+    def _update(self, readings: Iterable[Dict], resume: Dict[str, Optional[int]]) -> None:
+        closed = {name: [] for name in self.widths}
+        late = 0
+        finest = self.tiers[0][0]
+        for reading in readings:
+            micros = timestamp_to_micros(reading['timestamp'])
+            # Behind the open bucket of the finest tier means behind a closed bucket; the reading is
+            # left out of every tier, so coarser tiers still add up to the finer ones
+            current = self._current[finest]
+            if current is not None and micros < current and (resume[finest] is None or micros >= resume[finest]):
+                late += 1
+                continue
+            for name, width in self.widths.items():
+                if resume[name] is not None and micros < resume[name]:
+                    continue
+                start = micros - micros % width
+                if self._current[name] is None or start > self._current[name]:
+                    closed[name].extend(self._close(name))
+                    self._current[name] = start
+                machine_id = reading.get('machine_id')
+                bucket = self._open[name].get(machine_id)
+                if bucket is None:
+                    bucket = self._open[name][machine_id] = RollupBucket(self._current[name], machine_id)
+                bucket.add(reading)
+        for name, records in closed.items():
+            self._logs[name].append_many(records)
+        if late:
+            self.late_readings += late
+            metrics.inc('rollup_late_readings_total', late)
+
+    def _close(self, name: str) -> List[Dict]:
+        buckets = self._open[name]
+        self._open[name] = {}
+        return [buckets[key].to_record() for key in sorted(buckets, key=lambda key: key or '')]
+
+    def catch_up(self, store: ReadingStore) -> None:
+        """
+        Rebuild the open buckets, and any missing closed ones, from raw readings.
+
+        Each tier resumes after its last closed bucket, so a restarted writer
+        recovers the buckets it had open and a data file written before
+        rollups existed is backfilled in one pass.
+
+        Args:
+            store (ReadingStore): Raw readings of the data file
+        """
+        with self._lock:
+            resume = {name: self.covered_until(name) for name in self.widths}
+            known = [micros for micros in resume.values() if micros is not None]
+            start = min(known) if len(known) == len(resume) else None
+            try:
+                readings = store.iter_range(micros_to_timestamp(start) if start is not None else None)
+                self._update(readings, resume)
+            except FileNotFoundError:
+                pass
+
+    def covered_until(self, name: str) -> Optional[int]:
+        """
+        End of the last closed bucket of a tier.
+
+        Args:
+            name (str): Tier name, e.g. ``1h``
+
+        Returns:
+            Optional[int]: Microseconds since the epoch, or None if the tier
+            has no closed bucket yet
+        """
+        try:
+            last = self._logs[name].tail(1)
+        except FileNotFoundError:
+            return None
+        if not last:
+            return None
+        return timestamp_to_micros(last[0]['timestamp']) + self.widths[name]
+
+    def summarize(self, store: ReadingStore, start: Optional[str] = None, end: Optional[str] = None,
+                  machine_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Summarize the readings with ``start <= timestamp < end``.
+
+        Args:
+            store (ReadingStore): Raw readings, read only where no bucket applies
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only include readings of this machine
+
+        Returns:
+            Optional[Dict]: Summary as returned by ``RollupBucket.summary``,
+            or None if the range holds no readings
+        """
+        total = RollupBucket(0)
+        for bucket in self._iter_buckets(store, start, end, machine_id, len(self.tiers) - 1):
+            total.merge(bucket)
+        return total.summary() if total.count else None
+
+    def series(self, store: ReadingStore, name: str, start: Optional[str] = None, end: Optional[str] = None,
+               machine_id: Optional[str] = None) -> List[Dict]:
+        """
+        Bucket the readings with ``start <= timestamp < end`` at one tier's width.
+
+        Buckets of every machine are merged unless ``machine_id`` is given.
+        The buckets at the edges of the range and after the tier's last
+        closed bucket are built from finer tiers and raw readings.
+
+        Args:
+            store (ReadingStore): Raw readings, read only where no bucket applies
+            name (str): Tier name, e.g. ``1h``
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only include readings of this machine
+
+        Returns:
+            List[Dict]: Bucket records, oldest first
+        """
+        if name not in self.widths:
+            raise ValueError(f"Unknown rollup tier '{name}'")
+        width = self.widths[name]
+        level = [tier for tier, _ in self.tiers].index(name)
+
+        grouped: Dict[int, RollupBucket] = {}
+        for bucket in self._iter_buckets(store, start, end, machine_id, level):
+            key = bucket.start - bucket.start % width
+            if key not in grouped:
+                grouped[key] = RollupBucket(key, machine_id)
+            grouped[key].merge(bucket)
+        return [grouped[key].to_record() for key in sorted(grouped)]
+
+    def choose_tier(self, start: Optional[str], end: Optional[str]) -> str:
+        """
+        Pick the finest tier that charts a range in at most ``MAX_SERIES_POINTS`` buckets.
+
+        Open-ended ranges use the coarsest tier.
+        """
+        if start is None or end is None:
+            return self.tiers[-1][0]
+        span = timestamp_to_micros(end) - timestamp_to_micros(start)
+        for name, width in self.widths.items():
+            if span <= width * MAX_SERIES_POINTS:
+                return name
+        return self.tiers[-1][0]
+
+    def _iter_buckets(self, store: ReadingStore, start: Optional[str], end: Optional[str],
+                      machine_id: Optional[str], level: int) -> Iterator[RollupBucket]:
+        covered = {name: self.covered_until(name) for name in self.widths}
+        start_micros = timestamp_to_micros(start) if start is not None else 0
+        end_micros = timestamp_to_micros(end) if end is not None else None
+
+        for name, first, last in self._cover(start_micros, end_micros, level, covered):
+            first_timestamp = micros_to_timestamp(first)
+            last_timestamp = micros_to_timestamp(last) if last is not None else None
+            if name is None:
+                try:
+                    for reading in store.iter_range(first_timestamp, last_timestamp, machine_id):
+                        bucket = RollupBucket(timestamp_to_micros(reading['timestamp']), machine_id)
+                        bucket.add(reading)
+                        yield bucket
+                except FileNotFoundError:
+                    continue
+            else:
+                for record in self._logs[name].iter_range(first_timestamp, last_timestamp, machine_id):
+                    yield RollupBucket.from_record(record)
+
+    def _cover(self, start: int, end: Optional[int], level: int,
+               covered: Dict[str, Optional[int]]) -> List[Tuple[Optional[str], int, Optional[int]]]:
+        # Split [start, end) into (tier, first, last) pieces, coarsest buckets first; tier None is raw data
+        if end is not None and start >= end:
+            return []
+        if level < 0:
+            return [(None, start, end)]
+
+        name = self.tiers[level][0]
+        width = self.widths[name]
+        first = -(-start // width) * width
+        last = covered[name]
+        if last is not None and end is not None:
+            last = min(last, end - end % width)
+        if last is None or first >= last:
+            return self._cover(start, end, level - 1, covered)
+        return (
+            self._cover(start, first, level - 1, covered)
+            + [(name, first, last)]
+            + self._cover(last, end, level - 1, covered)
+        )
+
+
+_rollups: Dict[str, Rollups] = {}
+_rollups_lock = threading.Lock()
+
+
+def rollup_directory(filepath: str) -> str:
+    """
+    Map a data file path such as ``data/machine_data.json`` to its rollup folder.
+    """
+    return filepath + ROLLUP_SUFFIX
+
+
+def get_rollups(filepath: str) -> Rollups:
+    """
+    Get the process-wide rollup writer for a data file path.
+
+    The writer catches up with the raw readings already stored the first time
+    it is requested, so get it before appending new readings.
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+
+    Returns:
+        Rollups: Rollups fed by the generator writing that file
+    """
+    with _rollups_lock:
+        rollups = _rollups.get(filepath)
+        if rollups is None:
+            rollups = _rollups[filepath] = Rollups(rollup_directory(filepath))
+            rollups.catch_up(open_store(filepath))
+        return rollups
+
+
+def open_rollups(filepath: str) -> Rollups:
+    """
+    Get the rollups of a data file path for reading.
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+
+    Returns:
+        Rollups: The in-process writer if there is one, otherwise a reader
+    """
+    return _rollups.get(filepath) or Rollups(rollup_directory(filepath))
+
+
+def query_rollups(filepath: str, start: Optional[str] = None, end: Optional[str] = None,
+                  machine_id: Optional[str] = None, resolution: Optional[str] = None) -> Dict:
+    """
+    Chart and summarize a time range of a data file from its rollups.
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+        start (str): ISO timestamp of the first reading to include
+        end (str): ISO timestamp to stop before
+        machine_id (str): Only include readings of this machine
+        resolution (str): Tier to bucket by (``1m``, ``1h`` or ``1d``),
+            chosen from the length of the range if not given
+
+    Returns:
+        Dict: The ``resolution`` used, its ``buckets`` and a ``summary`` of
+        the whole range (None if the range holds no readings)
+    """
+    rollups = open_rollups(filepath)
+    store = open_store(filepath)
+    resolution = resolution or rollups.choose_tier(start, end)
+    return {
+        'resolution': resolution,
+        'buckets': rollups.series(store, resolution, start, end, machine_id),
+        'summary': rollups.summarize(store, start, end, machine_id)
+    }
@@ -0,0 +1,200 @@
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+from typing import Callable, List, Optional
+
+try:
+    from data_process.instrumentation import metrics
+except ImportError:  # Running as a script from inside data_process/
+    from instrumentation import metrics
+
+DEFAULT_WORKERS = 4
+
+
+class Job:
+    """
+    A periodic job registered with a ``Scheduler``.
+
+    Runs are planned at a fixed rate from the first run (``start + k * interval``),
+    so the time a run takes does not push the following runs back. A run that
+    comes due while the previous one is still executing, or that was missed
+    entirely, is skipped and counted in ``overruns``.
+
+    Args:
+        func (Callable): Function to call on every run
+        interval (float): Seconds between runs
+        jitter (float): Upper bound of a random delay added to each run
+        name (str): Name used in error messages
+    """
+
+    def __init__(self, func: Callable, interval: float, jitter: float = 0.0, name: Optional[str] = None):
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.name = name or getattr(func, '__name__', 'job')
+        self.runs = 0
+        self.overruns = 0
+        self.cancelled = False
+
+        self._due = 0.0
+        self._running = False
+
+    def cancel(self) -> None:
+        """Stop scheduling further runs of this job."""
+        self.cancelled = True
+
+    def _fire_time(self) -> float:
+        return self._due + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _advance(self, now: float) -> None:
+        self._due += self.interval
+        if self._due <= now:
+            missed = int((now - self._due) // self.interval) + 1
+            self._due += missed * self.interval
+            self.overruns += missed
+            metrics.inc('scheduler_job_skipped_total', missed, job=self.name)
+
+
+class Scheduler:
+    """
+    Runs many periodic jobs from one timing loop and a small worker pool.
+
+    A single thread keeps the jobs in a heap ordered by their next run time
+    and hands due jobs to a fixed set of worker threads, so no thread is
+    created or destroyed per tick.
+
+    Args:
+        max_workers (int): Number of worker threads executing jobs
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self.max_workers = max_workers
+
+        self._heap: List = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._work: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+
+    def every(self, interval: float, func: Callable, *args, jitter: float = 0.0,
+              run_now: bool = True, name: Optional[str] = None, **kwargs) -> Job:
+        """
+        Register a function to run periodically.
+
+        Args:
+            interval (float): Seconds between runs
+            func (Callable): Function to call
+            jitter (float): Upper bound of a random delay added to each run
+            run_now (bool): Run immediately instead of after the first interval
+            name (str): Name used in error messages
+
+        Returns:
+            Job: Handle that can be used to cancel the job
+        """
+        target = (lambda: func(*args, **kwargs)) if args or kwargs else func
+        job = Job(target, interval, jitter=jitter, name=name or getattr(func, '__name__', None))
+        job._due = time.monotonic() + (0 if run_now else interval)
+
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("Scheduler has been stopped")
+            heapq.heappush(self._heap, (job._fire_time(), next(self._sequence), job))
+            self._condition.notify()
+        return job
+
+    def start(self) -> None:
+        """Start the timing loop and the worker threads."""
+        if self._threads:
+            return
+        self._threads.append(threading.Thread(target=self._loop, name='scheduler', daemon=True))
+        for i in range(self.max_workers):
+            self._threads.append(threading.Thread(target=self._worker, name=f'scheduler-worker-{i}', daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Stop scheduling new runs and shut the worker threads down.
+
+        Args:
+            wait (bool): Wait for runs already in progress to finish
+        """
+        with self._condition:
+            self._stopped = True
+            self._heap.clear()
+            self._condition.notify()
+        for _ in range(self.max_workers):
+            self._work.put(None)
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+    def _loop(self) -> None:
+        with self._condition:
+            while not self._stopped:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                fire_time, _, job = self._heap[0]
+                now = time.monotonic()
+                if fire_time > now:
+                    self._condition.wait(fire_time - now)
+                    continue
+
+                heapq.heappop(self._heap)
+                if job.cancelled:
+                    continue
+
+                if job._running:
+                    job.overruns += 1
+                    metrics.inc('scheduler_job_skipped_total', job=job.name)
+                else:
+                    job._running = True
+                    self._work.put(job)
+
+                job._advance(now)
+                heapq.heappush(self._heap, (job._fire_time(), next(self._sequence), job))
+
+    def _worker(self) -> None:
+        while True:
+            job = self._work.get()
+            if job is None:
+                return
+            started = time.perf_counter()
+            try:
+                job.func()
+            except Exception as e:
+                print(f"Error: Scheduled job '{job.name}' failed: {e}")
+                metrics.inc('scheduler_job_failures_total', job=job.name)
+            finally:
+                metrics.observe('scheduler_job_duration_seconds', time.perf_counter() - started, job=job.name)
+                job.runs += 1
+                job._running = False
+
+
+_default_scheduler: Optional[Scheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """
+    Get the process-wide scheduler, starting it on first use.
+
+    Returns:
+        Scheduler: Shared scheduler
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = Scheduler()
+            _default_scheduler.start()
+        return _default_scheduler
@@ -0,0 +1,358 @@
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from data_process.storage import (
+        DURABILITY_COMMIT, DURABILITY_INTERVAL, DURABILITY_MODES, DURABILITY_NONE, SQLITE_SUFFIX, ReadingStore,
+        data_file_path, open_store, timestamp_to_micros
+    )
+except ImportError:  # Running as a script from inside data_process/
+    from storage import (
+        DURABILITY_COMMIT, DURABILITY_INTERVAL, DURABILITY_MODES, DURABILITY_NONE, SQLITE_SUFFIX, ReadingStore,
+        data_file_path, open_store, timestamp_to_micros
+    )
+
+SQLITE_TIMEOUT = 10.0
+CONVERT_BATCH_SIZE = 65536
+
+# Numeric fields that aggregates can be pushed down for
+FIELDS = ('temperature', 'speed')
+
+_COLUMNS = 'timestamp, temperature, speed, status, machine_id'
+
+# How far a commit is persisted in WAL mode, by durability mode
+_SYNCHRONOUS = {
+    DURABILITY_NONE: 'OFF',
+    DURABILITY_INTERVAL: 'NORMAL',
+    DURABILITY_COMMIT: 'FULL'
+}
+
+
+class SqliteStore(ReadingStore):
+    """
+    Readings stored in an embedded SQLite database.
+
+    Every ``append_many`` call is one transaction. The database runs in WAL
+    mode, so any number of reader processes (e.g. API workers) query it
+    while a single writer appends, without waiting on each other. Readings
+    are indexed by time and by ``(machine_id, time)``, so time-range and
+    per-machine reads are index lookups, and ``aggregate`` and
+    ``find_deviations`` compute statistics inside SQLite without loading
+    rows into Python. Timestamps are stored as given and as microseconds
+    since the epoch, which the indexes use.
+
+    Args:
+        path (str): Database file, created on the first append
+        max_records (int): Keep at most this many of the newest records
+        durability (str): ``none``, ``interval`` or ``commit``, mapped to
+            SQLite's ``synchronous`` setting (see ``SegmentedLog``)
+    """
+
+    def __init__(self, path: str, max_records: Optional[int] = None, durability: str = DURABILITY_NONE):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}. Use one of: {', '.join(DURABILITY_MODES)}")
+
+        self.path = path
+        self.max_records = max_records
+        self.durability = durability
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = False
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if not self.exists():
+                raise FileNotFoundError(self.path)
+            connection = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _query(self, query: str, parameters: Sequence = ()) -> sqlite3.Cursor:
+        try:
+            return self._connection().execute(query, parameters)
+        except sqlite3.OperationalError as e:
+            # The writer has created the file but not the table yet
+            if 'no such table' in str(e):
+                raise FileNotFoundError(self.path) from e
+            raise
+
+    def create(self) -> None:
+        """
+        Create the database and its indexes if they do not exist yet.
+        """
+        with self._lock:
+            self._create()
+
+    def _create(self) -> None:
+        if self._created:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Readers only connect to existing files, so create it here
+        open(self.path, 'ab').close()
+        with self._connection() as connection:
+            # Measurements have no declared type, so integers stay INTEGER and floats REAL
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS readings ('
+                'id INTEGER PRIMARY KEY, micros INTEGER NOT NULL, timestamp TEXT NOT NULL, '
+                'temperature NOT NULL, speed NOT NULL, status TEXT NOT NULL, machine_id TEXT)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS readings_time ON readings (micros)')
+            connection.execute('CREATE INDEX IF NOT EXISTS readings_machine_time ON readings (machine_id, micros)')
+        self._created = True
+
+    def append_many(self, records: List[Dict]) -> None:
+        """
+        Insert readings in a single transaction, then apply retention.
+
+        Args:
+            records (List[Dict]): Machine readings to persist, oldest first
+        """
+        if not records:
+            return
+
+        rows = [
+            (timestamp_to_micros(record['timestamp']), record['timestamp'], record['temperature'],
+             record['speed'], record['status'], record.get('machine_id'))
+            for record in records
+        ]
+        with self._lock:
+            self._create()
+            connection = self._connection()
+            connection.execute(f'PRAGMA synchronous={_SYNCHRONOUS[self.durability]}')
+            with connection:
+                connection.executemany(
+                    'INSERT INTO readings (micros, timestamp, temperature, speed, status, machine_id) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+                if self.max_records is not None:
+                    connection.execute(
+                        'DELETE FROM readings WHERE id <= (SELECT MAX(id) FROM readings) - ?', (self.max_records,)
+                    )
+
+    def sync(self) -> None:
+        """
+        Checkpoint the write-ahead log into the database file, which fsyncs both.
+        """
+        if self.durability != DURABILITY_NONE and self.exists():
+            with self._lock:
+                self._query('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+
+    def version(self) -> Optional[tuple]:
+        """
+        Version token from the smallest and largest row ids.
+
+        Appends raise the largest id and retention the smallest, and both are
+        read from the ends of the primary key without scanning.
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        return tuple(self._query('SELECT MIN(id), MAX(id) FROM readings').fetchone())
+
+    def iter_records(self) -> Iterator[Dict]:
+        cursor = self._query(f'SELECT {_COLUMNS} FROM readings ORDER BY id')
+        return (_record(row) for row in cursor)
+
+    def read_all(self, machine_id: Optional[str] = None) -> List[Dict]:
+        if machine_id is None:
+            return list(self.iter_records())
+        return self.read_range(machine_id=machine_id)
+
+    def tail(self, count: int, machine_id: Optional[str] = None) -> List[Dict]:
+        """
+        Read the newest readings with one indexed query, oldest first.
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        if count <= 0:
+            return []
+        if machine_id is None:
+            cursor = self._query(f'SELECT {_COLUMNS} FROM readings ORDER BY id DESC LIMIT ?', (count,))
+        else:
+            cursor = self._query(
+                f'SELECT {_COLUMNS} FROM readings WHERE machine_id = ? ORDER BY micros DESC, id DESC LIMIT ?',
+                (machine_id, count)
+            )
+        return [_record(row) for row in cursor.fetchall()[::-1]]
+
+    def iter_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                   machine_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate over the readings with ``start <= timestamp < end``, oldest first.
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        where, parameters = _where(start, end, machine_id)
+        cursor = self._query(f'SELECT {_COLUMNS} FROM readings{where} ORDER BY micros, id', parameters)
+        return (_record(row) for row in cursor)
+
+    def aggregate(self, start: Optional[str] = None, end: Optional[str] = None,
+                  machine_id: Optional[str] = None, fields: Tuple[str, ...] = FIELDS) -> Optional[Dict]:
+        """
+        Compute count, sum, min and max of numeric fields inside SQLite.
+
+        Args:
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only include readings of this machine
+            fields (Tuple[str, ...]): Fields to aggregate
+
+        Returns:
+            Optional[Dict]: ``{'count', 'first', 'last', <field>: {'sum', 'min', 'max'}}``,
+            with the timestamps of the first and last reading, or None if no
+            reading matches
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        _check_fields(fields)
+        where, parameters = _where(start, end, machine_id)
+        columns = ', '.join(f'SUM({field}), MIN({field}), MAX({field})' for field in fields)
+        row = self._query(f'SELECT COUNT(*), {columns} FROM readings{where}', parameters).fetchone()
+        if not row[0]:
+            return None
+
+        result = {'count': row[0]}
+        for i, field in enumerate(fields):
+            result[field] = {'sum': row[1 + 3 * i], 'min': row[2 + 3 * i], 'max': row[3 + 3 * i]}
+        for key, order in (('first', 'ASC'), ('last', 'DESC')):
+            result[key] = self._query(
+                f'SELECT timestamp FROM readings{where} ORDER BY micros {order}, id {order} LIMIT 1', parameters
+            ).fetchone()[0]
+        return result
+
+    def find_deviations(self, field: str, average: float, threshold: float, start: Optional[str] = None,
+                        end: Optional[str] = None, machine_id: Optional[str] = None) -> List[Tuple[int, float]]:
+        """
+        Find the readings whose value deviates from an average by more than a share of it.
+
+        The deviation is ``abs(value - average) / average``, as in
+        ``detect_anomalies``; only the matching rows leave SQLite.
+
+        Args:
+            field (str): Numeric field to check
+            average (float): Average to compare with
+            threshold (float): Share of the average to consider a deviation
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only include readings of this machine
+
+        Returns:
+            List[Tuple[int, float]]: ``(index, value)`` pairs, where ``index`` is
+            the position of the reading among the selected readings
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        _check_fields((field,))
+        where, parameters = _where(start, end, machine_id)
+        cursor = self._query(
+            f'SELECT position, value FROM ('
+            f'SELECT ROW_NUMBER() OVER (ORDER BY micros, id) - 1 AS position, {field} AS value '
+            f'FROM readings{where}) WHERE ABS(value - ?) / ? > ? ORDER BY position',
+            list(parameters) + [average, average, threshold]
+        )
+        return cursor.fetchall()
+
+
+def _record(row: Tuple) -> Dict:
+    timestamp, temperature, speed, status, machine_id = row
+    record = {'timestamp': timestamp, 'temperature': temperature, 'speed': speed, 'status': status}
+    if machine_id is not None:
+        record['machine_id'] = machine_id
+    return record
+
+
+def _where(start: Optional[str], end: Optional[str], machine_id: Optional[str]) -> Tuple[str, List]:
+    clauses, parameters = [], []
+    if machine_id is not None:
+        clauses.append('machine_id = ?')
+        parameters.append(machine_id)
+    if start is not None:
+        clauses.append('micros >= ?')
+        parameters.append(timestamp_to_micros(start))
+    if end is not None:
+        clauses.append('micros < ?')
+        parameters.append(timestamp_to_micros(end))
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), parameters
+
+
+def _check_fields(fields: Tuple[str, ...]) -> None:
+    # Field names are part of the query text, so only known columns are allowed
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Use any of: {', '.join(FIELDS)}")
+
+
+_stores: Dict[str, SqliteStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_sqlite(path: str) -> SqliteStore:
+    """
+    Get the SQLite store at a path, shared per process so each thread keeps one connection.
+
+    Args:
+        path (str): Database file, e.g. ``data/machine_data.sqlite``
+
+    Returns:
+        SqliteStore: Store for the given path
+    """
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = SqliteStore(path)
+        return store
+
+
+def convert_to_sqlite(source: str, target: str, batch_size: int = CONVERT_BATCH_SIZE) -> int:
+    """
+    Copy every reading of an existing data file into a new SQLite store.
+
+    Args:
+        source (str): Path of the data file to read (segmented log, legacy
+            JSON file or columnar store)
+        target (str): Path of the SQLite database to create
+        batch_size (int): Number of readings inserted per transaction
+
+    Returns:
+        int: Number of readings converted
+    """
+    store = SqliteStore(target)
+    if store.exists():
+        raise FileExistsError(f"SQLite store {target} already exists")
+    store.create()
+
+    converted = 0
+    batch = []
+    for record in open_store(source).iter_records():
+        batch.append(record)
+        if len(batch) == batch_size:
+            store.append_many(batch)
+            converted += len(batch)
+            batch = []
+    store.append_many(batch)
+    return converted + len(batch)
+
+
+# Main execution
+if __name__ == "__main__":
+    source_name = sys.argv[1] if len(sys.argv) > 1 else 'machine_data.json'
+    target_name = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source_name)[0] + SQLITE_SUFFIX
+    total = convert_to_sqlite(data_file_path(source_name), data_file_path(target_name))
+    print(f"Converted {total} readings from {source_name} to {target_name}")
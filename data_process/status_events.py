@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+try:
+    from data_process.storage import (
+        ReadingStore, SegmentedLog, micros_to_timestamp, open_store, timestamp_to_micros
+    )
+except ImportError:  # Running as a script from inside data_process/
+    from storage import ReadingStore, SegmentedLog, micros_to_timestamp, open_store, timestamp_to_micros
+
+STATUS_EVENTS_SUFFIX = '.status'
+CHECKPOINT_FILE = 'state.json'
+CHECKPOINT_INTERVAL = 60.0
+
+
+class StatusEvents:
+    """
+    Run-length log of the status changes of every machine.
+
+    A reading only produces an event when its machine's status differs from
+    the previous reading's, so a machine that keeps running for a day costs
+    one record. Each event holds the time of the change, the new status, the
+    ``previous`` status and when that previous run started (``since``), so the
+    run that just ended is fully described by its event.
+
+    The current status of every machine, and the time of the last reading
+    seen, are checkpointed to ``state.json`` whenever events are written (and
+    at most ``checkpoint_interval`` seconds after newer readings were seen),
+    so a restarted writer only replays the raw readings stored after the
+    checkpoint. Nothing is written while no new readings arrive.
+
+    Args:
+        directory (str): Folder holding the event log and the checkpoint
+        checkpoint_interval (float): Maximum seconds between checkpoints
+    """
+
+    def __init__(self, directory: str, checkpoint_interval: float = CHECKPOINT_INTERVAL):
+        self.directory = directory
+        self.checkpoint_interval = checkpoint_interval
+        self.log = SegmentedLog(os.path.join(directory, 'events'))
+
+        self._lock = threading.Lock()
+        self._states: Optional[Dict[str, Dict]] = None
+        self._processed: Optional[int] = None
+        self._checkpointed = 0.0
+
+    def update(self, reading: Dict) -> None:
+        """
+        Record a new reading's status.
+
+        Args:
+            reading (Dict): Machine reading
+        """
+        self.update_many([reading])
+
+    def update_many(self, readings: List[Dict]) -> None:
+        """
+        Record the status of new readings, appending an event per change.
+
+        Args:
+            readings (List[Dict]): Machine readings, oldest first
+        """
+        with self._lock:
+            self._load_states()
+            self._update(readings)
+
+    def _update(self, readings) -> None:
+        processed = self._processed
+        events = []
+        for reading in readings:
+            micros = timestamp_to_micros(reading['timestamp'])
+            if self._processed is not None and micros < self._processed:
+                # Late reading; the run it belongs to is already recorded
+                continue
+            self._processed = micros
+
+            key = reading.get('machine_id') or ''
+            state = self._states.get(key)
+            if state is not None and state['status'] == reading['status']:
+                continue
+
+            event = {'timestamp': reading['timestamp'], 'status': reading['status']}
+            if state is not None:
+                event['previous'] = state['status']
+                event['since'] = state['since']
+            if key:
+                event['machine_id'] = key
+            events.append(event)
+            self._states[key] = {'status': reading['status'], 'since': reading['timestamp']}
+
+        self.log.append_many(events)
+        if events or (self._processed != processed
+                      and time.monotonic() - self._checkpointed >= self.checkpoint_interval):
+            self._save_checkpoint()
+
+    def catch_up(self, store: ReadingStore) -> None:
+        """
+        Replay the raw readings stored after the last checkpoint.
+
+        Without a checkpoint the current states are rebuilt from the event
+        log, and without either every stored reading is replayed once.
+
+        Args:
+            store (ReadingStore): Raw readings of the data file
+        """
+        with self._lock:
+            self._load_states()
+            start = micros_to_timestamp(self._processed) if self._processed is not None else None
+            try:
+                self._update(store.iter_range(start))
+            except FileNotFoundError:
+                pass
+
+    def current(self) -> Dict[str, Dict]:
+        """
+        Current status of every machine.
+
+        Returns:
+            Dict[str, Dict]: ``{'status', 'since'}`` by machine_id; readings
+            without a machine_id are listed under ``''``
+        """
+        with self._lock:
+            self._load_states()
+            return {key: dict(state) for key, state in self._states.items()}
+
+    def iter_events(self, start: Optional[str] = None, end: Optional[str] = None,
+                    machine_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate over the status changes with ``start <= timestamp < end``.
+
+        Args:
+            start (str): ISO timestamp of the first change to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only include changes of this machine
+        """
+        try:
+            yield from self.log.iter_range(start, end, machine_id)
+        except FileNotFoundError:
+            return
+
+    def _load_states(self) -> None:
+        if self._states is not None:
+            return
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_FILE), 'r') as f:
+                checkpoint = json.load(f)
+            self._states = checkpoint['machines']
+            self._processed = checkpoint['processed']
+            return
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+        # No usable checkpoint: the latest event of each machine holds its status
+        self._states = {}
+        self._processed = None
+        for event in self.iter_events():
+            self._states[event.get('machine_id') or ''] = {'status': event['status'], 'since': event['timestamp']}
+            self._processed = timestamp_to_micros(event['timestamp'])
+
+    def _save_checkpoint(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'processed': self._processed, 'machines': self._states}, f)
+        os.replace(temp_path, path)
+        self._checkpointed = time.monotonic()
+
+
+_status_events: Dict[str, StatusEvents] = {}
+_status_events_lock = threading.Lock()
+
+
+def status_events_directory(filepath: str) -> str:
+    """
+    Map a data file path such as ``data/machine_data.json`` to its status event folder.
+    """
+    return filepath + STATUS_EVENTS_SUFFIX
+
+
+def get_status_events(filepath: str) -> StatusEvents:
+    """
+    Get the process-wide status event writer for a data file path.
+
+    The writer catches up with the raw readings stored since its last
+    checkpoint the first time it is requested, so get it before appending
+    new readings.
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+
+    Returns:
+        StatusEvents: Status events fed by the generator writing that file
+    """
+    with _status_events_lock:
+        events = _status_events.get(filepath)
+        if events is None:
+            events = _status_events[filepath] = StatusEvents(status_events_directory(filepath))
+            events.catch_up(open_store(filepath))
+        return events
+
+
+def open_status_events(filepath: str) -> StatusEvents:
+    """
+    Get the status events of a data file path for reading.
+
+    Returns:
+        StatusEvents: The in-process writer if there is one, otherwise a reader
+    """
+    return _status_events.get(filepath) or StatusEvents(status_events_directory(filepath))
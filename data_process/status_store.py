@@ -0,0 +1,284 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    from data_process.storage import timestamp_to_micros
+except ImportError:  # Running as a script from inside data_process/
+    from storage import timestamp_to_micros
+
+DEFAULT_MACHINE_ID = 'default'
+SQLITE_TIMEOUT = 10.0
+
+
+class StatusStore:
+    """
+    Current job status per machine.
+
+    Entries are ``{'machine_id', 'current_status', 'last_updated'}`` dicts and
+    every update of a machine's entry is atomic.
+
+    Status changes are also recorded as run-length events: setting the
+    status a machine already has only refreshes its entry, while a new
+    status adds an event ``{'timestamp', 'machine_id', 'status', 'previous',
+    'since'}`` describing the run it ends.
+    """
+
+    def get(self, machine_id: str) -> Optional[Dict]:
+        """
+        Get the status entry of one machine.
+
+        Args:
+            machine_id (str): Machine to look up
+
+        Returns:
+            Optional[Dict]: Status entry, or None if the machine has none
+        """
+        return self.get_many([machine_id]).get(machine_id)
+
+    def get_many(self, machine_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """
+        Get the status entries of many machines at once.
+
+        Args:
+            machine_ids (Iterable[str]): Machines to look up, or None for all
+
+        Returns:
+            Dict[str, Dict]: Status entries by machine_id; unknown machines are left out
+        """
+        raise NotImplementedError
+
+    def set(self, machine_id: str, status: str, updated_at: Optional[str] = None) -> Dict:
+        """
+        Set the status of a machine.
+
+        Args:
+            machine_id (str): Machine to update
+            status (str): New status
+            updated_at (str): ISO timestamp of the change, defaults to now
+
+        Returns:
+            Dict: The stored entry
+        """
+        raise NotImplementedError
+
+    def iter_events(self, start: Optional[str] = None, end: Optional[str] = None,
+                    machine_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate over the status changes with ``start <= timestamp < end``, oldest first.
+
+        Args:
+            start (str): ISO timestamp of the first change to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only include changes of this machine
+        """
+        raise NotImplementedError
+
+    def current(self) -> Dict[str, Dict]:
+        """
+        Current status of every machine and when it was entered.
+
+        Returns:
+            Dict[str, Dict]: ``{'status', 'since'}`` by machine_id
+        """
+        raise NotImplementedError
+
+
+class MemoryStatusStore(StatusStore):
+    """
+    Status store kept in this process's memory.
+
+    Fast, but private to one process and lost on restart; use
+    ``SqliteStatusStore`` when several API workers must agree.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._states: Dict[str, Dict] = {}
+        self._events: List[Dict] = []
+
+    def get_many(self, machine_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        with self._lock:
+            if machine_ids is None:
+                return {machine_id: dict(entry) for machine_id, entry in self._entries.items()}
+            return {
+                machine_id: dict(self._entries[machine_id])
+                for machine_id in machine_ids if machine_id in self._entries
+            }
+
+    def set(self, machine_id: str, status: str, updated_at: Optional[str] = None) -> Dict:
+        entry = _entry(machine_id, status, updated_at)
+        with self._lock:
+            self._entries[machine_id] = entry
+            state = self._states.get(machine_id)
+            if state is None or state['status'] != status:
+                self._events.append(_event(machine_id, status, entry['last_updated'], state))
+                self._states[machine_id] = {'status': status, 'since': entry['last_updated']}
+            return dict(entry)
+
+    def iter_events(self, start: Optional[str] = None, end: Optional[str] = None,
+                    machine_id: Optional[str] = None) -> Iterator[Dict]:
+        start_micros, end_micros = _bounds(start, end)
+        with self._lock:
+            events = list(self._events)
+        for event in sorted(events, key=lambda event: timestamp_to_micros(event['timestamp'])):
+            micros = timestamp_to_micros(event['timestamp'])
+            if micros >= end_micros:
+                break
+            if micros >= start_micros and (machine_id is None or event['machine_id'] == machine_id):
+                yield dict(event)
+
+    def current(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {machine_id: dict(state) for machine_id, state in self._states.items()}
+
+
+class SqliteStatusStore(StatusStore):
+    """
+    Status store persisted in an SQLite database file.
+
+    Every process opening the same file sees the same entries, so API
+    workers give consistent answers and statuses survive restarts. Updates
+    are single transactions, which SQLite applies atomically; the database
+    runs in WAL mode so readers never wait for a writer. Status changes go to
+    the ``status_events`` table, indexed by time.
+
+    Args:
+        path (str): Database file, created if missing
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS machine_status ('
+                'machine_id TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at TEXT NOT NULL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS status_events ('
+                'id INTEGER PRIMARY KEY, micros INTEGER NOT NULL, timestamp TEXT NOT NULL, '
+                'machine_id TEXT NOT NULL, status TEXT NOT NULL, previous TEXT, since TEXT)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS status_events_time ON status_events (micros)')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS status_events_machine ON status_events (machine_id, micros)'
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, machine_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        connection = self._connection()
+        if machine_ids is None:
+            rows = connection.execute('SELECT machine_id, status, updated_at FROM machine_status').fetchall()
+        else:
+            machine_ids = list(machine_ids)
+            rows = []
+            # Stay below SQLite's limit on bound parameters per statement
+            for i in range(0, len(machine_ids), 500):
+                chunk = machine_ids[i:i + 500]
+                rows.extend(connection.execute(
+                    'SELECT machine_id, status, updated_at FROM machine_status '
+                    f'WHERE machine_id IN ({", ".join("?" * len(chunk))})',
+                    chunk
+                ).fetchall())
+        return {machine_id: _entry(machine_id, status, updated_at) for machine_id, status, updated_at in rows}
+
+    def set(self, machine_id: str, status: str, updated_at: Optional[str] = None) -> Dict:
+        entry = _entry(machine_id, status, updated_at)
+        connection = self._connection()
+        with connection:
+            # Take the write lock up front so no other process changes the status in between
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT status, timestamp FROM status_events WHERE machine_id = ? '
+                'ORDER BY micros DESC, id DESC LIMIT 1',
+                (machine_id,)
+            ).fetchone()
+            if row is None or row[0] != status:
+                state = {'status': row[0], 'since': row[1]} if row else None
+                event = _event(machine_id, status, entry['last_updated'], state)
+                connection.execute(
+                    'INSERT INTO status_events (micros, timestamp, machine_id, status, previous, since) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (timestamp_to_micros(event['timestamp']), event['timestamp'], machine_id, status,
+                     event.get('previous'), event.get('since'))
+                )
+            connection.execute(
+                'INSERT INTO machine_status (machine_id, status, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(machine_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at',
+                (machine_id, status, entry['last_updated'])
+            )
+        return entry
+
+    def iter_events(self, start: Optional[str] = None, end: Optional[str] = None,
+                    machine_id: Optional[str] = None) -> Iterator[Dict]:
+        start_micros, end_micros = _bounds(start, end)
+        query = ('SELECT timestamp, machine_id, status, previous, since FROM status_events '
+                 'WHERE micros >= ? AND micros < ?')
+        parameters = [start_micros, end_micros]
+        if machine_id is not None:
+            query += ' AND machine_id = ?'
+            parameters.append(machine_id)
+        cursor = self._connection().execute(query + ' ORDER BY micros, id', parameters)
+        for timestamp, event_machine_id, status, previous, since in cursor:
+            state = {'status': previous, 'since': since} if previous is not None else None
+            yield _event(event_machine_id, status, timestamp, state)
+
+    def current(self) -> Dict[str, Dict]:
+        # SQLite returns the other columns from the row holding the maximum
+        rows = self._connection().execute(
+            'SELECT machine_id, status, timestamp, MAX(micros) FROM status_events GROUP BY machine_id'
+        ).fetchall()
+        return {machine_id: {'status': status, 'since': timestamp} for machine_id, status, timestamp, _ in rows}
+
+
+def _entry(machine_id: str, status: str, updated_at: Optional[str]) -> Dict:
+    return {
+        'machine_id': machine_id,
+        'current_status': status,
+        'last_updated': updated_at or datetime.now().isoformat()
+    }
+
+
+def _event(machine_id: str, status: str, timestamp: str, state: Optional[Dict]) -> Dict:
+    event = {'timestamp': timestamp, 'machine_id': machine_id, 'status': status}
+    if state is not None:
+        event['previous'] = state['status']
+        event['since'] = state['since']
+    return event
+
+
+def _bounds(start: Optional[str], end: Optional[str]):
+    return (
+        timestamp_to_micros(start) if start is not None else -2 ** 63,
+        timestamp_to_micros(end) if end is not None else 2 ** 63 - 1
+    )
+
+
+def open_status_store(path: Optional[str] = None) -> StatusStore:
+    """
+    Open the status store at a path.
+
+    Args:
+        path (str): SQLite database file, or None for an in-memory store
+
+    Returns:
+        StatusStore: Store for the given path
+    """
+    if path is None:
+        return MemoryStatusStore()
+    return SqliteStatusStore(path)
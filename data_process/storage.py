@@ -0,0 +1,880 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+SEGMENT_SUFFIX = '.ndjson'
+COLUMNAR_SUFFIX = '.columns'
+SQLITE_SUFFIX = '.sqlite'
+
+# Set to 'sqlite' to keep every data file in an SQLite database next to it instead of a segmented log
+BACKEND_ENV = 'MACHINE_DATA_BACKEND'
+BACKEND_LOG = 'log'
+BACKEND_SQLITE = 'sqlite'
+DEFAULT_SEGMENT_MAX_RECORDS = 10000
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# How far an append is persisted before it returns (see SegmentedLog)
+DURABILITY_NONE = 'none'
+DURABILITY_INTERVAL = 'interval'
+DURABILITY_COMMIT = 'commit'
+DURABILITY_MODES = (DURABILITY_NONE, DURABILITY_INTERVAL, DURABILITY_COMMIT)
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def timestamp_to_micros(timestamp: str) -> int:
+    """
+    Convert an ISO timestamp to microseconds since the epoch.
+
+    Naive timestamps are taken as-is; aware ones are converted to UTC first.
+    """
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def micros_to_timestamp(micros: int) -> str:
+    """
+    Convert microseconds since the epoch back to an ISO timestamp.
+    """
+    return (_EPOCH + timedelta(microseconds=int(micros))).isoformat()
+
+
+class ReadingStore:
+    """
+    Common interface shared by the machine data storage backends.
+    """
+
+    def exists(self) -> bool:
+        raise NotImplementedError
+
+    def append(self, record: Dict) -> None:
+        """
+        Append a single reading to the store.
+
+        Args:
+            record (Dict): Machine reading to persist
+        """
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def sync(self) -> None:
+        """
+        Persist appended readings to disk, for backends that defer it.
+        """
+
+    def iter_records(self) -> Iterator[Dict]:
+        raise NotImplementedError
+
+    def version(self) -> Optional[tuple]:
+        """
+        Cheap token that changes whenever the stored readings change.
+
+        Computed from file metadata only, so callers can cache anything
+        derived from the readings until the token changes.
+
+        Returns:
+            Optional[tuple]: Version token, or None if the backend cannot tell
+
+        Raises:
+            FileNotFoundError: If the store does not exist
+        """
+        return None
+
+    def read_all(self, machine_id: Optional[str] = None) -> List[Dict]:
+        """
+        Read every stored reading, oldest first.
+
+        Args:
+            machine_id (str): Only return readings of this machine
+
+        Returns:
+            List[Dict]: Stored machine readings
+        """
+        if machine_id is None:
+            return list(self.iter_records())
+        return [record for record in self.iter_records() if record.get('machine_id') == machine_id]
+
+    def tail(self, count: int, machine_id: Optional[str] = None) -> List[Dict]:
+        """
+        Read the newest readings, oldest first.
+
+        Args:
+            count (int): Maximum number of readings to return
+            machine_id (str): Only return readings of this machine
+
+        Returns:
+            List[Dict]: Up to ``count`` most recent readings
+        """
+        if count <= 0:
+            return []
+        return self.read_all(machine_id)[-count:]
+
+    def iter_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                   machine_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate over the readings with ``start <= timestamp < end``, oldest first.
+
+        This default scans every reading; backends whose readings are stored
+        in time order override it to seek straight to ``start``.
+
+        Args:
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only return readings of this machine
+        """
+        bounds = _micros_bounds(start, end)
+        return (
+            record for record in self.iter_records()
+            if _in_bounds(record, bounds) and (machine_id is None or record.get('machine_id') == machine_id)
+        )
+
+    def read_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                   machine_id: Optional[str] = None) -> List[Dict]:
+        """
+        Read the readings with ``start <= timestamp < end``, oldest first.
+
+        Args:
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only return readings of this machine
+
+        Returns:
+            List[Dict]: Readings in the time range
+        """
+        return list(self.iter_range(start, end, machine_id))
+
+
+class JsonFileStore(ReadingStore):
+    """
+    Read-only access to the legacy pretty-printed JSON array file.
+
+    Kept so existing ``machine_data.json`` files can still be analyzed and
+    migrated into a segmented log.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def iter_records(self) -> Iterator[Dict]:
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        return iter(data)
+
+    def version(self) -> Optional[tuple]:
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+class SegmentedLog(ReadingStore):
+    """
+    Append-only log of readings split over rotating newline-delimited JSON files.
+
+    Each segment is named after the sequence number of its first record, so
+    record counts and retention can be worked out from file names alone and an
+    append never has to read or rewrite existing data. A single writer per log
+    is assumed; any number of readers may scan it concurrently. Readings are
+    expected to be appended in time order, which lets time-range reads
+    binary-search the segment files instead of scanning them.
+
+    Readers never see partial data: a record only counts once its
+    terminating newline has been written, so the line a concurrent append is
+    still writing is skipped rather than misparsed, and the writer cuts a
+    torn line left by a crash off before appending again. Retention only
+    removes whole closed segments.
+
+    Every ``append_many`` call is one commit: its records are written with a
+    single ``write`` per segment. The durability mode sets how far a commit
+    is persisted before the call returns:
+
+    - ``none``: handed to the operating system, which survives a crash of the
+      process but not a power loss.
+    - ``interval``: additionally fsynced on the first commit at least
+      ``fsync_interval`` seconds after the previous fsync, and by ``sync()``.
+    - ``commit``: fsynced on every commit, as are the directory entries of
+      new segments.
+
+    Args:
+        directory (str): Folder holding the segment files
+        segment_max_records (int): Records per segment before rolling over
+        segment_max_age (float): Seconds before the active segment rolls over
+        max_records (int): Keep at least this many of the newest records and
+            drop whole segments older than that; segments hold at most
+            ``max_records`` records then, so fewer than twice as many are kept
+        max_age (float): Drop closed segments not modified for this many seconds
+        durability (str): ``none``, ``interval`` or ``commit``
+        fsync_interval (float): Seconds between fsyncs in ``interval`` mode
+    """
+
+    def __init__(self, directory: str, segment_max_records: int = DEFAULT_SEGMENT_MAX_RECORDS,
+                 segment_max_age: Optional[float] = None, max_records: Optional[int] = None,
+                 max_age: Optional[float] = None, durability: str = DURABILITY_NONE,
+                 fsync_interval: float = DEFAULT_FSYNC_INTERVAL):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}. Use one of: {', '.join(DURABILITY_MODES)}")
+
+        self.directory = directory
+        self.segment_max_records = segment_max_records
+        self.segment_max_age = segment_max_age
+        self.max_records = max_records
+        self.max_age = max_age
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._starts: Optional[List[int]] = None
+        self._next_seq = 0
+        self._active_opened = 0.0
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.directory)
+
+    def segment_path(self, start: int) -> str:
+        return os.path.join(self.directory, f'{start:020d}{SEGMENT_SUFFIX}')
+
+    def segment_starts(self) -> List[int]:
+        """
+        List the first sequence number of every segment on disk, oldest first.
+
+        Raises:
+            FileNotFoundError: If the log directory does not exist
+        """
+        starts = []
+        for name in os.listdir(self.directory):
+            stem = name[:-len(SEGMENT_SUFFIX)]
+            if name.endswith(SEGMENT_SUFFIX) and stem.isdigit():
+                starts.append(int(stem))
+        return sorted(starts)
+
+    def iter_records(self) -> Iterator[Dict]:
+        starts = self.segment_starts()
+        return self._iter_segments(starts)
+
+    def version(self) -> Optional[tuple]:
+        """
+        Version token from the segment names and the newest segment's size and mtime.
+
+        Appends only ever grow the newest segment or add a new one, and
+        retention removes the oldest, so this covers every change with one
+        directory listing and one ``stat``.
+
+        Raises:
+            FileNotFoundError: If the log directory does not exist
+        """
+        starts = self.segment_starts()
+        if not starts:
+            return ()
+        try:
+            stat = os.stat(self.segment_path(starts[-1]))
+        except FileNotFoundError:
+            # Rolled over or removed while listing; report a token that cannot match
+            return (starts[0], starts[-1], -1, -1)
+        return (starts[0], starts[-1], stat.st_size, stat.st_mtime_ns)
+
+    def _iter_segments(self, starts: List[int]) -> Iterator[Dict]:
+        for start in starts:
+            try:
+                with open(self.segment_path(start), 'rb') as f:
+                    for line in f:
+                        record = _decode_line(line) if line.endswith(b'\n') else None
+                        if record is not None:
+                            yield record
+            except FileNotFoundError:
+                # Removed by retention while we were reading
+                continue
+
+    def tail(self, count: int, machine_id: Optional[str] = None) -> List[Dict]:
+        """
+        Read the newest readings by scanning segments backward from the end.
+
+        Only the blocks holding the last ``count`` records are read and parsed,
+        so the cost does not depend on how much history the log holds.
+
+        Args:
+            count (int): Maximum number of readings to return
+            machine_id (str): Only return readings of this machine
+
+        Returns:
+            List[Dict]: Up to ``count`` most recent readings, oldest first
+
+        Raises:
+            FileNotFoundError: If the log directory does not exist
+        """
+        if count <= 0:
+            return []
+
+        newest_first = []
+        for start in reversed(self.segment_starts()):
+            try:
+                for line in _iter_lines_reversed(self.segment_path(start)):
+                    record = _decode_line(line)
+                    if record is not None and (machine_id is None or record.get('machine_id') == machine_id):
+                        newest_first.append(record)
+                        if len(newest_first) == count:
+                            return newest_first[::-1]
+            except FileNotFoundError:
+                # Removed by retention while we were reading
+                continue
+        return newest_first[::-1]
+
+    def iter_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                   machine_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate over the readings with ``start <= timestamp < end``, oldest first.
+
+        Segments that end before ``start`` are skipped using the timestamp of
+        the following segment's first record, the first matching record is
+        found by binary search over byte offsets, and reading stops at the
+        first record at or after ``end``. Only the requested range is parsed.
+
+        Args:
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only return readings of this machine
+
+        Raises:
+            FileNotFoundError: If the log directory does not exist
+        """
+        bounds = _micros_bounds(start, end)
+        starts = self.segment_starts()
+        return self._iter_range(starts, bounds, machine_id)
+
+    def range_segments(self, start: Optional[str] = None, end: Optional[str] = None) -> List[int]:
+        """
+        List the segments that may hold readings with ``start <= timestamp < end``, oldest first.
+
+        Segments are told apart by the timestamp of their first record, so
+        only one line per segment is read.
+
+        Args:
+            start (str): ISO timestamp of the first reading of the range
+            end (str): ISO timestamp the range stops before
+
+        Returns:
+            List[int]: First sequence numbers of the matching segments
+
+        Raises:
+            FileNotFoundError: If the log directory does not exist
+        """
+        start_micros, end_micros = _micros_bounds(start, end)
+        starts = self.segment_starts()
+        starts = starts[self._first_segment(starts, start_micros):]
+        if end_micros is not None:
+            for i in range(1, len(starts)):
+                first_micros = self._first_micros(starts[i])
+                if first_micros is not None and first_micros >= end_micros:
+                    return starts[:i]
+        return starts
+
+    def iter_segment(self, segment: int, start: Optional[str] = None, end: Optional[str] = None,
+                     machine_id: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate over the readings of one segment with ``start <= timestamp < end``.
+
+        Lets a range be split by segment, e.g. across worker processes.
+
+        Args:
+            segment (int): First sequence number of the segment, see ``range_segments``
+            start (str): ISO timestamp of the first reading to include
+            end (str): ISO timestamp to stop before
+            machine_id (str): Only return readings of this machine
+        """
+        return self._iter_range([segment], _micros_bounds(start, end), machine_id)
+
+    def _first_segment(self, starts: List[int], start_micros: Optional[int]) -> int:
+        if start_micros is not None:
+            # The last segment whose first record is before start may hold the range's beginning
+            for i in range(len(starts) - 1, 0, -1):
+                first_micros = self._first_micros(starts[i])
+                if first_micros is not None and first_micros < start_micros:
+                    return i
+        return 0
+
+    def _iter_range(self, starts: List[int], bounds, machine_id: Optional[str]) -> Iterator[Dict]:
+        start_micros, end_micros = bounds
+        first = self._first_segment(starts, start_micros)
+
+        for i, segment in enumerate(starts[first:]):
+            try:
+                with open(self.segment_path(segment), 'rb') as f:
+                    if i == 0 and start_micros is not None:
+                        f.seek(_bisect_segment(f, start_micros))
+                    for line in f:
+                        record = _decode_line(line) if line.endswith(b'\n') else None
+                        if record is None:
+                            continue
+                        micros = timestamp_to_micros(record['timestamp'])
+                        if end_micros is not None and micros >= end_micros:
+                            return
+                        if start_micros is not None and micros < start_micros:
+                            continue
+                        if machine_id is None or record.get('machine_id') == machine_id:
+                            yield record
+            except FileNotFoundError:
+                # Removed by retention while we were reading
+                continue
+
+    def _first_micros(self, start: int) -> Optional[int]:
+        try:
+            with open(self.segment_path(start), 'rb') as f:
+                return _line_micros(f.readline())
+        except FileNotFoundError:
+            return None
+
+    def append_many(self, records: List[Dict]) -> None:
+        """
+        Append readings to the active segment, rolling over as needed.
+
+        Args:
+            records (List[Dict]): Machine readings to persist, oldest first
+        """
+        if not records:
+            return
+
+        lines = [_encode_record(record) for record in records]
+        with self._lock:
+            try:
+                self._write_lines(lines)
+            except FileNotFoundError:
+                # The log directory was removed underneath us; start over
+                self._starts = None
+                self._write_lines(lines)
+            self._apply_retention()
+
+    def sync(self) -> None:
+        """
+        Fsync the active segment if commits were written since the last fsync.
+        """
+        with self._lock:
+            if self._unsynced and self._starts:
+                _fsync_path(self.segment_path(self._starts[-1]))
+            self._unsynced = False
+            self._last_sync = time.monotonic()
+
+    def _write_lines(self, lines: List[bytes]) -> None:
+        self._load_writer_state()
+        sync = self._sync_due()
+        position = 0
+        while position < len(lines):
+            created = self._should_roll()
+            if created:
+                if self._starts and self._unsynced:
+                    # The closed segment is not written again, so persist it now
+                    _fsync_path(self.segment_path(self._starts[-1]))
+                    self._unsynced = False
+                self._starts.append(self._next_seq)
+                self._active_opened = time.time()
+
+            capacity = self._segment_capacity() - (self._next_seq - self._starts[-1])
+            chunk = lines[position:position + capacity]
+            with open(self.segment_path(self._starts[-1]), 'ab') as f:
+                f.write(b''.join(chunk))
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+                elif self.durability != DURABILITY_NONE:
+                    self._unsynced = True
+            if created and self.durability == DURABILITY_COMMIT:
+                _fsync_path(self.directory)
+
+            position += len(chunk)
+            self._next_seq += len(chunk)
+
+        if sync:
+            self._last_sync = time.monotonic()
+            self._unsynced = False
+
+    def _sync_due(self) -> bool:
+        if self.durability == DURABILITY_COMMIT:
+            return True
+        return (self.durability == DURABILITY_INTERVAL
+                and time.monotonic() - self._last_sync >= self.fsync_interval)
+
+    def _segment_capacity(self) -> int:
+        if self.max_records:
+            return max(1, min(self.segment_max_records, self.max_records))
+        return self.segment_max_records
+
+    def _should_roll(self) -> bool:
+        if not self._starts:
+            return True
+        if self._next_seq - self._starts[-1] >= self._segment_capacity():
+            return True
+        if self.segment_max_age is not None:
+            return time.time() - self._active_opened >= self.segment_max_age
+        return False
+
+    def _load_writer_state(self) -> None:
+        if self._starts is not None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._starts = self.segment_starts()
+        self._next_seq = 0
+        self._active_opened = time.time()
+
+        if self._starts:
+            active = self.segment_path(self._starts[-1])
+            self._next_seq = self._starts[-1] + _recover_segment(active)
+
+    def _apply_retention(self) -> None:
+        now = time.time()
+        while len(self._starts) > 1:
+            oldest = self.segment_path(self._starts[0])
+            expired = (
+                self.max_records is not None
+                and self._next_seq - self._starts[1] >= self.max_records
+            )
+            if not expired and self.max_age is not None:
+                try:
+                    expired = now - os.path.getmtime(oldest) > self.max_age
+                except FileNotFoundError:
+                    expired = True
+            if not expired:
+                break
+
+            try:
+                os.remove(oldest)
+            except FileNotFoundError:
+                pass
+            self._starts.pop(0)
+
+
+def _fsync_path(path: str) -> None:
+    """
+    Fsync a file, or a directory so that the files created in it persist.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        # Some platforms and file systems cannot open or fsync directories
+        if not os.path.isdir(path):
+            raise
+
+
+def _encode_record(record: Dict) -> bytes:
+    return (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _decode_line(line: bytes) -> Optional[Dict]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        # Torn or corrupted record; skip it rather than fail the whole read
+        return None
+
+
+def _micros_bounds(start: Optional[str], end: Optional[str]):
+    return (
+        timestamp_to_micros(start) if start is not None else None,
+        timestamp_to_micros(end) if end is not None else None
+    )
+
+
+def _in_bounds(record: Dict, bounds) -> bool:
+    start_micros, end_micros = bounds
+    if start_micros is None and end_micros is None:
+        return True
+    micros = timestamp_to_micros(record['timestamp'])
+    return (start_micros is None or micros >= start_micros) and (end_micros is None or micros < end_micros)
+
+
+def _line_micros(line: bytes) -> Optional[int]:
+    # A line without its newline is still being written
+    record = _decode_line(line) if line.endswith(b'\n') else None
+    return timestamp_to_micros(record['timestamp']) if record is not None else None
+
+
+def _bisect_segment(f: BinaryIO, key: int) -> int:
+    """
+    Find the offset of the first line whose timestamp is at or after ``key``.
+
+    Lines must be in time order. Unreadable lines count as earlier than ``key``.
+
+    Args:
+        f (BinaryIO): Segment file opened in binary mode
+        key (int): Timestamp in microseconds since the epoch
+
+    Returns:
+        int: Byte offset of the first matching line, or the file size
+    """
+    # Every line before lo is earlier than key; every line from hi on is not
+    lo = 0
+    hi = f.seek(0, os.SEEK_END)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        # Smallest line start at or after mid
+        if mid == 0:
+            position = 0
+        else:
+            f.seek(mid - 1)
+            f.readline()
+            position = f.tell()
+        if position >= hi:
+            # No line starts in [mid, hi); decide on the line at lo
+            position = lo
+
+        f.seek(position)
+        line = f.readline()
+        micros = _line_micros(line)
+        if micros is None or micros < key:
+            lo = position + len(line)
+        else:
+            hi = position
+    return lo
+
+
+def _iter_lines_reversed(path: str, block_size: int = TAIL_BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the complete lines of a file from last to first, reading fixed-size blocks backward.
+
+    Lines are yielded without their newline. A trailing line without one is
+    still being written and is left out.
+    """
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        # None until the last newline of the file has been found
+        remainder = None
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            if remainder is None:
+                # Whatever follows the last newline is an unfinished line
+                end = block.rfind(b'\n')
+                if end < 0:
+                    continue
+                block, remainder = block[:end], b''
+            lines = (block + remainder).split(b'\n')
+            # The first piece may be the tail end of a line in the previous block
+            remainder = lines.pop(0)
+            yield from reversed(lines)
+        if remainder is not None:
+            yield remainder
+
+
+def _recover_segment(path: str) -> int:
+    """
+    Count the complete records in a segment, cutting off a torn trailing line.
+
+    Args:
+        path (str): Segment file path
+
+    Returns:
+        int: Number of complete records in the segment
+    """
+    with open(path, 'rb+') as f:
+        content = f.read()
+        complete = content.rfind(b'\n') + 1
+        if complete < len(content):
+            f.truncate(complete)
+    return content.count(b'\n', 0, complete)
+
+
+_logs: Dict[str, SegmentedLog] = {}
+_logs_lock = threading.Lock()
+
+
+def data_file_path(filename: str) -> str:
+    """
+    Resolve a data file name inside the project's 'data' folder.
+
+    Args:
+        filename (str): Data file name, e.g. ``machine_data.json``
+
+    Returns:
+        str: Full path of the data file
+    """
+    base_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_directory, 'data', filename)
+
+
+def log_directory(filepath: str) -> str:
+    """
+    Map a data file path such as ``data/machine_data.json`` to its log folder.
+    """
+    return os.path.splitext(filepath)[0]
+
+
+def open_log(filepath: str, max_records: Optional[int] = None, durability: Optional[str] = None) -> SegmentedLog:
+    """
+    Get the writable segmented log behind a data file path.
+
+    Logs are shared per process so the writer state is only loaded once. A
+    legacy JSON array file at ``filepath`` is imported the first time its log
+    is created. The import is written to a temporary folder that is renamed
+    into place, so readers switch from the legacy file to the complete log
+    in one step.
+
+    The retention bound belongs to the log, not to the call: the first
+    caller to pass one sets it, callers passing None keep it, and passing a
+    different bound later is an error rather than a silent change for every
+    other writer of the log.
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+        max_records (int): Retention bound, see ``SegmentedLog``; None keeps
+            the log's current bound
+        durability (str): Durability mode, see ``SegmentedLog``; None keeps
+            the log's current mode
+
+    Returns:
+        SegmentedLog: Log for the given path
+
+    Raises:
+        ValueError: If the log already has a different retention bound
+    """
+    directory = log_directory(filepath)
+    with _logs_lock:
+        log = _logs.get(directory)
+        if log is None:
+            log = SegmentedLog(directory)
+            _logs[directory] = log
+            if not log.exists() and os.path.isfile(filepath):
+                _import_legacy(filepath, directory)
+    return _configure_writer(log, max_records, durability)
+
+
+def _configure_writer(store: ReadingStore, max_records: Optional[int], durability: Optional[str]) -> ReadingStore:
+    if max_records is not None and store.max_records != max_records:
+        if store.max_records is not None:
+            raise ValueError(f"Store already keeps {store.max_records} records, not {max_records}")
+        store.max_records = max_records
+    if durability is not None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}. Use one of: {', '.join(DURABILITY_MODES)}")
+        store.durability = durability
+    return store
+
+
+def _import_legacy(filepath: str, directory: str) -> None:
+    try:
+        legacy = JsonFileStore(filepath).read_all()
+    except json.JSONDecodeError:
+        legacy = []
+    temp_directory = directory + '.tmp'
+    shutil.rmtree(temp_directory, ignore_errors=True)
+    temp_log = SegmentedLog(temp_directory)
+    temp_log.append_many(legacy)
+    os.makedirs(temp_directory, exist_ok=True)
+    try:
+        os.replace(temp_directory, directory)
+    except OSError:
+        # Another process imported it first
+        shutil.rmtree(temp_directory, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+
+
+def open_writer(filepath: str, max_records: Optional[int] = None, durability: Optional[str] = None) -> ReadingStore:
+    """
+    Get the writable store behind a data file path.
+
+    Paths ending in ``.columns`` use the columnar store and paths resolved
+    to an SQLite database (see ``sqlite_path``) the SQLite store; anything
+    else is written to a segmented log (see ``open_log``).
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+        max_records (int): Retention bound for segmented logs and SQLite, set
+            once per store (see ``open_log``); None keeps the current bound
+        durability (str): Durability mode for segmented logs and SQLite, see ``SegmentedLog``
+
+    Returns:
+        ReadingStore: Store to append readings to
+    """
+    if filepath.endswith(COLUMNAR_SUFFIX):
+        return _columnar_module().open_columnar(filepath)
+    database = sqlite_path(filepath)
+    if database is not None:
+        return _configure_writer(_sqlite_module().open_sqlite(database), max_records, durability)
+    return open_log(filepath, max_records, durability)
+
+
+def sqlite_path(filepath: str) -> Optional[str]:
+    """
+    Get the SQLite database holding the readings behind a data file path, if any.
+
+    Paths ending in ``.sqlite`` are databases themselves. With
+    ``MACHINE_DATA_BACKEND=sqlite`` in the environment, every other data file
+    except columnar stores is kept in a database of the same name, e.g.
+    ``data/machine_data.json`` in ``data/machine_data.sqlite``, so a
+    deployment switches backends without renaming files anywhere.
+
+    Args:
+        filepath (str): Data file path
+
+    Returns:
+        Optional[str]: Database path, or None for the other backends
+    """
+    if filepath.endswith(SQLITE_SUFFIX):
+        return filepath
+    if os.environ.get(BACKEND_ENV, BACKEND_LOG).lower() == BACKEND_SQLITE and not filepath.endswith(COLUMNAR_SUFFIX):
+        return os.path.splitext(filepath)[0] + SQLITE_SUFFIX
+    return None
+
+
+def _columnar_module():
+    # Imported lazily so NumPy is only needed once a columnar store is used
+    try:
+        from data_process import columnar_store
+    except ImportError:  # Running as a script from inside data_process/
+        import columnar_store
+    return columnar_store
+
+
+def _sqlite_module():
+    try:
+        from data_process import sqlite_store
+    except ImportError:  # Running as a script from inside data_process/
+        import sqlite_store
+    return sqlite_store
+
+
+def open_store(filepath: str) -> ReadingStore:
+    """
+    Get a store for reading the data behind a data file path.
+
+    Paths ending in ``.columns`` open the columnar store and paths resolved
+    to an SQLite database the SQLite store. Otherwise the segmented log is
+    preferred; a legacy JSON array file is only read when no log exists for
+    it yet.
+
+    Args:
+        filepath (str): Data file path, e.g. ``data/machine_data.json``
+
+    Returns:
+        ReadingStore: Store to read readings from
+    """
+    if filepath.endswith(COLUMNAR_SUFFIX):
+        return _columnar_module().ColumnarStore(filepath)
+    database = sqlite_path(filepath)
+    if database is not None:
+        return _sqlite_module().open_sqlite(database)
+
+    directory = log_directory(filepath)
+    if not os.path.isdir(directory) and os.path.isfile(filepath):
+        return JsonFileStore(filepath)
+    return _logs.get(directory) or SegmentedLog(directory)
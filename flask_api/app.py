@@ -1,13 +1,23 @@
 from flask import Flask
+from lib.instrumentation import instrument_app
+from routes.anomalies_routes import anomalies_routes
 from routes.data_routes import data_routes
+from routes.metrics_routes import metrics_routes
+from routes.readings_routes import readings_routes
 from routes.status_routes import status_routes
 
 app = Flask(__name__)
 
 # Register routes
+app.register_blueprint(anomalies_routes, url_prefix='/api')
 app.register_blueprint(data_routes, url_prefix='/api')
+app.register_blueprint(metrics_routes, url_prefix='/api')
+app.register_blueprint(readings_routes, url_prefix='/api')
 app.register_blueprint(status_routes, url_prefix='/api')
 
+# Request timings for /api/metrics, plus cProfile when MACHINE_DATA_PROFILE is set
+instrument_app(app)
+
 @app.route('/', methods=['GET'])
 def get_status():
     return {"status": "API is running!"}
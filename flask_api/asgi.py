@@ -0,0 +1,23 @@
+import argparse
+from app import app as flask_app
+from controllers.data_controller import HEARTBEAT_INTERVAL, live_feeds
+from lib.asgi import AsgiApp
+
+# ASGI entry point: the live streams are served on the event loop, every other route by Flask on a thread pool
+streams = {'/api/data/stream': live_feeds['generator']}
+streams.update({f'/api/data/stream?source={source}': feed for source, feed in live_feeds.items()})
+app = AsgiApp(flask_app, streams=streams, heartbeat=HEARTBEAT_INTERVAL)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the Machine Data API with uvicorn")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind to")
+    parser.add_argument('--port', type=int, default=5000, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+    args = parser.parse_args()
+    
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is required to serve the API: pip install -r requirements.txt")
+    
+    uvicorn.run('asgi:app', host=args.host, port=args.port, workers=args.workers)
@@ -0,0 +1,41 @@
+from flask import jsonify, request
+from data_process.anomaly_detection import DETECTORS, query_anomalies
+from data_process.rolling_window import DEFAULT_FIELDS
+from data_process.storage import data_file_path
+from lib.validation import DATA_SOURCES, is_timestamp, source_filename
+
+def get_anomalies():
+    """
+    Endpoint to list the anomalies flagged by the streaming detectors.
+    
+    Accepts optional ``from`` and ``to`` ISO timestamps and optional
+    ``machine_id``, ``field`` (``temperature`` or ``speed``) and ``detector``
+    (``zscore``, ``ewma`` or ``mad``) filters, and a ``source`` (``generator``
+    by default, or ``ingested``). Detections are read from the log the
+    detectors append to as readings arrive.
+    
+    Returns:
+        JSON: Detections in time order, or error message
+    """
+    start = request.args.get('from')
+    end = request.args.get('to')
+    for name, value in (('from', start), ('to', end)):
+        if value is not None and not is_timestamp(value):
+            return jsonify({"error": f"'{name}' must be an ISO 8601 timestamp"}), 400
+    
+    field = request.args.get('field')
+    if field is not None and field not in DEFAULT_FIELDS:
+        return jsonify({"error": f"Invalid field. Allowed fields: {', '.join(DEFAULT_FIELDS)}"}), 400
+    detector = request.args.get('detector')
+    if detector is not None and detector not in DETECTORS:
+        return jsonify({"error": f"Invalid detector. Allowed detectors: {', '.join(DETECTORS)}"}), 400
+    filename = source_filename(request.args.get('source'))
+    if filename is None:
+        return jsonify({"error": f"Invalid source. Allowed sources: {', '.join(DATA_SOURCES)}"}), 400
+    
+    try:
+        anomalies = query_anomalies(data_file_path(filename), start, end,
+                                    machine_id=request.args.get('machine_id'), field=field, detector=detector)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"anomalies": anomalies, "count": len(anomalies)}), 200
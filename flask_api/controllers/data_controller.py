@@ -1,15 +1,217 @@
-from flask import jsonify
-from data_process.data_processor import process_machine_data
+import json
+import queue
+from functools import partial
+
+from flask import Response, jsonify, request
+from analytics.utilization import machine_utilization
+from data_process.anomaly_detection import anomalies_version
+from data_process.data_processor import data_version, process_machine_data
+from data_process.instrumentation import metrics
+from data_process.rollups import TIERS, query_rollups
+from data_process.storage import data_file_path
+from lib.broadcast import ChangeFeed
+from lib.response_cache import ResponseCache, make_etag
+from lib.validation import DATA_SOURCES, DEFAULT_SOURCE, is_timestamp, source_filename
+
+# Seconds between keep-alive comments on idle event streams
+HEARTBEAT_INTERVAL = 15
+
+# Serialized /data responses, valid while the data file's version is unchanged
+response_cache = ResponseCache()
+
+metrics.describe('response_cache_hits_total', "GET /api/data responses served from the response cache")
+metrics.describe('response_cache_misses_total', "GET /api/data responses that had to be built")
+
+def _response_version(filename):
+    # Detections are logged after the readings they belong to, and responses include them
+    version = data_version(filename)
+    if version is None:
+        return None
+    return version, anomalies_version(data_file_path(filename))
 
 def get_processed_data():
     """
     Endpoint to retrieve processed machine data.
     
+    Accepts an optional ``window`` query parameter with the number of recent
+    readings to average over (default 5). Windows tracked by the rolling
+    aggregator (5, 60 and 3600 readings) are answered from memory when the
+    generator runs in the same process. An optional ``machine_id`` query
+    parameter restricts the data to one machine of a fleet. Optional ``from``
+    and ``to`` ISO timestamps restrict it to readings with
+    ``from <= timestamp < to``; only that range is read from storage. The
+    ``source`` query parameter picks the data file: ``generator`` (default)
+    or ``ingested`` for the readings posted to ``/api/readings``.
+    
+    Responses are cached per query until the data file or its anomaly log
+    changes and carry an ``ETag``; a request whose ``If-None-Match``
+    matches gets an empty 304.
+    
     Returns:
         JSON: Processed machine data or error message
     """
+    window = request.args.get('window', '5')
+    if not window.isdigit() or int(window) == 0:
+        return jsonify({"error": "Window must be a positive integer"}), 400
+    
+    start = request.args.get('from')
+    end = request.args.get('to')
+    for name, value in (('from', start), ('to', end)):
+        if value is not None and not is_timestamp(value):
+            return jsonify({"error": f"'{name}' must be an ISO 8601 timestamp"}), 400
+    
+    filename = source_filename(request.args.get('source'))
+    if filename is None:
+        return jsonify({"error": f"Invalid source. Allowed sources: {', '.join(DATA_SOURCES)}"}), 400
+    
+    machine_id = request.args.get('machine_id')
+    key = (filename, int(window), machine_id, start, end)
+    
+    try:
+        version = _response_version(filename)
+        if version is None:
+            # Nothing to tag the response with, so it is neither cached nor validated
+            return jsonify(process_machine_data(filename, window_size=int(window), machine_id=machine_id,
+                                                start=start, end=end)), 200
+        
+        etag = make_etag(key, version)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = response_cache.get(key, version)
+            metrics.inc('response_cache_misses_total' if body is None else 'response_cache_hits_total')
+            if body is None:
+                data = process_machine_data(filename, window_size=int(window), machine_id=machine_id,
+                                            start=start, end=end)
+                body = jsonify(data).get_data()
+                response_cache.put(key, version, body)
+            response = Response(body, status=200, mimetype='application/json')
+        
+        response.set_etag(etag)
+        # Clients may keep the payload but must revalidate it on every poll
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _latest_event(filename='machine_data.json'):
+    data = process_machine_data(filename)
+    return f"event: reading\ndata: {json.dumps(data)}\n\n" if data else None
+
+# One producer per data source, shared by every /data/stream client of that source
+live_feeds = {
+    source: ChangeFeed(partial(_latest_event, filename), partial(_response_version, filename))
+    for source, filename in DATA_SOURCES.items()
+}
+
+def stream_processed_data():
+    """
+    Endpoint streaming processed machine data as Server-Sent Events.
+    
+    Sends the latest processed reading on connect and then every new one as
+    soon as the data file changes. All clients share one producer that checks
+    the data version and processes new data once, so the cost of a reading
+    does not grow with the number of clients. A client that falls too far
+    behind is disconnected and can reconnect to resume from the latest
+    reading. The ``source`` query parameter picks the data file, as for
+    ``/api/data``.
+    
+    Returns:
+        Response: ``text/event-stream`` of ``reading`` events, or error message
+    """
+    source = request.args.get('source')
+    if source_filename(source) is None:
+        return jsonify({"error": f"Invalid source. Allowed sources: {', '.join(DATA_SOURCES)}"}), 400
+    live_feed = live_feeds[source or DEFAULT_SOURCE]
+    subscription = live_feed.subscribe()
+    
+    def events():
+        try:
+            latest = live_feed.broadcaster.latest
+            if latest is not None:
+                yield latest
+            while True:
+                try:
+                    event = subscription.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    # Lets the server notice disconnected clients
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    return
+                if event is not latest:
+                    yield event
+                latest = None
+        finally:
+            live_feed.unsubscribe(subscription)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def get_rollup_data():
+    """
+    Endpoint to chart and summarize a time range from the pre-aggregated rollups.
+    
+    Accepts optional ``from`` and ``to`` ISO timestamps, a ``machine_id``, a
+    ``resolution`` (``1m``, ``1h`` or ``1d``) and a ``source`` (see
+    ``get_processed_data``). Without a resolution, the finest one that
+    charts the range in at most 1000 buckets is used.
+    
+    Returns:
+        JSON: Resolution, buckets and summary of the range, or error message
+    """
+    start = request.args.get('from')
+    end = request.args.get('to')
+    for name, value in (('from', start), ('to', end)):
+        if value is not None and not is_timestamp(value):
+            return jsonify({"error": f"'{name}' must be an ISO 8601 timestamp"}), 400
+    
+    resolution = request.args.get('resolution')
+    resolutions = [name for name, _ in TIERS]
+    if resolution is not None and resolution not in resolutions:
+        return jsonify({"error": f"Invalid resolution. Allowed resolutions: {', '.join(resolutions)}"}), 400
+    
+    filename = source_filename(request.args.get('source'))
+    if filename is None:
+        return jsonify({"error": f"Invalid source. Allowed sources: {', '.join(DATA_SOURCES)}"}), 400
+    
+    try:
+        data = query_rollups(data_file_path(filename), start, end,
+                             machine_id=request.args.get('machine_id'), resolution=resolution)
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def get_utilization_data():
+    """
+    Endpoint to report machine utilization over a time range.
+    
+    Accepts optional ``from`` and ``to`` ISO timestamps (defaulting to the
+    first recorded status change and now), a ``machine_id`` and a ``source``
+    (see ``get_processed_data``). The report is computed from the run-length
+    status events, not the raw readings.
+    
+    Returns:
+        JSON: Time in each state, utilization shares, transition counts and
+        job statistics, or error message; 400 for an invalid range and 404
+        when no status change has been recorded yet
+    """
+    start = request.args.get('from')
+    end = request.args.get('to')
+    for name, value in (('from', start), ('to', end)):
+        if value is not None and not is_timestamp(value):
+            return jsonify({"error": f"'{name}' must be an ISO 8601 timestamp"}), 400
+    
+    filename = source_filename(request.args.get('source'))
+    if filename is None:
+        return jsonify({"error": f"Invalid source. Allowed sources: {', '.join(DATA_SOURCES)}"}), 400
+    
     try:
-        data = process_machine_data()
+        data = machine_utilization(filename, start, end, machine_id=request.args.get('machine_id'))
         return jsonify(data), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,18 @@
+from flask import Response
+from data_process.instrumentation import metrics
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def get_metrics():
+    """
+    Endpoint exposing the metrics of this API process to Prometheus.
+
+    Includes the hot-path timings recorded in this process (processing,
+    analytics and, when the generator runs in the same process, data
+    generation), per-route request timings and the response cache counters.
+    Each worker process keeps its own metrics.
+
+    Returns:
+        Response: Metrics in the Prometheus text exposition format
+    """
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,32 @@
+from flask import jsonify, request
+from data_process.ingest import INGEST_FILENAME, MAX_BATCH_SIZE, ingest_readings, parse_batch
+
+def ingest_batch():
+    """
+    Endpoint to ingest a batch of machine readings.
+    
+    Accepts a JSON array of readings or newline-delimited JSON (one reading
+    per line). Each reading needs a ``timestamp``, ``temperature``, ``speed``
+    and ``status`` and may carry a ``machine_id``. Valid readings are
+    committed to storage in a single append, to the ``ingested_data.json``
+    data file; invalid ones are reported by their position in the batch.
+    
+    Returns:
+        JSON: Accepted and rejected counts with per-row errors, or error message
+    """
+    try:
+        rows, parse_errors = parse_batch(request.get_data())
+    except (UnicodeDecodeError, ValueError) as e:
+        return jsonify({"error": f"Body must be a JSON array or NDJSON: {e}"}), 400
+    
+    if not rows:
+        return jsonify({"error": "No readings provided"}), 400
+    if len(rows) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batches are limited to {MAX_BATCH_SIZE} readings"}), 413
+    
+    try:
+        result = ingest_readings(rows, INGEST_FILENAME, parse_errors)
+    except OSError as e:
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify(result), 200 if result['accepted'] else 422
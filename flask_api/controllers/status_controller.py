@@ -1,29 +1,52 @@
+import threading
+
 from flask import jsonify, request
-from datetime import datetime
+from analytics.utilization import job_utilization
+from data_process.status_store import DEFAULT_MACHINE_ID, open_status_store
+from data_process.storage import data_file_path
+from lib.validation import is_timestamp
 
 ALLOWED_STATUSES = ['IDLE', 'STARTED', 'IN_PROGRESS', 'PAUSED', 'COMPLETED']
 
-# In-memory status tracking
-machine_status = {
-    'current_status': 'IDLE',
-    'last_updated': None
-}
+# Shared by every API worker process; set to None to keep statuses in memory instead
+STATUS_STORE_FILENAME = 'machine_status.db'
+
+_status_store = None
+_status_store_lock = threading.Lock()
+
+def get_status_store():
+    """
+    Get the status store of this API process, opening it on first use.
+    
+    Returns:
+        StatusStore: Store holding the job status of every machine
+    """
+    global _status_store
+    with _status_store_lock:
+        if _status_store is None:
+            path = data_file_path(STATUS_STORE_FILENAME) if STATUS_STORE_FILENAME else None
+            _status_store = open_status_store(path)
+        return _status_store
 
 def update_status():
     """
     Endpoint to update machine status.
     
-    Validates and updates machine status.
+    Validates and updates the status of one machine, given by an optional
+    ``machine_id`` (defaults to ``default``).
     
     Returns:
         JSON: Status update confirmation or error message
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
     
     # Input validation
     if not data or 'status' not in data:
         return jsonify({"error": "Status is required"}), 400
     
+    if not isinstance(data['status'], str):
+        return jsonify({"error": "Status must be a string"}), 400
+    
     new_status = data['status'].upper()
     
     if new_status not in ALLOWED_STATUSES:
@@ -31,11 +54,59 @@ def update_status():
             "error": f"Invalid status. Allowed statuses: {', '.join(ALLOWED_STATUSES)}"
         }), 400
     
+    machine_id = data.get('machine_id', DEFAULT_MACHINE_ID)
+    if not isinstance(machine_id, str) or not machine_id:
+        return jsonify({"error": "machine_id must be a non-empty string"}), 400
+    
     # Update status
-    machine_status['current_status'] = new_status
-    machine_status['last_updated'] = str(datetime.now())
+    entry = get_status_store().set(machine_id, new_status)
     
     return jsonify({
         "message": "Status updated successfully",
-        "current_status": machine_status
-    }), 200
\ No newline at end of file
+        "current_status": entry
+    }), 200
+
+def get_status():
+    """
+    Endpoint to read the status of many machines in one call.
+    
+    Machines are selected with repeated or comma-separated ``machine_id``
+    query parameters; without any, every known machine is returned.
+    
+    Returns:
+        JSON: Status entries keyed by machine_id
+    """
+    machine_ids = [
+        machine_id
+        for value in request.args.getlist('machine_id')
+        for machine_id in value.split(',') if machine_id
+    ]
+    
+    machines = get_status_store().get_many(machine_ids or None)
+    return jsonify({"machines": machines}), 200
+
+def get_status_utilization():
+    """
+    Endpoint to report job utilization over a time range.
+    
+    Requires a ``from`` ISO timestamp and accepts an optional ``to``
+    (defaults to now) and ``machine_id``. The report is computed from the
+    recorded status changes.
+    
+    Returns:
+        JSON: Time in each status, utilization shares, transition counts and
+        job statistics, or error message
+    """
+    start = request.args.get('from')
+    end = request.args.get('to')
+    if start is None:
+        return jsonify({"error": "'from' is required"}), 400
+    for name, value in (('from', start), ('to', end)):
+        if value is not None and not is_timestamp(value):
+            return jsonify({"error": f"'{name}' must be an ISO 8601 timestamp"}), 400
+    
+    try:
+        data = job_utilization(get_status_store(), start, end, machine_id=request.args.get('machine_id'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(data), 200
@@ -0,0 +1,200 @@
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lib.broadcast import AsyncSubscription, ChangeFeed
+
+DEFAULT_THREADS = 32
+DEFAULT_HEARTBEAT = 15
+
+EVENT_STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no')
+]
+
+
+class AsgiApp:
+    """
+    ASGI application serving a WSGI app, with event streams served natively.
+
+    Requests for a path registered in ``streams`` (with its query string,
+    when the request has one) are answered on the event loop as Server-Sent
+    Events from a ``ChangeFeed``; an idle client costs a
+    suspended coroutine instead of a thread, so one worker can hold thousands
+    of them. Every other request runs the WSGI app on a bounded thread pool,
+    so blocking storage reads never stall the event loop.
+
+    Args:
+        wsgi_app (Callable): WSGI application, e.g. the Flask app
+        streams (Dict[str, ChangeFeed]): Event-stream feeds by request path,
+            e.g. ``/stream`` or ``/stream?source=ingested``
+        max_threads (int): Size of the thread pool running WSGI requests
+        heartbeat (float): Seconds between keep-alive comments on idle streams
+    """
+
+    def __init__(self, wsgi_app: Callable, streams: Optional[Dict[str, ChangeFeed]] = None,
+                 max_threads: int = DEFAULT_THREADS, heartbeat: float = DEFAULT_HEARTBEAT):
+        self.wsgi_app = wsgi_app
+        self.streams = streams or {}
+        self.heartbeat = heartbeat
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type '{scope['type']}'")
+        elif scope['method'] == 'GET' and self._stream_target(scope) in self.streams:
+            await self._stream(self.streams[self._stream_target(scope)], receive, send)
+        else:
+            await self._wsgi(scope, receive, send)
+
+    @staticmethod
+    def _stream_target(scope: Dict) -> str:
+        query = scope.get('query_string', b'').decode('latin-1')
+        return f"{scope['path']}?{query}" if query else scope['path']
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _wsgi(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        body = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+
+        environ = build_environ(scope, b''.join(body))
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(self.executor, run_wsgi, self.wsgi_app, environ)
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def _stream(self, feed: ChangeFeed, receive: Callable, send: Callable) -> None:
+        subscription = AsyncSubscription(asyncio.get_running_loop(), feed.broadcaster.queue_size)
+        feed.subscribe(subscription)
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        next_event = None
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': EVENT_STREAM_HEADERS})
+            latest = feed.broadcaster.latest
+            if latest is not None:
+                await send({'type': 'http.response.body', 'body': latest.encode('utf-8'), 'more_body': True})
+
+            while True:
+                if next_event is None:
+                    next_event = asyncio.ensure_future(subscription.get_async())
+                done, _ = await asyncio.wait({next_event, disconnected}, timeout=self.heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    return
+                if next_event not in done:
+                    # Lets proxies and the client see the connection is alive
+                    event = ": keep-alive\n\n"
+                else:
+                    event = next_event.result()
+                    next_event = None
+                    if event is None:
+                        break
+                    if event is latest:
+                        continue
+                latest = None
+                await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            feed.unsubscribe(subscription)
+            disconnected.cancel()
+            if next_event is not None:
+                next_event.cancel()
+
+
+async def _wait_for_disconnect(receive: Callable) -> None:
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def build_environ(scope: Dict, body: bytes) -> Dict:
+    """
+    Build the WSGI environ of an ASGI HTTP request.
+
+    Args:
+        scope (Dict): ASGI connection scope
+        body (bytes): Complete request body
+
+    Returns:
+        Dict: WSGI environ
+    """
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def run_wsgi(wsgi_app: Callable, environ: Dict) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    """
+    Run a WSGI app to completion.
+
+    Returns:
+        Tuple[int, List[Tuple[str, str]], bytes]: Status code, headers and body
+    """
+    response = {}
+    chunks = []
+
+    def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+        return chunks.append
+
+    result = wsgi_app(environ, start_response)
+    try:
+        for chunk in result:
+            chunks.append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], b''.join(chunks)
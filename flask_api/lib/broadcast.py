@@ -0,0 +1,256 @@
+import asyncio
+import queue
+import threading
+from collections import deque
+from typing import Callable, Hashable, Optional, Set
+
+from data_process.scheduler import get_scheduler
+
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_POLL_INTERVAL = 0.5
+
+
+class Subscription:
+    """
+    A subscriber's bounded queue of broadcast messages.
+
+    Args:
+        maxsize (int): Messages held before the subscriber counts as too slow
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.dropped = False
+        self._queue: queue.Queue = queue.Queue(maxsize)
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Wait for the next message.
+
+        Args:
+            timeout (float): Seconds to wait, or None to wait forever
+
+        Returns:
+            The next message, or None once the subscription has been dropped
+
+        Raises:
+            queue.Empty: If no message arrived within ``timeout``
+        """
+        return self._queue.get(timeout=timeout)
+
+    def _offer(self, message) -> bool:
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def _close(self) -> None:
+        # Discard what the subscriber fell behind on and wake it up with the end marker
+        self.dropped = True
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put_nowait(None)
+
+
+class AsyncSubscription(Subscription):
+    """
+    A subscription consumed from an asyncio event loop.
+
+    Publishers run in other threads, so messages are kept in a deque under a
+    lock and the waiting coroutine is woken through the loop; no thread is
+    held while a subscriber waits.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): Loop the subscriber runs on
+        maxsize (int): Messages held before the subscriber counts as too slow
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.dropped = False
+        self.maxsize = maxsize
+        self._loop = loop
+        self._messages: deque = deque()
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def get(self, timeout: Optional[float] = None):
+        raise TypeError("Use 'await get_async()' on an AsyncSubscription")
+
+    async def get_async(self):
+        """
+        Wait for the next message.
+
+        Returns:
+            The next message, or None once the subscription has been dropped
+        """
+        while True:
+            with self._lock:
+                if self._messages:
+                    return self._messages.popleft()
+                self._ready.clear()
+            await self._ready.wait()
+
+    def _offer(self, message) -> bool:
+        with self._lock:
+            if len(self._messages) >= self.maxsize:
+                return False
+            self._messages.append(message)
+        self._wake()
+        return True
+
+    def _close(self) -> None:
+        with self._lock:
+            self.dropped = True
+            self._messages.clear()
+            self._messages.append(None)
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The loop has been closed; nobody is waiting anymore
+            pass
+
+
+class Broadcaster:
+    """
+    Fans every published message out to all subscribers.
+
+    Publishing never blocks: a subscriber whose queue is full is dropped
+    instead of slowing the producer or the other subscribers down.
+
+    Args:
+        queue_size (int): Queue bound of each subscriber
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.latest = None
+
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, subscription: Optional[Subscription] = None) -> Subscription:
+        """
+        Add a subscriber, by default with a thread-blocking queue.
+
+        Args:
+            subscription (Subscription): Subscription to register, e.g. an
+                ``AsyncSubscription``
+
+        Returns:
+            Subscription: The registered subscription
+        """
+        with self._lock:
+            if subscription is None:
+                subscription = Subscription(self.queue_size)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, message) -> int:
+        """
+        Send a message to every subscriber.
+
+        Args:
+            message: Message to deliver; None is reserved for the end marker
+
+        Returns:
+            int: Number of subscribers the message was delivered to
+        """
+        with self._lock:
+            self.latest = message
+            delivered = 0
+            for subscription in list(self._subscribers):
+                if subscription._offer(message):
+                    delivered += 1
+                else:
+                    self._subscribers.discard(subscription)
+                    subscription._close()
+            return delivered
+
+
+class ChangeFeed:
+    """
+    Publishes a fresh payload whenever a data version changes.
+
+    While anyone is subscribed, a job on the scheduler checks ``version`` every
+    ``interval`` seconds and, only when it changed, builds the payload once
+    with ``source`` and broadcasts it. The number of data reads is therefore
+    independent of the number of subscribers.
+
+    Args:
+        source (Callable): Builds the message to publish; falsy results are skipped
+        version (Callable): Returns a token that changes with the data
+        scheduler (Scheduler): Scheduler running the polling job, defaults to the shared one
+        interval (float): Seconds between version checks
+        queue_size (int): Queue bound of each subscriber
+    """
+
+    def __init__(self, source: Callable, version: Callable[[], Optional[Hashable]], scheduler=None,
+                 interval: float = DEFAULT_POLL_INTERVAL, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.source = source
+        self.version = version
+        self.scheduler = scheduler
+        self.interval = interval
+        self.broadcaster = Broadcaster(queue_size)
+
+        self._lock = threading.Lock()
+        self._job = None
+        self._version = None
+
+    def subscribe(self, subscription: Optional[Subscription] = None) -> Subscription:
+        """
+        Subscribe to the feed, starting the polling job for the first subscriber.
+
+        Args:
+            subscription (Subscription): Subscription to register, see
+                ``Broadcaster.subscribe``
+        """
+        with self._lock:
+            subscription = self.broadcaster.subscribe(subscription)
+            if self._job is None:
+                # Whatever was published before the feed went idle may be stale
+                self._version = None
+                self.broadcaster.latest = None
+                scheduler = self.scheduler or get_scheduler()
+                self._job = scheduler.every(self.interval, self.poll, name='change-feed')
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Unsubscribe from the feed, stopping the polling job with the last subscriber.
+        """
+        with self._lock:
+            self.broadcaster.unsubscribe(subscription)
+            if self._job is not None and self.broadcaster.subscriber_count == 0:
+                self._job.cancel()
+                self._job = None
+
+    def poll(self) -> bool:
+        """
+        Publish a new payload if the data version changed.
+
+        Returns:
+            bool: Whether a payload was published
+        """
+        version = self.version()
+        if version is None or version == self._version:
+            return False
+        self._version = version
+        message = self.source()
+        if not message:
+            return False
+        self.broadcaster.publish(message)
+        return True
@@ -0,0 +1,91 @@
+import os
+import time
+from datetime import datetime
+
+from flask import Flask, g, request
+from data_process.instrumentation import MetricsRegistry, Profile, metrics
+from data_process.storage import data_file_path
+
+# 'all' (or 1) profiles every request, 'header' only requests sent with PROFILE_HEADER
+PROFILE_ENV = 'MACHINE_DATA_PROFILE'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_DIRECTORY = data_file_path('profiles')
+
+
+def profiling_mode() -> str:
+    """
+    Get the request profiling mode from the environment.
+
+    Returns:
+        str: ``'all'``, ``'header'`` or ``'off'``
+    """
+    mode = os.environ.get(PROFILE_ENV, '').strip().lower()
+    if mode in ('1', 'true', 'yes', 'on', 'all'):
+        return 'all'
+    return 'header' if mode == 'header' else 'off'
+
+
+def _wants_profile() -> bool:
+    mode = profiling_mode()
+    if mode == 'all':
+        return True
+    return mode == 'header' and request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes')
+
+
+def instrument_app(app: Flask, registry: MetricsRegistry = metrics) -> Flask:
+    """
+    Time every request of a Flask app and profile the requests asked for.
+
+    Requests are counted in ``http_requests_total`` and timed in
+    ``http_request_duration_seconds``, labelled with the method, the route
+    rule (not the raw path, so ids in URLs don't multiply series) and the
+    status code. When profiling is on for a request, it runs under cProfile
+    and the profile is written to ``PROFILE_DIRECTORY``; the response names
+    the file in the ``X-Profile-File`` header.
+
+    Args:
+        app (Flask): App to instrument
+        registry (MetricsRegistry): Registry to record into
+
+    Returns:
+        Flask: The same app
+    """
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        g.request_profile = None
+        if _wants_profile():
+            profile = Profile()
+            try:
+                profile.__enter__()
+            except ValueError:  # Another profiler is already active in this process
+                return
+            g.request_profile = profile
+
+    @app.after_request
+    def finish_request(response):
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile.__exit__(None, None, None)
+            name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}_{request.endpoint or 'unmatched'}.prof"
+            response.headers['X-Profile-File'] = profile.dump(os.path.join(PROFILE_DIRECTORY, name))
+
+        started = g.pop('request_started', None)
+        if started is not None and registry.enabled:
+            labels = {
+                'method': request.method,
+                'route': request.url_rule.rule if request.url_rule is not None else 'unmatched',
+                'status': response.status_code
+            }
+            registry.observe('http_request_duration_seconds', time.perf_counter() - started, **labels)
+            registry.inc('http_requests_total', **labels)
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc=None):
+        # Covers requests that ended without going through after_request
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile.__exit__(None, None, None)
+
+    return app
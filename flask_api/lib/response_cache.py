@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class ResponseCache:
+    """
+    Least-recently-used cache of serialized responses tagged with a data version.
+
+    An entry is only returned while the version it was stored with is still
+    current, so entries never need to be invalidated explicitly: the first
+    request after the data changes simply misses and replaces the entry.
+
+    Args:
+        max_entries (int): Number of distinct requests to keep
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[Hashable, bytes]]' = OrderedDict()
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[bytes]:
+        """
+        Get the cached body of a request if it was built from this version.
+
+        Args:
+            key (Hashable): Request parameters
+            version (Hashable): Current data version
+
+        Returns:
+            Optional[bytes]: Cached body, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, body: bytes) -> None:
+        """
+        Store the body built for a request from a data version.
+
+        Args:
+            key (Hashable): Request parameters
+            version (Hashable): Data version the body was built from
+            body (bytes): Serialized response
+        """
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def make_etag(key: Hashable, version: Hashable) -> str:
+    """
+    Build the entity tag of the response to a request at a data version.
+    """
+    return hashlib.sha1(repr((key, version)).encode('utf-8')).hexdigest()
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+
+from data_process.ingest import INGEST_FILENAME
+
+# Data files the read endpoints can serve, by the value of their ``source`` query parameter
+DATA_SOURCES = {'generator': 'machine_data.json', 'ingested': INGEST_FILENAME}
+DEFAULT_SOURCE = 'generator'
+
+
+def is_timestamp(value: str) -> bool:
+    """
+    Check that a query parameter holds an ISO 8601 timestamp.
+
+    Args:
+        value (str): Parameter value
+
+    Returns:
+        bool: Whether ``datetime.fromisoformat`` accepts it
+    """
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def source_filename(source: Optional[str]) -> Optional[str]:
+    """
+    Resolve the ``source`` query parameter to the data file it names.
+
+    ``generator`` (the default) is the simulator's ``machine_data.json`` and
+    ``ingested`` the file ``POST /api/readings`` appends to.
+
+    Args:
+        source (str): Parameter value, or None if it was not given
+
+    Returns:
+        Optional[str]: Data file name, or None for an unknown source
+    """
+    return DATA_SOURCES.get(DEFAULT_SOURCE if source is None else source)
@@ -0,0 +1,8 @@
+from flask import Blueprint
+from controllers.anomalies_controller import get_anomalies
+
+anomalies_routes = Blueprint('anomalies_routes', __name__)
+
+@anomalies_routes.route('/anomalies', methods=['GET'])
+def list_anomalies():
+    return get_anomalies()
@@ -1,8 +1,20 @@
 from flask import Blueprint
-from controllers.data_controller import get_processed_data
+from controllers.data_controller import get_processed_data, get_rollup_data, get_utilization_data, stream_processed_data
 
 data_routes = Blueprint('data_routes', __name__)
 
 @data_routes.route('/data', methods=['GET'])
 def get_data():
-    return get_processed_data()
\ No newline at end of file
+    return get_processed_data()
+
+@data_routes.route('/data/stream', methods=['GET'])
+def stream_data():
+    return stream_processed_data()
+
+@data_routes.route('/data/rollups', methods=['GET'])
+def get_rollups():
+    return get_rollup_data()
+
+@data_routes.route('/data/utilization', methods=['GET'])
+def get_utilization():
+    return get_utilization_data()
\ No newline at end of file
@@ -0,0 +1,8 @@
+from flask import Blueprint
+from controllers.metrics_controller import get_metrics
+
+metrics_routes = Blueprint('metrics_routes', __name__)
+
+@metrics_routes.route('/metrics', methods=['GET'])
+def read_metrics():
+    return get_metrics()
@@ -0,0 +1,8 @@
+from flask import Blueprint
+from controllers.readings_controller import ingest_batch
+
+readings_routes = Blueprint('readings_routes', __name__)
+
+@readings_routes.route('/readings', methods=['POST'])
+def post_readings():
+    return ingest_batch()
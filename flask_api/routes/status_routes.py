@@ -1,8 +1,16 @@
 from flask import Blueprint
-from controllers.status_controller import update_status
+from controllers.status_controller import get_status, get_status_utilization, update_status
 
 status_routes = Blueprint('status_routes', __name__)
 
 @status_routes.route('/status', methods=['POST'])
 def set_status():
-    return update_status()
\ No newline at end of file
+    return update_status()
+
+@status_routes.route('/status', methods=['GET'])
+def read_status():
+    return get_status()
+
+@status_routes.route('/status/utilization', methods=['GET'])
+def read_status_utilization():
+    return get_status_utilization()
@@ -0,0 +1,227 @@
+import unittest
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from analytics.data_analytics import scan_anomalies
+from data_process import anomaly_detection
+from data_process.anomaly_detection import (
+    DEFAULT_DETECTORS, DETECTORS, AnomalyMonitor, Detector, MedianMadDetector, _sorted_mad, anomaly_directory,
+    detect_batch, latest_anomalies, make_detector, query_anomalies, register_detector
+)
+from data_process.data_generator import continuous_data_generation
+from data_process.data_processor import process_machine_data
+from data_process.ingest import ingest_readings
+from data_process.storage import SegmentedLog, data_file_path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+
+from app import app
+
+START = datetime(2023, 1, 1)
+
+
+def make_series(count, seed=3):
+    """Noisy series with a slow drift, a level shift and a few spikes."""
+    rng = random.Random(seed)
+    values = []
+    for i in range(count):
+        value = 25 + i * 0.001 + rng.gauss(0, 0.5) + (3 if i > count // 2 else 0)
+        if rng.random() < 0.01:
+            value += rng.choice([-1, 1]) * rng.uniform(4, 8)
+        values.append(round(value, 2))
+    return values
+
+
+def make_readings(count, machines=2):
+    temperatures = make_series(count * machines, seed=5)
+    speeds = make_series(count * machines, seed=6)
+    return [
+        {
+            'timestamp': (START + timedelta(seconds=i // machines)).isoformat(),
+            'temperature': temperatures[i],
+            'speed': speeds[i],
+            'status': 'RUNNING',
+            'machine_id': f'machine-{i % machines}'
+        }
+        for i in range(count * machines)
+    ]
+
+
+class TestDetectors(unittest.TestCase):
+    def test_batch_matches_streaming(self):
+        """Vectorized batch scoring flags the same values as one-by-one updates."""
+        values = make_series(5000)
+        for name, params in DEFAULT_DETECTORS + (('mad', {'window': 15, 'threshold': 3.0}),):
+            detector = make_detector(name, **params)
+            streamed = Detector.batch(detector, values)
+            batched = detector.batch(values)
+            self.assertGreater(len(streamed), 20, name)
+            self.assertEqual([i for i, _, _ in batched], [i for i, _, _ in streamed], name)
+            for (_, expected, score), (_, streamed_expected, streamed_score) in zip(batched, streamed):
+                self.assertAlmostEqual(expected, streamed_expected, places=9)
+                self.assertAlmostEqual(score, streamed_score, places=6)
+
+    def test_spikes_are_flagged(self):
+        values = [20.0 + (i % 7) * 0.1 for i in range(200)]
+        values[150] = 35.0
+        for name, params in DEFAULT_DETECTORS:
+            detector = make_detector(name, **params)
+            flagged = [i for i, value in enumerate(values) if detector.update(value)]
+            self.assertIn(150, flagged, name)
+
+    def test_state_is_bounded(self):
+        detector = MedianMadDetector(window=10)
+        for value in make_series(1000):
+            detector.update(value)
+        self.assertEqual(len(detector._sorted), 10)
+        self.assertEqual(detector._sorted, sorted(detector._arrivals))
+
+    def test_sorted_mad(self):
+        """The binary-search MAD equals the median of absolute deviations."""
+        rng = random.Random(11)
+        for size in (1, 2, 3, 10, 11, 60):
+            for _ in range(20):
+                values = sorted(rng.choice([rng.randint(0, 5), rng.random()]) for _ in range(size))
+                median = statistics.median(values)
+                self.assertEqual(_sorted_mad(values, median), statistics.median(abs(v - median) for v in values))
+
+    def test_registry(self):
+        with self.assertRaises(ValueError):
+            make_detector('prophet')
+        with self.assertRaises(ValueError):
+            make_detector('ewma', alpha=2)
+
+        class FixedLimit(Detector):
+            name = 'limit'
+
+            def __init__(self, limit=30.0):
+                super().__init__(limit)
+
+            def _fresh(self):
+                return FixedLimit(self.threshold)
+
+            def _score(self, value):
+                return self.threshold, value
+
+            def _add(self, value):
+                pass
+
+        register_detector('limit', FixedLimit)
+        self.addCleanup(DETECTORS.pop, 'limit')
+        monitor = AnomalyMonitor(detectors=[('limit', {'limit': 30.0})], fields=['temperature'])
+        detections = monitor.update({'timestamp': START.isoformat(), 'temperature': 31.0})
+        self.assertEqual([(d['detector'], d['value']) for d in detections], [('limit', 31.0)])
+
+
+class TestAnomalyMonitor(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_monitor_matches_batch_and_logs(self):
+        """Per-machine streaming detections equal a batch scan and are logged by time."""
+        readings = make_readings(1500)
+        monitor = AnomalyMonitor(os.path.join(self.test_dir, 'anomalies'))
+        streamed = []
+        for i in range(0, len(readings), 100):
+            streamed.extend(monitor.update_many(readings[i:i + 100]))
+
+        self.assertEqual(detect_batch(readings), streamed)
+        self.assertEqual(list(monitor.iter_detections()), streamed)
+        self.assertEqual({d['machine_id'] for d in streamed}, {'machine-0', 'machine-1'})
+
+        middle = readings[1000]['timestamp']
+        self.assertEqual(list(monitor.iter_detections(middle, None, 'machine-1')),
+                         [d for d in streamed if d['timestamp'] >= middle and d['machine_id'] == 'machine-1'])
+
+    def test_latest_anomalies_of_a_fleet_tick(self):
+        """Every machine of a tick gets its own detections, whatever their order in the log."""
+        filepath = os.path.join(self.test_dir, 'machine_data.json')
+        tick, later = START.isoformat(), (START + timedelta(seconds=1)).isoformat()
+
+        def detection(timestamp, machine_id, field):
+            found = {'timestamp': timestamp, 'field': field, 'detector': 'zscore', 'value': 1.0,
+                     'expected': 0.0, 'score': 4.0}
+            if machine_id is not None:
+                found['machine_id'] = machine_id
+            return found
+
+        SegmentedLog(anomaly_directory(filepath)).append_many([
+            detection(tick, 'machine-1', 'temperature'), detection(tick, None, 'speed'),
+            detection(tick, 'machine-0', 'temperature'), detection(tick, 'machine-2', 'speed'),
+            detection(tick, 'machine-0', 'speed'), detection(later, 'machine-0', 'temperature')
+        ])
+
+        def fields(machine_id):
+            reading = {'timestamp': tick}
+            if machine_id is not None:
+                reading['machine_id'] = machine_id
+            return [d['field'] for d in latest_anomalies(filepath, reading)]
+
+        self.assertEqual(fields('machine-0'), ['temperature', 'speed'])
+        self.assertEqual(fields('machine-2'), ['speed'])
+        self.assertEqual(fields(None), ['speed'])
+        self.assertEqual(fields('machine-3'), [])
+
+
+class TestAnomalyIntegration(unittest.TestCase):
+    def setUp(self):
+        self.filename = 'anomaly_test_machine_data.json'
+        self.clean()
+
+    def tearDown(self):
+        self.clean()
+
+    def clean(self):
+        filepath = data_file_path(self.filename)
+        for directory in (os.path.splitext(filepath)[0], filepath + '.rollups', filepath + '.status',
+                          anomaly_directory(filepath)):
+            shutil.rmtree(directory, ignore_errors=True)
+        anomaly_detection._monitors.pop(filepath, None)
+
+    def test_ingested_readings_are_scored(self):
+        """Ingested readings are scored live; the processor and batch scan agree with the log."""
+        readings = make_readings(300, machines=1)
+        readings[-1]['temperature'] = 60.0
+        ingest_readings(readings, self.filename)
+
+        logged = query_anomalies(data_file_path(self.filename))
+        self.assertEqual(logged, scan_anomalies(self.filename))
+        processed = process_machine_data(self.filename, window_size=5, machine_id='machine-0')
+        self.assertEqual({(a['field'], a['detector']) for a in processed['anomalies']},
+                         {('temperature', name) for name, _ in DEFAULT_DETECTORS})
+
+        temperature = query_anomalies(data_file_path(self.filename), start=readings[-1]['timestamp'],
+                                      field='temperature', detector='mad')
+        self.assertEqual([a['value'] for a in temperature], [60.0])
+
+    def test_generator_warms_up_before_its_first_tick(self):
+        """The detectors replay stored readings when generation starts, not inside the first write."""
+        class PausedScheduler:
+            def every(self, interval, func):
+                self.job = func
+
+        ingest_readings(make_readings(50, machines=1), self.filename)
+        anomaly_detection._monitors.pop(data_file_path(self.filename), None)
+        continuous_data_generation(filename=self.filename, scheduler=PausedScheduler())
+        self.assertIn(data_file_path(self.filename), anomaly_detection._monitors)
+
+    def test_endpoint_validation(self):
+        client = app.test_client()
+        response = client.get('/api/anomalies?from=2023-01-01T00:00:00&detector=zscore')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('anomalies', response.get_json())
+        self.assertEqual(client.get('/api/anomalies?from=later').status_code, 400)
+        self.assertEqual(client.get('/api/anomalies?field=status').status_code, 400)
+        self.assertEqual(client.get('/api/anomalies?detector=prophet').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import patch
+
+from data_process.scheduler import Scheduler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+
+from asgi import app as asgi_app
+from controllers import data_controller, status_controller
+from lib.asgi import AsgiApp, build_environ
+from lib.broadcast import AsyncSubscription, Broadcaster, ChangeFeed
+from data_process.status_store import MemoryStatusStore
+
+
+def http_scope(method, path, query_string=b'', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': query_string,
+            'headers': list(headers), 'http_version': '1.1', 'scheme': 'http'}
+
+
+async def request(app, scope, body=b''):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+class TestAsgiApp(unittest.TestCase):
+    def test_wsgi_routes_run_on_thread_pool(self):
+        """Regular routes are served by the Flask app."""
+        sent = asyncio.run(request(asgi_app, http_scope('GET', '/')))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'application/json'), sent[0]['headers'])
+        self.assertEqual(json.loads(sent[1]['body']), {"status": "API is running!"})
+
+    def test_request_body_and_headers_reach_flask(self):
+        body = json.dumps({'status': 'started'}).encode()
+        scope = http_scope('POST', '/api/status', headers=[(b'content-type', b'application/json')])
+        with patch.object(status_controller, '_status_store', MemoryStatusStore()):
+            sent = asyncio.run(request(asgi_app, scope, body))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(json.loads(sent[1]['body'])['current_status']['current_status'], 'STARTED')
+
+    def test_environ(self):
+        scope = http_scope('GET', '/api/data', b'window=60', [(b'if-none-match', b'"a"'), (b'x-tag', b'1'),
+                                                              (b'x-tag', b'2')])
+        environ = build_environ(scope, b'')
+        self.assertEqual(environ['QUERY_STRING'], 'window=60')
+        self.assertEqual(environ['HTTP_IF_NONE_MATCH'], '"a"')
+        self.assertEqual(environ['HTTP_X_TAG'], '1,2')
+
+    def test_lifespan(self):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        app = AsgiApp(lambda environ, start_response: [])
+        asyncio.run(app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_stream_is_served_on_event_loop(self):
+        """Stream clients wait as coroutines and get events until they disconnect."""
+        scheduler = Scheduler(max_workers=1)
+        scheduler.start()
+        version = [1]
+        feed = ChangeFeed(lambda: f"event: reading\ndata: {version[0]}\n\n", lambda: version[0], scheduler,
+                          interval=0.01)
+        app = AsgiApp(lambda environ, start_response: [], streams={'/stream': feed}, heartbeat=0.05)
+
+        async def watch():
+            disconnect = asyncio.Event()
+            sent = []
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                body = message.get('body', b'')
+                if body.endswith(b'data: 1\n\n'):
+                    version[0] = 2
+                elif body.endswith(b'data: 2\n\n'):
+                    disconnect.set()
+
+            await asyncio.wait_for(app(http_scope('GET', '/stream'), receive, send), 5)
+            return sent
+
+        try:
+            sent = asyncio.run(watch())
+        finally:
+            scheduler.stop()
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), sent[0]['headers'])
+        events = [m['body'] for m in sent[1:] if not m['body'].startswith(b':')]
+        self.assertEqual(events, [b'event: reading\ndata: 1\n\n', b'event: reading\ndata: 2\n\n'])
+        self.assertEqual(feed.broadcaster.subscriber_count, 0)
+
+    def test_entry_point_streams_live_feed(self):
+        self.assertIs(asgi_app.streams['/api/data/stream'], data_controller.live_feeds['generator'])
+        self.assertIs(asgi_app.streams['/api/data/stream?source=ingested'], data_controller.live_feeds['ingested'])
+
+
+class TestAsyncSubscription(unittest.TestCase):
+    def test_slow_async_subscriber_is_dropped(self):
+        async def scenario():
+            broadcaster = Broadcaster(queue_size=1)
+            subscription = broadcaster.subscribe(AsyncSubscription(asyncio.get_running_loop(), 1))
+            broadcaster.publish('a')
+            broadcaster.publish('b')
+            return subscription.dropped, await asyncio.wait_for(subscription.get_async(), 1)
+
+        self.assertEqual(asyncio.run(scenario()), (True, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from benchmarks.harness import compare, latency_result, load_results, result_key, save_results, throughput_result
+from benchmarks.suite import FILE_PREFIX, run
+from data_process.storage import data_file_path
+
+
+class TestHarness(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_results_round_trip(self):
+        results = [latency_result('analyze_data', 1000, [0.01, 0.03, 0.02]), throughput_result('api', None, [0.5, 0.5])]
+        self.assertEqual(results[0]['value'], 0.02)
+        self.assertEqual(results[1]['value'], 2.0)
+        self.assertEqual([result_key(result) for result in results], ['analyze_data[1000]', 'api'])
+
+        path = os.path.join(self.test_dir, 'results', 'run.json')
+        save_results(path, results)
+        self.assertEqual(load_results(path), results)
+
+    def test_compare_flags_slowdowns_only(self):
+        """Latency going up and throughput going down beyond the tolerance are regressions."""
+        baseline = [latency_result('a', 1, [1.0]), throughput_result('b', 1, [1.0]), latency_result('c', 1, [1.0])]
+        results = [latency_result('a', 1, [1.5]), throughput_result('b', 1, [0.5]), latency_result('c', 1, [0.5]),
+                   latency_result('new', 1, [1.0])]
+        comparisons = {c['key']: c for c in compare(results, baseline, tolerance=0.25)}
+        self.assertEqual(sorted(comparisons), ['a[1]', 'b[1]', 'c[1]'])
+        self.assertTrue(comparisons['a[1]']['regression'])
+        self.assertFalse(comparisons['b[1]']['regression'])
+        self.assertAlmostEqual(comparisons['b[1]']['change'], 1.0)
+        self.assertAlmostEqual(comparisons['c[1]']['change'], 1.0)
+        self.assertFalse(compare(results, baseline, tolerance=0.6)[0]['regression'])
+
+
+class TestSuite(unittest.TestCase):
+    def test_smoke_run(self):
+        """Every benchmark runs at a tiny size and leaves no data files behind."""
+        results = run(sizes=(50,), min_time=0.01)
+        self.assertEqual(
+            {result['name'] for result in results},
+            {'save_data_to_json', 'process_machine_data', 'analyze_data', 'detect_anomalies', 'api_data',
+             'api_data_cached'}
+        )
+        self.assertTrue(all(result['value'] > 0 for result in results))
+        data_folder = os.path.dirname(data_file_path('x'))
+        leftovers = os.listdir(data_folder) if os.path.isdir(data_folder) else []
+        self.assertEqual([name for name in leftovers if name.startswith(FILE_PREFIX)], [])
+
+        with self.assertRaises(ValueError):
+            run(sizes=(50,), only=['nope'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from analytics.data_analytics import analyze_columns, analyze_values
+from data_process.columnar_store import (
+    ColumnarStore, convert_to_columnar, micros_to_timestamp, timestamp_to_micros
+)
+from data_process.data_generator import save_data_to_json
+from data_process.data_processor import process_machine_data
+from data_process.storage import data_file_path, open_store
+
+
+def make_reading(i, machine_id=None):
+    reading = {
+        'timestamp': (datetime(2023, 1, 1) + timedelta(seconds=i, microseconds=7 * i)).isoformat(),
+        'temperature': 20.0 + (i % 10) * 1.25,
+        'speed': 40.0 + (i % 7) * 2.5,
+        'status': ['IDLE', 'RUNNING', 'PAUSED'][i % 3]
+    }
+    if machine_id is not None:
+        reading['machine_id'] = machine_id
+    return reading
+
+
+class TestColumnarStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'machine_data.columns')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        """Readings come back unchanged, including machine ids."""
+        store = ColumnarStore(self.path)
+        readings = [make_reading(i, f'machine-{i % 2}' if i % 3 else None) for i in range(20)]
+        store.append_many(readings[:5])
+        store.append_many(readings[5:])
+
+        self.assertEqual(store.count(), 20)
+        self.assertEqual(store.read_all(), readings)
+        self.assertEqual(store.tail(3), readings[-3:])
+        self.assertEqual(store.tail(2, 'machine-1'), [r for r in readings if r.get('machine_id') == 'machine-1'][-2:])
+
+    def test_columns_are_memory_mapped(self):
+        """Column slices are views on the mapped files with the documented dtypes."""
+        store = ColumnarStore(self.path)
+        store.append_many([make_reading(i) for i in range(10)])
+
+        columns = store.columns(2, 5)
+        self.assertEqual(columns['temperature'].dtype.str, '<f8')
+        self.assertEqual(columns['timestamp'].dtype.str, '<i8')
+        self.assertEqual(columns['status'].dtype.str, '|u1')
+        self.assertEqual(len(columns['speed']), 3)
+        self.assertFalse(columns['speed'].flags.writeable)
+
+    def test_torn_row_is_hidden_and_recovered(self):
+        """A row missing from one column is invisible and cut off by the next writer."""
+        ColumnarStore(self.path).append_many([make_reading(i) for i in range(3)])
+        with open(os.path.join(self.path, 'temperature.bin'), 'ab') as f:
+            f.write(b'\x00' * 12)
+
+        store = ColumnarStore(self.path)
+        self.assertEqual(store.count(), 3)
+        store.append(make_reading(3))
+        self.assertEqual(store.read_all(), [make_reading(i) for i in range(4)])
+
+    def test_missing_store_raises(self):
+        """Reading a store that does not exist raises FileNotFoundError."""
+        with self.assertRaises(FileNotFoundError):
+            ColumnarStore(self.path).read_all()
+
+    def test_convert_legacy_json(self):
+        """The converter copies a legacy JSON array file into a columnar store."""
+        readings = [make_reading(i) for i in range(7)]
+        legacy_path = os.path.join(self.test_dir, 'machine_data.json')
+        with open(legacy_path, 'w') as f:
+            json.dump(readings, f, indent=2)
+
+        self.assertEqual(convert_to_columnar(legacy_path, self.path, batch_size=3), 7)
+        self.assertIsInstance(open_store(self.path), ColumnarStore)
+        self.assertEqual(open_store(self.path).read_all(), readings)
+        with self.assertRaises(FileExistsError):
+            convert_to_columnar(legacy_path, self.path)
+
+    def test_analyze_columns_matches_records(self):
+        """Analytics over mapped columns match the record-based analysis."""
+        readings = [make_reading(i) for i in range(50)] + [dict(make_reading(50), temperature=90.0)]
+        store = ColumnarStore(self.path)
+        store.append_many(readings)
+
+        analysis = analyze_columns(store)
+        self.assertEqual(analysis['temperature'], analyze_values([r['temperature'] for r in readings]))
+        self.assertEqual(analysis['speed'], analyze_values([r['speed'] for r in readings]))
+        self.assertEqual(analysis['period'], {'start': readings[0]['timestamp'], 'end': readings[-1]['timestamp']})
+
+    def test_generator_and_processor_use_columnar_files(self):
+        """Data files ending in .columns are written and read as columnar stores."""
+        filename = 'columnar_test_machine_data.columns'
+        self.remove_data_file(filename)
+        try:
+            readings = [save_data_to_json(filename) for _ in range(4)]
+            self.assertTrue(ColumnarStore(data_file_path(filename)).exists())
+
+            # A window the rolling aggregator does not track is read from storage
+            processed = process_machine_data(filename, window_size=3)
+            expected = round(sum(r['speed'] for r in readings[-3:]) / 3, 2)
+            self.assertEqual(processed['speed']['moving_average'], expected)
+            self.assertEqual(processed['timestamp'], readings[-1]['timestamp'])
+        finally:
+            self.remove_data_file(filename)
+
+    def remove_data_file(self, filename):
+        filepath = data_file_path(filename)
+        for suffix in ('', '.rollups', '.status', '.anomalies'):
+            shutil.rmtree(filepath + suffix, ignore_errors=True)
+
+    def test_timestamp_conversion(self):
+        """ISO timestamps survive the int64 epoch encoding."""
+        timestamp = '2024-05-06T07:08:09.123456'
+        self.assertEqual(micros_to_timestamp(timestamp_to_micros(timestamp)), timestamp)
+        self.assertEqual(timestamp_to_micros('1970-01-01T01:00:00+01:00'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
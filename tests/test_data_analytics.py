@@ -2,6 +2,7 @@ import unittest
 import os
 import json
 import logging
+import random
 import tempfile
 from typing import List, Dict
 
@@ -10,7 +11,9 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 # Update the import to match the project structure
-from analytics.data_analytics import calculate_average, detect_anomalies, analyze_data
+from analytics.data_analytics import (
+    calculate_average, detect_anomalies, analyze_data, analyze_values, analyze_values_vectorized
+)
 
 class TestDataAnalytics(unittest.TestCase):
     def setUp(self):
@@ -90,6 +93,50 @@ class TestDataAnalytics(unittest.TestCase):
         self.assertEqual(len(anomalies), 0)
         logger.info("test_detect_anomalies_insufficient_data: Success. No anomalies with insufficient data")
 
+    def test_vectorized_matches_pure_python(self):
+        """Test that the NumPy path returns exactly the pure-Python results."""
+        rng = random.Random(0)
+        datasets = [
+            [round(rng.uniform(20.0, 30.0), 2) for _ in range(5000)] + [45.0, 5.5],
+            [rng.choice([40, 50, 60, 90]) for _ in range(1000)],
+            [10.0, 10.5, 50.0, 10.2, 9.9],
+            [42.5]
+        ]
+        for values in datasets:
+            for threshold in (0.2, 0.1):
+                expected = analyze_values(values, threshold)
+                result = analyze_values_vectorized(values, threshold)
+                self.assertEqual(result, expected)
+                self.assertEqual(type(result['min']), type(expected['min']))
+        logger.info("test_vectorized_matches_pure_python: Success. Vectorized results identical")
+
+    def test_analyze_data_without_numpy(self):
+        """Test analyze_data falls back to the pure-Python path without NumPy."""
+        test_data = [
+            {'temperature': 25.0, 'speed': 50.0, 'timestamp': '2023-01-01 00:00:00'},
+            {'temperature': 26.0, 'speed': 55.0, 'timestamp': '2023-01-01 00:01:00'},
+            {'temperature': 100.0, 'speed': 80.0, 'timestamp': '2023-01-01 00:02:00'}
+        ]
+        test_filename = 'fallback_machine_data.json'
+        with open(os.path.join(self.data_dir, test_filename), 'w') as f:
+            json.dump(test_data, f)
+
+        import analytics.data_analytics as data_analytics
+        original_dirname = data_analytics.os.path.dirname
+        original_np = data_analytics.np
+        data_analytics.os.path.dirname = lambda x: self.test_dir
+
+        try:
+            vectorized = analyze_data(test_filename)
+            data_analytics.np = None
+            fallback = analyze_data(test_filename)
+            self.assertEqual(fallback, vectorized)
+            self.assertEqual(fallback['temperature']['max'], 100.0)
+            logger.info("test_analyze_data_without_numpy: Success. Fallback matches vectorized path")
+        finally:
+            data_analytics.os.path.dirname = original_dirname
+            data_analytics.np = original_np
+
     def test_analyze_data_valid_data(self):
         """Test analyze_data with valid JSON input."""
         # Prepare test data with clear anomalies
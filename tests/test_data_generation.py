@@ -1,12 +1,14 @@
 import unittest
 import os
 import json
+import shutil
 import time
 from datetime import datetime
 import threading
 
 # Import the functions to test
 from data_process.data_generator import generate_machine_data, save_data_to_json, continuous_data_generation
+from data_process.storage import SegmentedLog, log_directory, open_store
 import data_process.data_generator as data_generation
 
 class TestMachineDataGeneration(unittest.TestCase):
@@ -16,6 +18,14 @@ class TestMachineDataGeneration(unittest.TestCase):
         self.base_test_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.data_folder = os.path.join(self.base_test_dir, 'data')
         os.makedirs(self.data_folder, exist_ok=True)
+
+    def clean(self, filepath):
+        """Remove a data file, its segmented log and the logs derived from it."""
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        shutil.rmtree(log_directory(filepath), ignore_errors=True)
+        for suffix in ('.rollups', '.status', '.anomalies'):
+            shutil.rmtree(filepath + suffix, ignore_errors=True)
         
     def test_generate_machine_data(self):
         """Test generate_machine_data function."""
@@ -52,33 +62,34 @@ class TestMachineDataGeneration(unittest.TestCase):
         test_filepath = os.path.join(self.data_folder, test_filename)
         
         # Ensure clean test environment
-        if os.path.exists(test_filepath):
-            os.remove(test_filepath)
+        self.clean(test_filepath)
+        self.addCleanup(self.clean, test_filepath)
         
         # Save initial data
         first_data = save_data_to_json(test_filename, max_entries=3)
         
-        # Verify file was created
-        self.assertTrue(os.path.exists(test_filepath))
+        # Verify the log was created
+        self.assertTrue(os.path.isdir(log_directory(test_filepath)))
         
         # Read and verify contents
-        with open(test_filepath, 'r') as f:
-            saved_data = json.load(f)
+        saved_data = open_store(test_filepath).read_all()
         
         # Check data was saved correctly
         self.assertEqual(len(saved_data), 1)
         self.assertEqual(saved_data[0], first_data)
         
-        # Save more data to test max_entries
-        for _ in range(5):
-            save_data_to_json(test_filename, max_entries=3)
-        
-        # Reread file
-        with open(test_filepath, 'r') as f:
-            saved_data = json.load(f)
-        
-        # Verify max_entries works
-        self.assertLessEqual(len(saved_data), 3)
+        # Segments hold 3 entries and the oldest one is dropped once the
+        # newer ones hold 3, so between 3 and 5 of the newest entries remain
+        written = [first_data]
+        for kept in (2, 3, 4, 5, 3, 4, 5, 3):
+            written.append(save_data_to_json(test_filename, max_entries=3))
+            self.assertEqual(open_store(test_filepath).read_all(), written[-kept:])
+        
+        # The bound belongs to the log: omitting it keeps it, changing it fails
+        written.append(save_data_to_json(test_filename))
+        self.assertEqual(open_store(test_filepath).read_all(), written[-4:])
+        with self.assertRaises(ValueError):
+            save_data_to_json(test_filename, max_entries=5)
     
     def test_continuous_data_generation(self):
         """Test continuous_data_generation function."""
@@ -87,8 +98,8 @@ class TestMachineDataGeneration(unittest.TestCase):
         test_filepath = os.path.join(self.data_folder, test_filename)
         
         # Ensure clean test environment
-        if os.path.exists(test_filepath):
-            os.remove(test_filepath)
+        self.clean(test_filepath)
+        self.addCleanup(self.clean, test_filepath)
         
         # Track generated threads
         generated_threads = []
@@ -102,10 +113,11 @@ class TestMachineDataGeneration(unittest.TestCase):
         # import data_generation
         original_save_func = data_generation.save_data_to_json
         data_generation.save_data_to_json = mock_save_data_to_json
+        job = None
         
         try:
             # Start continuous generation
-            continuous_data_generation(interval=0.1, filename=test_filename)
+            job = continuous_data_generation(interval=0.1, filename=test_filename)
             
             # Wait a bit to allow some threads to generate
             time.sleep(0.5)
@@ -113,56 +125,55 @@ class TestMachineDataGeneration(unittest.TestCase):
             # Verify threads were created
             self.assertGreater(len(generated_threads), 1)
             
-            # Verify file was created
-            self.assertTrue(os.path.exists(test_filepath))
+            # Verify the log was created
+            self.assertTrue(os.path.isdir(log_directory(test_filepath)))
             
-            # Verify file contains data
-            with open(test_filepath, 'r') as f:
-                saved_data = json.load(f)
+            # Verify the log contains data
+            saved_data = open_store(test_filepath).read_all()
             
             self.assertGreater(len(saved_data), 0)
         
         finally:
-            # Restore original function
+            # Stop generation and restore original function
+            if job is not None:
+                job.cancel()
             data_generation.save_data_to_json = original_save_func
     
     def test_json_file_handling(self):
-        """Test handling of existing and non-existing JSON files."""
+        """Test migration of legacy JSON files and handling of corrupted records."""
         # Filename for this test
         test_filename = 'json_handling_test.json'
         test_filepath = os.path.join(self.data_folder, test_filename)
         
         # Ensure clean test environment
-        if os.path.exists(test_filepath):
-            os.remove(test_filepath)
-        
-        # Test saving to a non-existing file
-        first_data = save_data_to_json(test_filename, max_entries=3)
-        
-        # Verify file was created
-        self.assertTrue(os.path.exists(test_filepath))
-        
-        # Read and verify contents
-        with open(test_filepath, 'r') as f:
-            saved_data = json.load(f)
+        self.clean(test_filepath)
+        self.addCleanup(self.clean, test_filepath)
         
-        # Check data was saved correctly
-        self.assertEqual(len(saved_data), 1)
-        self.assertEqual(saved_data[0], first_data)
-        
-        # Simulate corrupted JSON file
+        # Legacy JSON array files are still readable
+        legacy_data = [generate_machine_data(), generate_machine_data()]
         with open(test_filepath, 'w') as f:
-            f.write('invalid json')
-        
-        # Try saving to a file with invalid JSON
-        second_data = save_data_to_json(test_filename, max_entries=3)
-        
-        # Verify file was overwritten with valid data
-        with open(test_filepath, 'r') as f:
-            saved_data = json.load(f)
-        
-        self.assertEqual(len(saved_data), 1)
-        self.assertEqual(saved_data[0], second_data)
+            json.dump(legacy_data, f, indent=2)
+        self.assertEqual(open_store(test_filepath).read_all(), legacy_data)
+        
+        # The first save migrates the legacy data into the log
+        first_data = save_data_to_json(test_filename)
+        saved_data = open_store(test_filepath).read_all()
+        self.assertEqual(saved_data, legacy_data + [first_data])
+        
+        # Simulate a torn write at the end of the active segment
+        segment = sorted(os.listdir(log_directory(test_filepath)))[-1]
+        with open(os.path.join(log_directory(test_filepath), segment), 'a') as f:
+            f.write('{"timestamp": "invalid json')
+        
+        # Readers skip the corrupted record
+        saved_data = open_store(test_filepath).read_all()
+        self.assertEqual(saved_data, legacy_data + [first_data])
+        
+        # A writer reopening the log after the crash recovers the segment
+        second_data = generate_machine_data()
+        SegmentedLog(log_directory(test_filepath)).append(second_data)
+        saved_data = open_store(test_filepath).read_all()
+        self.assertEqual(saved_data[-1], second_data)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
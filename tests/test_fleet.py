@@ -0,0 +1,118 @@
+import unittest
+import shutil
+from unittest.mock import patch
+
+from analytics.data_analytics import analyze_data
+from data_process import rolling_window
+from data_process.data_generator import save_fleet_data
+from data_process.data_processor import process_fleet_data, process_machine_data
+from data_process.fleet import STATUSES, MachineFleet, machine_id_for
+from data_process.reading_buffer import ReadingBuffer
+from data_process.storage import data_file_path, log_directory
+
+
+class TestMachineFleet(unittest.TestCase):
+    def test_generate_one_reading_per_machine(self):
+        """Each tick yields one reading per machine with the expected fields."""
+        fleet = MachineFleet(50, seed=1)
+        readings = fleet.generate()
+
+        self.assertEqual(len(readings), 50)
+        self.assertEqual([r['machine_id'] for r in readings], [machine_id_for(i) for i in range(50)])
+        self.assertEqual(len({r['timestamp'] for r in readings}), 1)
+        for reading in readings:
+            self.assertGreaterEqual(reading['temperature'], 20.0)
+            self.assertLessEqual(reading['temperature'], 30.0)
+            self.assertGreaterEqual(reading['speed'], 40.0)
+            self.assertLessEqual(reading['speed'], 60.0)
+            self.assertIn(reading['status'], STATUSES)
+
+    def test_seed_is_reproducible(self):
+        """The same seed produces the same readings."""
+        first = MachineFleet(10, seed=7).tick()
+        second = MachineFleet(10, seed=7).tick()
+        self.assertEqual(first['temperature'].tolist(), second['temperature'].tolist())
+        self.assertEqual(first['status'].tolist(), second['status'].tolist())
+
+    def test_machines_follow_their_own_baseline(self):
+        """Machines keep distinct levels over time instead of sharing one distribution."""
+        fleet = MachineFleet(200, seed=3)
+        ticks = [fleet.tick()['temperature'] for _ in range(50)]
+        means = sum(ticks) / len(ticks)
+        self.assertGreater(means.std(), 0.5)
+
+    def test_invalid_size(self):
+        """Fleets need at least one machine."""
+        with self.assertRaises(ValueError):
+            MachineFleet(0)
+
+
+class TestMachineFilter(unittest.TestCase):
+    filename = 'fleet_test_machine_data.json'
+
+    def setUp(self):
+        self.clean()
+
+    def tearDown(self):
+        self.clean()
+
+    def clean(self):
+        filepath = data_file_path(self.filename)
+        shutil.rmtree(log_directory(filepath), ignore_errors=True)
+        for suffix in ('.rollups', '.status', '.anomalies'):
+            shutil.rmtree(filepath + suffix, ignore_errors=True)
+        for key in [key for key in rolling_window._aggregators if key[0] == filepath]:
+            del rolling_window._aggregators[key]
+
+    def test_storage_processing_and_analytics_filter_by_machine(self):
+        """Saved fleet ticks can be processed and analyzed per machine."""
+        fleet = MachineFleet(4, seed=5)
+        ticks = [save_fleet_data(fleet, self.filename) for _ in range(6)]
+        machine_id = machine_id_for(2)
+        own_readings = [tick[2] for tick in ticks]
+
+        processed = process_machine_data(self.filename, window_size=5, machine_id=machine_id)
+        self.assertEqual(processed['machine_id'], machine_id)
+        self.assertEqual(processed['temperature']['latest'], own_readings[-1]['temperature'])
+        expected = round(sum(r['temperature'] for r in own_readings[-5:]) / 5, 2)
+        self.assertEqual(processed['temperature']['moving_average'], expected)
+
+        analysis = analyze_data(self.filename, machine_id=machine_id)
+        self.assertEqual(analysis['temperature']['total_readings'], 6)
+        self.assertEqual(analysis['temperature']['max'], max(r['temperature'] for r in own_readings))
+
+    def test_processing_per_machine(self):
+        """Every machine gets its own moving averages; a mixed window gets none."""
+        fleet = MachineFleet(3, seed=4)
+        ticks = [save_fleet_data(fleet, self.filename) for _ in range(5)]
+        filepath = data_file_path(self.filename)
+        self.assertIsNone(rolling_window.find_aggregator(filepath))
+
+        report = process_fleet_data(fleet.machine_ids, self.filename)
+        self.assertEqual(sorted(report), fleet.machine_ids)
+        for position, machine_id in enumerate(fleet.machine_ids):
+            own_readings = [tick[position] for tick in ticks]
+            expected = round(sum(r['speed'] for r in own_readings) / 5, 2)
+            self.assertEqual(report[machine_id]['speed']['moving_average'], expected)
+            # Answered from the machine's aggregator, storage is not read
+            with patch('data_process.data_processor.open_store', side_effect=AssertionError("storage was read")):
+                self.assertEqual(process_machine_data(self.filename, machine_id=machine_id), report[machine_id])
+
+        self.assertEqual(process_fleet_data(fleet.machine_ids, self.filename, window_size=60), {})
+        with patch('builtins.print'):
+            self.assertEqual(process_machine_data(self.filename), {})
+
+    def test_buffer_filter_by_machine(self):
+        """The in-memory buffer returns the latest readings of one machine."""
+        fleet = MachineFleet(3, seed=2)
+        buffer = ReadingBuffer()
+        ticks = [fleet.generate() for _ in range(4)]
+        for tick in ticks:
+            buffer.publish_many(tick)
+
+        latest = buffer.latest(2, machine_id_for(1))
+        self.assertEqual(latest, [ticks[2][1], ticks[3][1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+from unittest.mock import patch
+
+from data_process import anomaly_detection, ingest, rollups, status_events
+from data_process.ingest import ingest_readings, parse_batch, validate_readings
+from data_process.rollups import rollup_directory
+from data_process.storage import data_file_path, open_store
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+
+from app import app
+from controllers import readings_controller
+from lib import validation
+
+
+def make_reading(i, **overrides):
+    reading = {'timestamp': f'2023-01-01T00:{i // 60:02d}:{i % 60:02d}', 'temperature': 20.0 + i % 5,
+               'speed': 50, 'status': 'RUNNING', 'machine_id': f'machine-{i % 3}'}
+    reading.update(overrides)
+    return reading
+
+
+class TestValidation(unittest.TestCase):
+    def test_valid_rows_pass_unchanged(self):
+        rows = [make_reading(i) for i in range(5)]
+        valid, errors = validate_readings(rows)
+        self.assertEqual(valid, rows)
+        self.assertEqual(errors, [])
+
+    def test_per_row_errors(self):
+        """Each invalid row is reported once, with its first problem."""
+        rows = [
+            make_reading(0),
+            'not an object',
+            {'temperature': 20.0, 'speed': 50.0, 'status': 'IDLE'},
+            make_reading(3, timestamp='yesterday'),
+            make_reading(4, temperature='hot'),
+            make_reading(5, speed=float('nan')),
+            make_reading(6, status='EXPLODED'),
+            make_reading(7, machine_id=7),
+            make_reading(8, temperature=True),
+            make_reading(9, extra='dropped'),
+            make_reading(10, status=['IDLE'], speed=[1, 2])
+        ]
+        valid, errors = validate_readings(rows)
+        with patch.object(ingest, 'np', None):
+            self.assertEqual(validate_readings(rows), (valid, errors))
+
+        self.assertEqual(valid, [make_reading(0), make_reading(9)])
+        self.assertEqual([error['index'] for error in errors], [1, 2, 3, 4, 5, 6, 7, 8, 10])
+        messages = [error['error'] for error in errors]
+        self.assertEqual(messages[1], "Missing field 'timestamp'")
+        self.assertEqual(messages[3], "'temperature' must be a number")
+        self.assertEqual(messages[4], "'speed' must be finite")
+        self.assertTrue(messages[5].startswith("'status' must be one of"))
+        self.assertEqual(messages[8], "'speed' must be a number")
+
+    def test_parse_ndjson_and_arrays(self):
+        rows = [make_reading(i) for i in range(3)]
+        ndjson = '\n'.join(json.dumps(row) for row in rows) + '\n{broken\n\n'
+        parsed, errors = parse_batch(ndjson.encode())
+        self.assertEqual(parsed[:3], rows)
+        self.assertEqual(list(errors), [3])
+        self.assertEqual(parse_batch(json.dumps(rows).encode()), (rows, {}))
+        with self.assertRaises(ValueError):
+            parse_batch(b'[1, 2')
+
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        self.filename = 'ingest_test_machine_data.json'
+        self.clean()
+
+    def tearDown(self):
+        self.clean()
+
+    def clean(self):
+        filepath = data_file_path(self.filename)
+        shutil.rmtree(os.path.splitext(filepath)[0], ignore_errors=True)
+        shutil.rmtree(rollup_directory(filepath), ignore_errors=True)
+        shutil.rmtree(filepath + '.status', ignore_errors=True)
+        shutil.rmtree(filepath + '.anomalies', ignore_errors=True)
+        # Writers of earlier tests still hold the state of the removed logs
+        for registry in (rollups._rollups, status_events._status_events, anomaly_detection._monitors):
+            registry.pop(filepath, None)
+
+    def test_batch_is_sorted_and_committed(self):
+        """Valid readings are stored in time order; late ones are rejected."""
+        rows = [make_reading(i) for i in (5, 3, 4)] + [make_reading(6, status=None)]
+        result = ingest_readings(rows, self.filename)
+        self.assertEqual((result['accepted'], result['rejected']), (3, 1))
+        self.assertEqual(open_store(data_file_path(self.filename)).read_all(), [make_reading(i) for i in (3, 4, 5)])
+
+        result = ingest_readings([make_reading(4), make_reading(7)], self.filename)
+        self.assertEqual(result['accepted'], 1)
+        self.assertEqual(result['errors'], [{'index': 0, 'error': "Reading is older than the newest stored reading"}])
+
+    def test_endpoint(self):
+        client = app.test_client()
+        with patch.object(readings_controller, 'INGEST_FILENAME', self.filename):
+            response = client.post('/api/readings', json=[make_reading(i) for i in range(100)])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json(), {'accepted': 100, 'rejected': 0, 'errors': []})
+
+            body = '\n'.join(json.dumps(make_reading(i)) for i in range(100, 103)) + '\nnot json'
+            response = client.post('/api/readings', data=body, content_type='application/x-ndjson')
+            self.assertEqual(response.get_json()['accepted'], 3)
+            self.assertTrue(response.get_json()['errors'][0]['error'].startswith('Invalid JSON'))
+
+            self.assertEqual(client.post('/api/readings', json=[{'speed': 1}]).status_code, 422)
+            self.assertEqual(client.post('/api/readings', data='{"a": ').status_code, 422)
+            self.assertEqual(client.post('/api/readings', data='[{"a": ').status_code, 400)
+            self.assertEqual(client.post('/api/readings', json=[]).status_code, 400)
+        self.assertEqual(len(open_store(data_file_path(self.filename)).read_all()), 103)
+
+    def test_read_endpoints_serve_ingested_readings(self):
+        """GET endpoints read the ingested data file with source=ingested."""
+        readings = [make_reading(i, machine_id='machine-0') for i in range(100)]
+        readings[-1]['temperature'] = 90.0
+        ingest_readings(readings, self.filename)
+
+        client = app.test_client()
+        with patch.dict(validation.DATA_SOURCES, {'ingested': self.filename}):
+            data = client.get('/api/data?source=ingested&window=3').get_json()
+            self.assertEqual(data['timestamp'], readings[-1]['timestamp'])
+            summary = client.get('/api/data/rollups?source=ingested').get_json()['summary']
+            self.assertEqual(summary['temperature']['total_readings'], 100)
+            utilization = client.get(f"/api/data/utilization?source=ingested&to={readings[-1]['timestamp']}")
+            self.assertEqual(utilization.get_json()['machines'], 1)
+            anomalies = client.get('/api/anomalies?source=ingested&field=temperature').get_json()['anomalies']
+            self.assertEqual({a['value'] for a in anomalies}, {90.0})
+        for path in ('/api/data', '/api/data/stream', '/api/data/rollups', '/api/data/utilization', '/api/anomalies'):
+            self.assertEqual(client.get(path + '?source=elsewhere').status_code, 400, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
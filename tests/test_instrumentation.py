@@ -0,0 +1,165 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+from data_process.instrumentation import Histogram, MetricsRegistry, Profile, instrumented, metrics
+from data_process.scheduler import Job, Scheduler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+
+from app import app
+from controllers import data_controller
+from lib import instrumentation as flask_instrumentation
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counters_gauges_and_histograms(self):
+        self.registry.inc('requests_total', route='/a')
+        self.registry.inc('requests_total', 2, route='/a')
+        self.registry.set('queue_depth', 7)
+        for value in (0.0001, 0.003, 0.003, 100.0):
+            self.registry.observe('latency_seconds', value, route='/a')
+
+        self.assertEqual(self.registry.value('requests_total', route='/a'), 3)
+        self.assertEqual(self.registry.value('queue_depth'), 7)
+        self.assertEqual(self.registry.value('latency_seconds', route='/a'), 4)
+        self.assertIsNone(self.registry.value('requests_total', route='/b'))
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+    def test_prometheus_text(self):
+        registry = MetricsRegistry(buckets=(0.5,))
+        registry.describe('latency_seconds', "Latency")
+        registry.inc('errors_total', function='say "hi"')
+        registry.observe('latency_seconds', 0.25, route='/api/data')
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE machine_data_errors_total counter', lines)
+        self.assertIn('machine_data_errors_total{function="say \\"hi\\""} 1', lines)
+        self.assertIn('# HELP machine_data_latency_seconds Latency', lines)
+        self.assertIn('# TYPE machine_data_latency_seconds histogram', lines)
+        self.assertIn('machine_data_latency_seconds_bucket{route="/api/data",le="0.5"} 1', lines)
+        self.assertIn('machine_data_latency_seconds_bucket{route="/api/data",le="+Inf"} 1', lines)
+        self.assertIn('machine_data_latency_seconds_sum{route="/api/data"} 0.25', lines)
+        self.assertIn('machine_data_latency_seconds_count{route="/api/data"} 1', lines)
+
+    def test_disabled_registry_records_nothing(self):
+        self.registry.enabled = False
+        self.registry.inc('requests_total')
+        with self.registry.timer('latency_seconds'):
+            pass
+        self.assertEqual(self.registry.render(), '\n')
+
+
+class TestInstrumented(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_times_calls_and_counts_errors(self):
+        @instrumented(name='divide')
+        def divide(a, b):
+            return a / b
+
+        self.assertEqual(divide(4, 2), 2)
+        with self.assertRaises(ZeroDivisionError):
+            divide(1, 0)
+        self.assertEqual(divide.__name__, 'divide')
+        self.assertEqual(metrics.value('function_duration_seconds', function='divide'), 2)
+        self.assertEqual(metrics.value('function_errors_total', function='divide'), 1)
+
+    def test_disabled_skips_recording(self):
+        @instrumented
+        def noop():
+            return 'done'
+
+        with patch.object(metrics, 'enabled', False):
+            self.assertEqual(noop(), 'done')
+        self.assertIsNone(metrics.value('function_duration_seconds', function='noop'))
+
+    def test_hot_paths_are_instrumented(self):
+        """Read failures of the processor are timed and counted."""
+        from data_process.data_processor import process_machine_data
+        self.assertEqual(process_machine_data('missing_instrumentation_test.json', machine_id='m'), {})
+        self.assertEqual(metrics.value('function_duration_seconds', function='process_machine_data'), 1)
+        self.assertEqual(metrics.value('read_errors_total', function='process_machine_data'), 1)
+
+    def test_scheduler_job_metrics(self):
+        scheduler = Scheduler(max_workers=1)
+        job = Job(lambda: 1 / 0, 1.0, name='failing')
+        scheduler._work.put(job)
+        scheduler._work.put(None)
+        with patch('builtins.print'):
+            scheduler._worker()
+        self.assertEqual(metrics.value('scheduler_job_duration_seconds', job='failing'), 1)
+        self.assertEqual(metrics.value('scheduler_job_failures_total', job='failing'), 1)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.client = app.test_client()
+
+    def test_requests_are_timed_by_route(self):
+        self.client.get('/')
+        self.client.get('/api/status/utilization')
+        response = self.client.get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        body = response.get_data(as_text=True)
+        self.assertIn('machine_data_http_requests_total{method="GET",route="/",status="200"} 1', body)
+        self.assertIn('machine_data_http_requests_total{method="GET",route="/api/status/utilization",status="400"} 1',
+                      body)
+        self.assertNotIn('machine_data_response_cache_hits_total ', body)
+        data_controller.response_cache.clear()
+        with patch.object(data_controller, 'data_version', return_value=(0, 0, 10, 1)), \
+                patch.object(data_controller, 'process_machine_data', return_value={'status': 'IDLE'}):
+            self.client.get('/api/data')
+            self.client.get('/api/data')
+        body = self.client.get('/api/metrics').get_data(as_text=True)
+        self.assertIn('# TYPE machine_data_response_cache_hits_total counter', body)
+        self.assertIn('machine_data_response_cache_hits_total 1', body)
+        self.assertIn('machine_data_response_cache_misses_total 1', body)
+        self.assertEqual(metrics.value('http_request_duration_seconds', method='GET', route='/', status='200'), 1)
+
+    def test_profiling_hook(self):
+        """Profiles are written only when enabled, and on request in header mode."""
+        profiles = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profiles)
+
+        with patch.object(flask_instrumentation, 'PROFILE_DIRECTORY', profiles):
+            self.assertNotIn('X-Profile-File', self.client.get('/').headers)
+            with patch.dict(os.environ, {flask_instrumentation.PROFILE_ENV: 'header'}):
+                self.assertNotIn('X-Profile-File', self.client.get('/').headers)
+                response = self.client.get('/', headers={'X-Profile': '1'})
+            with patch.dict(os.environ, {flask_instrumentation.PROFILE_ENV: 'all'}):
+                self.assertIn('X-Profile-File', self.client.get('/').headers)
+
+        path = response.headers['X-Profile-File']
+        self.assertEqual(os.path.dirname(path), profiles)
+        self.assertEqual(len(os.listdir(profiles)), 2)
+
+
+class TestProfile(unittest.TestCase):
+    def test_summary_names_the_profiled_code(self):
+        def busy():
+            return sum(i * i for i in range(1000))
+
+        with Profile(limit=10) as profile:
+            busy()
+        self.assertIn('busy', profile.summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
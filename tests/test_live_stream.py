@@ -0,0 +1,106 @@
+import unittest
+import json
+import os
+import queue
+import sys
+from unittest.mock import patch
+
+from data_process.scheduler import Scheduler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+
+from app import app
+from controllers import data_controller
+from lib.broadcast import Broadcaster, ChangeFeed
+
+
+class TestBroadcaster(unittest.TestCase):
+    def test_fan_out(self):
+        """Every subscriber receives every message in order."""
+        broadcaster = Broadcaster()
+        subscriptions = [broadcaster.subscribe() for _ in range(3)]
+        self.assertEqual(broadcaster.publish('a'), 3)
+        broadcaster.publish('b')
+        for subscription in subscriptions:
+            self.assertEqual([subscription.get(timeout=0), subscription.get(timeout=0)], ['a', 'b'])
+        self.assertEqual(broadcaster.latest, 'b')
+
+    def test_slow_subscriber_is_dropped(self):
+        """A full queue drops its subscriber without affecting the others."""
+        broadcaster = Broadcaster(queue_size=2)
+        slow = broadcaster.subscribe()
+        fast = broadcaster.subscribe()
+        for message in ('a', 'b'):
+            broadcaster.publish(message)
+            fast.get(timeout=0)
+        self.assertEqual(broadcaster.publish('c'), 1)
+
+        self.assertTrue(slow.dropped)
+        self.assertIsNone(slow.get(timeout=0))
+        self.assertEqual(fast.get(timeout=0), 'c')
+        self.assertEqual(broadcaster.subscriber_count, 1)
+
+    def test_get_times_out(self):
+        with self.assertRaises(queue.Empty):
+            Broadcaster().subscribe().get(timeout=0.01)
+
+
+class TestChangeFeed(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(max_workers=1)
+        self.scheduler.start()
+        self.version = 1
+        self.builds = 0
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def source(self):
+        self.builds += 1
+        return f'payload-{self.version}'
+
+    def test_publishes_once_per_version(self):
+        """The payload is built once per data change, however many subscribe."""
+        feed = ChangeFeed(self.source, lambda: self.version, self.scheduler, interval=0.01)
+        first, second = feed.subscribe(), feed.subscribe()
+        self.assertEqual(first.get(timeout=2), 'payload-1')
+        self.assertEqual(second.get(timeout=2), 'payload-1')
+
+        self.version = 2
+        self.assertEqual(first.get(timeout=2), 'payload-2')
+        self.assertEqual(second.get(timeout=2), 'payload-2')
+        self.assertEqual(self.builds, 2)
+        self.assertFalse(feed.poll())
+
+    def test_polling_stops_without_subscribers(self):
+        feed = ChangeFeed(self.source, lambda: self.version, self.scheduler, interval=0.01)
+        subscription = feed.subscribe()
+        job = feed._job
+        feed.unsubscribe(subscription)
+        self.assertTrue(job.cancelled)
+        self.assertIsNone(feed._job)
+
+
+class TestStreamEndpoint(unittest.TestCase):
+    def test_stream_sends_latest_reading(self):
+        """Clients get the latest processed reading as an SSE event."""
+        scheduler = Scheduler(max_workers=1)
+        scheduler.start()
+        feed = ChangeFeed(data_controller._latest_event, lambda: 1, scheduler, interval=0.01)
+        try:
+            with patch.dict(data_controller.live_feeds, {'generator': feed}), \
+                    patch.object(data_controller, 'process_machine_data', return_value={'status': 'IDLE'}):
+                response = app.test_client().get('/api/data/stream', buffered=False)
+                self.assertEqual(response.mimetype, 'text/event-stream')
+                event = next(response.response).decode()
+                response.close()
+        finally:
+            scheduler.stop()
+
+        self.assertTrue(event.startswith('event: reading\n'))
+        self.assertEqual(json.loads(event.split('data: ', 1)[1]), {'status': 'IDLE'})
+        self.assertEqual(feed.broadcaster.subscriber_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import os
+import random
+import shutil
+from datetime import datetime, timedelta
+
+from analytics.data_analytics import analyze_data
+from analytics.parallel import PartialAnalysis, analyze_data_parallel, analyze_machines_parallel
+from data_process.storage import SegmentedLog, data_file_path
+
+START = datetime(2023, 1, 1)
+
+
+def timestamp(seconds):
+    return (START + timedelta(seconds=seconds)).isoformat()
+
+
+def make_readings(count):
+    rng = random.Random(9)
+    return [
+        {
+            'timestamp': timestamp(i),
+            'temperature': round(rng.uniform(15.0, 35.0), 2),
+            'speed': round(rng.uniform(40.0, 60.0), 2),
+            'status': 'RUNNING',
+            'machine_id': f'machine-{i % 4}'
+        }
+        for i in range(count)
+    ]
+
+
+def assert_same_analysis(test, result, expected):
+    """Same results, with averages compared to the rounding analyze_data applies."""
+    test.assertEqual(result['period'], expected['period'])
+    for field in ('temperature', 'speed'):
+        for key in ('min', 'max', 'total_readings', 'anomalies'):
+            test.assertEqual(result[field][key], expected[field][key], (field, key))
+        test.assertAlmostEqual(result[field]['average'], expected[field]['average'], places=2)
+
+
+class TestParallelAnalytics(unittest.TestCase):
+    def setUp(self):
+        """Write a log of many small segments to the data folder."""
+        self.filename = 'parallel_test_machine_data.json'
+        self.directory = os.path.splitext(data_file_path(self.filename))[0]
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.readings = make_readings(2500)
+        SegmentedLog(self.directory, segment_max_records=300).append_many(self.readings)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_matches_analyze_data(self):
+        """Merged partials give analyze_data's results, across worker counts and ranges."""
+        cases = [{}, {'machine_id': 'machine-1'}, {'start': timestamp(250), 'end': timestamp(1999)}]
+        for kwargs in cases:
+            expected = analyze_data(self.filename, **kwargs)
+            for workers in (1, 3):
+                assert_same_analysis(self, analyze_data_parallel(self.filename, workers=workers, **kwargs), expected)
+
+    def test_second_pass_offsets_indices(self):
+        """Anomalies found per segment in the second pass keep analyze_data's indices."""
+        expected = analyze_data(self.filename, 'machine-2')
+        for workers in (1, 3):
+            assert_same_analysis(self, analyze_data_parallel(self.filename, 'machine-2', workers=workers), expected)
+
+    def test_per_machine_in_one_pass(self):
+        results = analyze_machines_parallel(self.filename, end=timestamp(2200), workers=2)
+        self.assertEqual(sorted(results), [f'machine-{i}' for i in range(4)])
+        for machine_id, result in results.items():
+            assert_same_analysis(self, result, analyze_data(self.filename, machine_id, end=timestamp(2200)))
+
+    def test_empty_and_missing(self):
+        with self.assertRaises(ValueError):
+            analyze_data_parallel(self.filename, start=timestamp(10 ** 6), workers=1)
+        self.assertEqual(analyze_data_parallel('missing_parallel_test.json', workers=1), {})
+
+    def test_partials_merge_in_order(self):
+        first, second = PartialAnalysis(), PartialAnalysis()
+        first.update(self.readings[:10])
+        second.update(self.readings[10:20])
+        first.merge(second).merge(PartialAnalysis())
+        self.assertEqual(first.count, 20)
+        self.assertEqual((first.first, first.last), (timestamp(0), timestamp(19)))
+        self.assertEqual(first.stats['speed'].maximum, max(r['speed'] for r in self.readings[:20]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+
+from data_process.data_generator import publish_machine_data
+from data_process.data_processor import process_machine_data
+from data_process.reading_buffer import BufferFlusher, ReadingBuffer
+from data_process.storage import SegmentedLog
+
+
+class TestReadingBuffer(unittest.TestCase):
+    def test_latest_keeps_capacity(self):
+        """Only the newest `capacity` readings are kept in memory."""
+        buffer = ReadingBuffer(capacity=3)
+        for i in range(5):
+            buffer.publish({'seq': i})
+
+        self.assertEqual(buffer.latest(2), [{'seq': 3}, {'seq': 4}])
+        self.assertEqual(buffer.latest(10), [{'seq': 2}, {'seq': 3}, {'seq': 4}])
+        self.assertEqual(buffer.published, 5)
+
+    def test_pending_is_not_bounded_by_capacity(self):
+        """Every published reading is handed to the flusher exactly once."""
+        buffer = ReadingBuffer(capacity=2)
+        for i in range(5):
+            buffer.publish({'seq': i})
+
+        self.assertEqual([r['seq'] for r in buffer.take_pending()], [0, 1, 2, 3, 4])
+        self.assertEqual(buffer.take_pending(), [])
+
+    def test_concurrent_publishers(self):
+        """Publishing from several threads loses no readings."""
+        buffer = ReadingBuffer(capacity=10)
+
+        def publish_many():
+            for i in range(1000):
+                buffer.publish({'seq': i})
+
+        threads = [threading.Thread(target=publish_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(buffer.published, 4000)
+        self.assertEqual(len(buffer.take_pending()), 4000)
+
+    def test_process_from_buffer(self):
+        """The processor computes moving averages from the shared buffer."""
+        buffer = ReadingBuffer()
+        readings = [publish_machine_data(buffer, 'buffer_test_machine_data.json') for _ in range(5)]
+
+        # A window size the rolling aggregator does not track is read from the buffer
+        processed = process_machine_data('buffer_test_machine_data.json', window_size=3, buffer=buffer)
+        expected = round(sum(r['temperature'] for r in readings[-3:]) / 3, 2)
+        self.assertEqual(processed['temperature']['moving_average'], expected)
+        self.assertEqual(processed['timestamp'], readings[-1]['timestamp'])
+
+
+class TestBufferFlusher(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log = SegmentedLog(os.path.join(self.test_dir, 'machine_data'))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_stop_flushes_pending(self):
+        """Stopping the flusher persists readings still in the buffer."""
+        buffer = ReadingBuffer()
+        flusher = BufferFlusher(buffer, self.log, interval=60)
+        flusher.start()
+        for i in range(3):
+            buffer.publish({'seq': i})
+        flusher.stop()
+
+        self.assertEqual(self.log.read_all(), [{'seq': 0}, {'seq': 1}, {'seq': 2}])
+
+    def test_failed_flush_keeps_readings(self):
+        """Readings are put back when the store cannot be written."""
+        class FailingStore:
+            def append_many(self, records):
+                raise OSError("disk full")
+
+        buffer = ReadingBuffer()
+        buffer.publish({'seq': 0})
+        with self.assertRaises(OSError):
+            BufferFlusher(buffer, FailingStore()).flush()
+
+        self.assertEqual(buffer.take_pending(), [{'seq': 0}])
+
+    def test_on_commit_follows_successful_commits(self):
+        """Committed readings are handed on; readings of a failed commit are not."""
+        class FailingStore:
+            def append_many(self, records):
+                raise OSError("disk full")
+
+        committed = []
+        buffer = ReadingBuffer()
+        buffer.publish_many([{'seq': 0}, {'seq': 1}])
+        with self.assertRaises(OSError):
+            BufferFlusher(buffer, FailingStore(), on_commit=committed.append).flush()
+        self.assertEqual(committed, [])
+
+        buffer.publish({'seq': 2})
+        BufferFlusher(buffer, self.log, on_commit=committed.append).flush()
+        self.assertEqual(committed, [[{'seq': 0}, {'seq': 1}, {'seq': 2}]])
+        self.assertEqual(self.log.read_all(), committed[0])
+
+    def test_full_batch_commits_before_interval(self):
+        """Reaching max_batch pending readings commits them without waiting for the interval."""
+        buffer = ReadingBuffer()
+        flusher = BufferFlusher(buffer, self.log, interval=60, max_batch=4)
+        flusher.start()
+        self.addCleanup(flusher.stop)
+        buffer.publish_many([{'seq': i} for i in range(3)])
+        buffer.publish({'seq': 3})
+
+        for _ in range(200):
+            if buffer.pending == 0 and flusher.commits:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(flusher.commits, 1)
+        self.assertEqual(len(self.log.read_all()), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
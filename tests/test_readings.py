@@ -0,0 +1,135 @@
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+
+from analytics.data_analytics import analyze_values, analyze_values_vectorized
+from analytics.parallel import PartialAnalysis
+from data_process.readings import MAX_STATUSES, ReadingBatch, read_batch
+from data_process.storage import SegmentedLog
+
+
+def make_reading(i, machine_id=None):
+    reading = {
+        'timestamp': (datetime(2023, 1, 1) + timedelta(seconds=i, microseconds=7 * i)).isoformat(),
+        'temperature': 20.0 + (i % 10) * 1.25,
+        'speed': 40.0 + (i % 7) * 2.5,
+        'status': ['IDLE', 'RUNNING', 'PAUSED'][i % 3]
+    }
+    if machine_id is not None:
+        reading['machine_id'] = machine_id
+    return reading
+
+
+class TestReadingBatch(unittest.TestCase):
+    def setUp(self):
+        self.readings = [make_reading(i, f'machine-{i % 3}' if i % 4 else None) for i in range(40)]
+
+    def test_round_trip(self):
+        batch = ReadingBatch(self.readings[:10])
+        batch.extend(self.readings[10:])
+        self.assertEqual(len(batch), 40)
+        self.assertEqual(batch.to_records(), self.readings)
+        self.assertEqual(batch.record(5), self.readings[5])
+        self.assertEqual((batch.first, batch.last), (self.readings[0]['timestamp'], self.readings[-1]['timestamp']))
+        self.assertEqual(batch.machines, ['machine-1', 'machine-2', 'machine-0'])
+
+    def test_compact_columns(self):
+        """29 bytes per reading, in columns NumPy reads without copying."""
+        batch = ReadingBatch(self.readings)
+        self.assertEqual(batch.nbytes, 29 * len(self.readings))
+        temperature = np.asarray(batch.temperature)
+        self.assertEqual(temperature.tolist(), [r['temperature'] for r in self.readings])
+        batch.temperature[0] = -1.0
+        self.assertEqual(temperature[0], -1.0)
+        with self.assertRaises(AttributeError):
+            batch.extra = 1
+
+    def test_statuses(self):
+        """Missing and unknown statuses get codes of their own."""
+        readings = [
+            {'timestamp': '2023-01-01T00:00:00', 'temperature': 1.0, 'speed': 2.0},
+            {'timestamp': '2023-01-01T00:00:01', 'temperature': 1.0, 'speed': 2.0, 'status': 'MAINTENANCE'}
+        ]
+        batch = ReadingBatch(readings)
+        self.assertEqual(batch.to_records(), readings)
+
+        batch = ReadingBatch()
+        with self.assertRaises(ValueError):
+            batch.extend({'timestamp': '2023-01-01T00:00:00', 'temperature': 1.0, 'speed': 2.0, 'status': str(i)}
+                         for i in range(MAX_STATUSES))
+
+    def test_shared_timestamps(self):
+        """Readings of a fleet tick share a timestamp and keep it."""
+        readings = [dict(make_reading(i // 5), machine_id=f'machine-{i % 5}') for i in range(20)]
+        batch = ReadingBatch(readings)
+        self.assertEqual(batch.to_records(), readings)
+        self.assertEqual(len(set(batch.micros)), 4)
+
+    def test_integer_readings_stay_exact(self):
+        """Integers are kept as ints until a float joins their column."""
+        readings = [dict(make_reading(i), temperature=t) for i, t in enumerate([25, 40, 31, 90])]
+        batch = ReadingBatch(readings)
+        self.assertEqual(batch.temperature.typecode, 'q')
+        self.assertEqual(batch.speed.typecode, 'd')
+        self.assertEqual(batch.to_records(), readings)
+        result = analyze_values_vectorized(batch.temperature)
+        self.assertEqual(result, analyze_values([25, 40, 31, 90]))
+        self.assertIs(type(result['min']), int)
+        self.assertIs(type(result['anomalies'][0]['value']), int)
+
+        batch.append(dict(make_reading(4), temperature=30.5))
+        self.assertEqual(batch.temperature.tolist(), [25.0, 40.0, 31.0, 90.0, 30.5])
+        self.assertIs(type(batch.record(0)['temperature']), float)
+
+    def test_without_timestamps(self):
+        """Only the first and last timestamps are kept, and none is parsed."""
+        with patch('data_process.readings.timestamp_to_micros', side_effect=AssertionError):
+            batch = ReadingBatch(self.readings, timestamps=False)
+        self.assertIsNone(batch.micros)
+        self.assertEqual(len(batch), 40)
+        self.assertEqual(batch.nbytes, 21 * len(self.readings))
+        self.assertEqual((batch.first, batch.last), (self.readings[0]['timestamp'], self.readings[-1]['timestamp']))
+        self.assertEqual(batch.speed.tolist(), [r['speed'] for r in self.readings])
+
+    def test_partial_analysis_from_batch(self):
+        expected, result = PartialAnalysis(), PartialAnalysis()
+        expected.update(self.readings)
+        result.update_batch(ReadingBatch(self.readings[:25]))
+        result.update_batch(ReadingBatch())
+        result.update_batch(ReadingBatch(self.readings[25:]))
+        for field in ('temperature', 'speed'):
+            self.assertEqual(result.stats[field].total, expected.stats[field].total)
+            self.assertEqual(result.stats[field].minimum, expected.stats[field].minimum)
+        self.assertEqual((result.first, result.last, result.count), (expected.first, expected.last, expected.count))
+
+
+class TestReadBatch(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.readings = [make_reading(i, f'machine-{i % 3}') for i in range(50)]
+        self.log = SegmentedLog(os.path.join(self.test_dir, 'machine_data'), segment_max_records=8)
+        self.log.append_many(self.readings)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_matches_reads(self):
+        start, end = self.readings[10]['timestamp'], self.readings[30]['timestamp']
+        self.assertEqual(read_batch(self.log).to_records(), self.log.read_all())
+        self.assertEqual(read_batch(self.log, machine_id='machine-2').to_records(), self.log.read_all('machine-2'))
+        self.assertEqual(read_batch(self.log, start, end, 'machine-1').to_records(),
+                         self.log.read_range(start, end, 'machine-1'))
+        self.assertEqual(len(read_batch(self.log, machine_id='missing')), 0)
+
+    def test_missing_store_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            read_batch(SegmentedLog(os.path.join(self.test_dir, 'missing')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+from data_process.columnar_store import ColumnarStore
+from data_process.storage import JsonFileStore, SegmentedLog
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+
+from app import app
+from controllers import data_controller
+from lib.response_cache import ResponseCache
+
+
+def make_reading(i):
+    return {'timestamp': f'2023-01-01T00:00:{i:02d}', 'temperature': 20.0 + i, 'speed': 50.0, 'status': 'IDLE'}
+
+
+class TestStorageVersion(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def assert_changes_on_append(self, store):
+        store.append(make_reading(0))
+        before = store.version()
+        self.assertEqual(store.version(), before)
+        store.append(make_reading(1))
+        self.assertNotEqual(store.version(), before)
+
+    def test_segmented_log_version(self):
+        """The log version changes on appends, rollovers and retention."""
+        log = SegmentedLog(os.path.join(self.test_dir, 'machine_data'), segment_max_records=2, max_records=2)
+        with self.assertRaises(FileNotFoundError):
+            log.version()
+        self.assert_changes_on_append(log)
+        versions = set()
+        for i in range(2, 8):
+            log.append(make_reading(i))
+            versions.add(log.version())
+        self.assertEqual(len(versions), 6)
+
+    def test_columnar_version(self):
+        """The columnar version follows the row count."""
+        self.assert_changes_on_append(ColumnarStore(os.path.join(self.test_dir, 'machine_data.columns')))
+
+    def test_legacy_file_version(self):
+        """Legacy files are versioned by mtime and size."""
+        path = os.path.join(self.test_dir, 'legacy.json')
+        with open(path, 'w') as f:
+            f.write('[]')
+        version = JsonFileStore(path).version()
+        with open(path, 'w') as f:
+            f.write('[ ]')
+        self.assertNotEqual(JsonFileStore(path).version(), version)
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_entries_follow_version(self):
+        """Entries are only served for the version they were built from."""
+        cache = ResponseCache(max_entries=2)
+        cache.put('a', 1, b'one')
+        self.assertEqual(cache.get('a', 1), b'one')
+        self.assertIsNone(cache.get('a', 2))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put('a', 1, b'a')
+        cache.put('b', 1, b'b')
+        cache.get('a', 1)
+        cache.put('c', 1, b'c')
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.get('a', 1), b'a')
+
+
+class TestCachedDataEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        data_controller.response_cache.clear()
+        self.version = (0, 0, 10, 1)
+        self.version_patch = patch.object(data_controller, 'data_version', side_effect=lambda filename: self.version)
+        self.process_patch = patch.object(data_controller, 'process_machine_data', return_value={'status': 'IDLE'})
+        self.version_patch.start()
+        self.process = self.process_patch.start()
+
+    def tearDown(self):
+        self.version_patch.stop()
+        self.process_patch.stop()
+
+    def test_repeated_polls_are_served_from_cache(self):
+        """Data is only processed again once its version changes."""
+        first = self.client.get('/api/data')
+        second = self.client.get('/api/data')
+        self.assertEqual(first.get_json(), {'status': 'IDLE'})
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(self.process.call_count, 1)
+
+        self.client.get('/api/data?window=60')
+        self.assertEqual(self.process.call_count, 2)
+
+        self.version = (0, 0, 20, 2)
+        self.client.get('/api/data')
+        self.assertEqual(self.process.call_count, 3)
+
+    def test_matching_etag_returns_not_modified(self):
+        """If-None-Match with the current ETag gets an empty 304."""
+        etag = self.client.get('/api/data').headers['ETag']
+        response = self.client.get('/api/data', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        self.version = (0, 0, 20, 2)
+        response = self.client.get('/api/data', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_new_detections_invalidate_cache(self):
+        """Detections logged after the readings change the cache key and the ETag."""
+        with patch.object(data_controller, 'anomalies_version', return_value=None) as anomalies:
+            etag = self.client.get('/api/data').headers['ETag']
+            anomalies.return_value = (0, 0, 1, 1)
+            response = self.client.get('/api/data', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.process.call_count, 2)
+
+    def test_missing_data_is_not_cached(self):
+        """Without a data version, every request is processed and untagged."""
+        self.version = None
+        self.process.return_value = {}
+        response = self.client.get('/api/data')
+        self.client.get('/api/data')
+        self.assertNotIn('ETag', response.headers)
+        self.assertEqual(self.process.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
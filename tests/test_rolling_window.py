@@ -0,0 +1,81 @@
+import unittest
+import random
+import statistics
+
+from data_process.rolling_window import RollingAggregator, RollingWindow
+
+
+class TestRollingWindow(unittest.TestCase):
+    def test_matches_full_recompute(self):
+        """Running statistics match a recompute over the last `size` values."""
+        rng = random.Random(42)
+        window = RollingWindow(7)
+        values = []
+        for _ in range(100):
+            value = round(rng.uniform(20.0, 30.0), 2)
+            values.append(value)
+            window.push(value)
+
+            recent = values[-7:]
+            self.assertEqual(window.count, len(recent))
+            self.assertAlmostEqual(window.mean, sum(recent) / len(recent), places=9)
+            self.assertEqual(window.minimum, min(recent))
+            self.assertEqual(window.maximum, max(recent))
+            self.assertAlmostEqual(window.variance, statistics.pvariance(recent), places=9)
+
+    def test_empty_window(self):
+        """An empty window reports zeros and no min/max."""
+        window = RollingWindow(3)
+        self.assertEqual(window.count, 0)
+        self.assertEqual(window.mean, 0)
+        self.assertIsNone(window.minimum)
+        self.assertIsNone(window.maximum)
+        self.assertEqual(window.variance, 0.0)
+
+    def test_invalid_size(self):
+        """Window sizes must be positive."""
+        with self.assertRaises(ValueError):
+            RollingWindow(0)
+
+
+class TestRollingAggregator(unittest.TestCase):
+    def make_reading(self, temperature, speed):
+        return {'timestamp': '2023-01-01T00:00:00', 'temperature': temperature, 'speed': speed, 'status': 'RUNNING'}
+
+    def test_moving_averages_per_window(self):
+        """Each window size averages its own number of readings."""
+        aggregator = RollingAggregator(window_sizes=(2, 4))
+        for i in range(1, 5):
+            aggregator.update(self.make_reading(float(i), 10.0 * i))
+
+        latest, averages = aggregator.moving_averages(2)
+        self.assertEqual(latest['temperature'], 4.0)
+        self.assertEqual(averages, {'temperature': 3.5, 'speed': 35.0})
+
+        _, averages = aggregator.moving_averages(4)
+        self.assertEqual(averages, {'temperature': 2.5, 'speed': 25.0})
+
+    def test_moving_averages_unavailable(self):
+        """Untracked or partially filled windows are not answered."""
+        aggregator = RollingAggregator(window_sizes=(3,))
+        self.assertIsNone(aggregator.moving_averages(3))
+
+        aggregator.update(self.make_reading(1.0, 1.0))
+        self.assertIsNone(aggregator.moving_averages(3))
+        self.assertIsNone(aggregator.moving_averages(5))
+
+    def test_snapshot(self):
+        """Snapshots report statistics for every field and window."""
+        aggregator = RollingAggregator(window_sizes=(2,))
+        aggregator.update(self.make_reading(1.0, 5.0))
+        aggregator.update(self.make_reading(3.0, 5.0))
+
+        snapshot = aggregator.snapshot()
+        self.assertEqual(snapshot['temperature'][2], {
+            'count': 2, 'sum': 4.0, 'average': 2.0, 'min': 1.0, 'max': 3.0, 'variance': 1.0
+        })
+        self.assertEqual(snapshot['speed'][2]['variance'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
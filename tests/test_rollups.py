@@ -0,0 +1,173 @@
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from analytics.data_analytics import summarize_data
+from data_process.data_generator import save_data_to_json
+from data_process.rollups import RollupBucket, Rollups, get_rollups, rollup_directory
+from data_process.storage import SegmentedLog, data_file_path
+
+START = datetime(2023, 1, 1)
+
+
+def timestamp(seconds):
+    return (START + timedelta(seconds=seconds)).isoformat()
+
+
+def make_readings(count, step=420):
+    return [
+        {
+            'timestamp': timestamp(i * step),
+            'temperature': 20.0 + (i % 10) * 0.5,
+            'speed': 40.0 + (i % 7) * 0.25,
+            'status': ['IDLE', 'RUNNING', 'PAUSED'][i % 3],
+            'machine_id': f'machine-{i % 2}'
+        }
+        for i in range(count)
+    ]
+
+
+def expected_summary(readings, start=None, end=None, machine_id=None):
+    bucket = RollupBucket(0)
+    for reading in readings:
+        if start is not None and reading['timestamp'] < start:
+            continue
+        if end is not None and reading['timestamp'] >= end:
+            continue
+        if machine_id is None or reading['machine_id'] == machine_id:
+            bucket.add(reading)
+    return bucket.summary() if bucket.count else None
+
+
+class CountingLog(SegmentedLog):
+    """Segmented log that counts the raw readings handed out by range reads."""
+
+    read = 0
+
+    def iter_range(self, start=None, end=None, machine_id=None):
+        for record in super().iter_range(start, end, machine_id):
+            self.read += 1
+            yield record
+
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        """Create a raw log and its rollups in a temporary directory."""
+        self.test_dir = tempfile.mkdtemp()
+        self.raw = CountingLog(os.path.join(self.test_dir, 'machine_data'))
+        self.rollups = Rollups(os.path.join(self.test_dir, 'machine_data.rollups'))
+        # About ten days of readings, one every seven minutes
+        self.readings = make_readings(2000)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.test_dir)
+
+    def ingest(self, readings, rollups=None):
+        self.raw.append_many(readings)
+        (rollups or self.rollups).update_many(readings)
+
+    def test_summaries_match_raw_readings(self):
+        """Summaries are exact for aligned, unaligned and open-ended ranges."""
+        self.ingest(self.readings)
+        ranges = [(None, None), (timestamp(0), timestamp(86400 * 3)), (timestamp(3599), timestamp(86400 * 4 + 61)),
+                  (timestamp(86400 * 9.5), None), (None, timestamp(123457)), (timestamp(10), timestamp(20))]
+        for start, end in ranges:
+            for machine_id in (None, 'machine-1'):
+                self.assertEqual(
+                    self.rollups.summarize(self.raw, start, end, machine_id),
+                    expected_summary(self.readings, start, end, machine_id),
+                    (start, end, machine_id)
+                )
+
+    def test_long_ranges_read_buckets_not_readings(self):
+        """Only the edges and the still-open buckets are read from raw data."""
+        self.ingest(self.readings)
+        self.rollups.summarize(self.raw, timestamp(3600 * 5 + 90), timestamp(86400 * 8 + 30))
+        self.assertLessEqual(self.raw.read, 2)
+
+    def test_series_buckets(self):
+        """Series merge machines per bucket and cover every reading in range."""
+        self.ingest(self.readings)
+        series = self.rollups.series(self.raw, '1d', timestamp(0), timestamp(86400 * 10))
+        self.assertEqual(len(series), 10)
+        self.assertEqual(series[1]['timestamp'], timestamp(86400))
+        self.assertNotIn('machine_id', series[1])
+        self.assertEqual(sum(bucket['count'] for bucket in series), expected_summary(
+            self.readings, end=timestamp(86400 * 10))['temperature']['total_readings'])
+
+        hourly = self.rollups.series(self.raw, '1h', timestamp(3600), timestamp(7200), 'machine-0')
+        self.assertEqual([bucket['machine_id'] for bucket in hourly], ['machine-0'])
+        with self.assertRaises(ValueError):
+            self.rollups.series(self.raw, '1w')
+
+    def test_choose_tier(self):
+        """The finest tier that keeps the chart within the point limit is used."""
+        self.assertEqual(self.rollups.choose_tier(timestamp(0), timestamp(3600)), '1m')
+        self.assertEqual(self.rollups.choose_tier(timestamp(0), timestamp(86400 * 7)), '1h')
+        self.assertEqual(self.rollups.choose_tier(timestamp(0), timestamp(86400 * 365)), '1d')
+        self.assertEqual(self.rollups.choose_tier(None, timestamp(0)), '1d')
+
+    def test_late_readings_are_left_out(self):
+        """A reading for a closed bucket is counted as late, not into the open bucket."""
+        late = dict(self.readings[3], timestamp=timestamp(3 * 420 + 1))
+        self.ingest(self.readings[:10])
+        self.rollups.update(late)
+        self.ingest(self.readings[10:])
+
+        self.assertEqual(self.rollups.late_readings, 1)
+        self.assertEqual(self.rollups.summarize(self.raw), expected_summary(self.readings))
+        self.assertEqual(self.rollups.series(self.raw, '1m', timestamp(9 * 420), timestamp(9 * 420 + 60))[0]['count'], 1)
+
+    def test_restart_and_backfill(self):
+        """A new writer rebuilds its open buckets, and missing tiers, from raw readings."""
+        self.ingest(self.readings[:1234])
+        restarted = Rollups(self.rollups.directory)
+        restarted.catch_up(self.raw)
+        self.ingest(self.readings[1234:], restarted)
+        self.assertEqual(restarted.summarize(self.raw), expected_summary(self.readings))
+        self.assertEqual(
+            restarted.series(self.raw, '1h', timestamp(0), timestamp(86400)),
+            self.rollups.series(self.raw, '1h', timestamp(0), timestamp(86400))
+        )
+
+        backfilled = Rollups(os.path.join(self.test_dir, 'backfilled.rollups'))
+        backfilled.catch_up(self.raw)
+        self.assertEqual(backfilled.covered_until('1d'), restarted.covered_until('1d'))
+        self.raw.read = 0
+        self.assertEqual(backfilled.summarize(self.raw), expected_summary(self.readings))
+        self.assertLess(self.raw.read, 10)
+
+
+class TestIngestRollups(unittest.TestCase):
+    def setUp(self):
+        self.filename = 'rollup_test_machine_data.json'
+        self.clean()
+
+    def tearDown(self):
+        self.clean()
+
+    def clean(self):
+        filepath = data_file_path(self.filename)
+        shutil.rmtree(os.path.splitext(filepath)[0], ignore_errors=True)
+        shutil.rmtree(rollup_directory(filepath), ignore_errors=True)
+        shutil.rmtree(filepath + '.status', ignore_errors=True)
+        shutil.rmtree(filepath + '.anomalies', ignore_errors=True)
+
+    def test_generator_feeds_rollups(self):
+        """Saved readings are counted into the rollups of their data file."""
+        readings = [save_data_to_json(self.filename) for _ in range(3)]
+        self.assertIs(get_rollups(data_file_path(self.filename)), get_rollups(data_file_path(self.filename)))
+
+        summary = summarize_data(self.filename)
+        self.assertEqual(summary['temperature']['total_readings'], 3)
+        self.assertEqual(summary['speed']['max'], max(r['speed'] for r in readings))
+        self.assertEqual(summary['period'], {'start': readings[0]['timestamp'], 'end': readings[-1]['timestamp']})
+        with self.assertRaises(ValueError):
+            summarize_data(self.filename, start=timestamp(0), end=timestamp(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import threading
+import time
+
+from data_process.scheduler import Job, Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(max_workers=2)
+        self.scheduler.start()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_fixed_rate_does_not_drift(self):
+        """A job's run time does not push its following runs back."""
+        run_times = []
+
+        def slow_job():
+            run_times.append(time.monotonic())
+            time.sleep(0.03)
+
+        self.scheduler.every(0.05, slow_job)
+        time.sleep(0.52)
+
+        # A Timer-style schedule would only fit ~6 runs of 0.05 + 0.03 seconds
+        self.assertGreaterEqual(len(run_times), 9)
+        gaps = [b - a for a, b in zip(run_times, run_times[1:])]
+        self.assertAlmostEqual(sum(gaps) / len(gaps), 0.05, delta=0.01)
+
+    def test_overrunning_job_is_skipped(self):
+        """Runs that come due while the previous run is active are skipped."""
+        release = threading.Event()
+        job = self.scheduler.every(0.02, release.wait)
+        time.sleep(0.15)
+        release.set()
+        time.sleep(0.03)
+
+        self.assertGreater(job.overruns, 0)
+        self.assertLess(job.runs, 4)
+
+    def test_many_jobs_share_workers(self):
+        """Hundreds of jobs run without creating a thread per tick."""
+        counts = [0] * 200
+
+        def make_job(i):
+            def job():
+                counts[i] += 1
+            return job
+
+        threads_before = threading.active_count()
+        for i in range(200):
+            self.scheduler.every(0.05, make_job(i), jitter=0.01)
+        time.sleep(0.3)
+
+        self.assertTrue(all(count >= 3 for count in counts))
+        self.assertLessEqual(threading.active_count(), threads_before)
+
+    def test_cancel(self):
+        """Cancelled jobs stop running."""
+        calls = []
+        job = self.scheduler.every(0.02, calls.append, 1)
+        time.sleep(0.07)
+        job.cancel()
+        time.sleep(0.03)
+        count = len(calls)
+        time.sleep(0.07)
+
+        self.assertGreater(count, 0)
+        self.assertEqual(len(calls), count)
+
+    def test_failing_job_keeps_running(self):
+        """An exception in one run does not stop later runs."""
+        job = self.scheduler.every(0.02, lambda: 1 / 0, name='failing')
+        time.sleep(0.1)
+        self.assertGreater(job.runs, 1)
+
+    def test_stop(self):
+        """Stopping joins the threads and rejects new jobs."""
+        self.scheduler.stop()
+        with self.assertRaises(RuntimeError):
+            self.scheduler.every(1, lambda: None)
+
+    def test_invalid_interval(self):
+        """Intervals must be positive."""
+        with self.assertRaises(ValueError):
+            Job(lambda: None, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
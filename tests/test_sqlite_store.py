@@ -0,0 +1,181 @@
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from analytics.data_analytics import analyze_data, analyze_sqlite, analyze_values
+from data_process import sqlite_store
+from data_process.data_generator import save_data_to_json
+from data_process.data_processor import process_machine_data
+from data_process.sqlite_store import SqliteStore, convert_to_sqlite
+from data_process.storage import BACKEND_ENV, SegmentedLog, data_file_path, open_store, open_writer
+
+
+def make_reading(i, machine_id=None):
+    reading = {
+        'timestamp': (datetime(2023, 1, 1) + timedelta(seconds=i, microseconds=7 * i)).isoformat(),
+        'temperature': 20.0 + (i % 10) * 1.25 + (15.0 if i % 17 == 0 else 0.0),
+        'speed': 40.0 + (i % 7) * 2.5,
+        'status': ['IDLE', 'RUNNING', 'PAUSED'][i % 3]
+    }
+    if machine_id is not None:
+        reading['machine_id'] = machine_id
+    return reading
+
+
+class TestSqliteStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'machine_data.sqlite')
+        self.readings = [make_reading(i, f'machine-{i % 3}' if i % 4 else None) for i in range(60)]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip_and_indexed_reads(self):
+        """Readings come back unchanged, by time range, machine and from the end."""
+        store = SqliteStore(self.path)
+        store.append_many(self.readings[:10])
+        store.append_many(self.readings[10:])
+
+        self.assertEqual(store.read_all(), self.readings)
+        self.assertEqual(store.tail(3), self.readings[-3:])
+        machine = [r for r in self.readings if r.get('machine_id') == 'machine-1']
+        self.assertEqual(store.read_all('machine-1'), machine)
+        self.assertEqual(store.tail(2, 'machine-1'), machine[-2:])
+        start, end = self.readings[12]['timestamp'], self.readings[40]['timestamp']
+        self.assertEqual(store.read_range(start, end), self.readings[12:40])
+        self.assertEqual(store.read_range(start, end, 'machine-2'),
+                         [r for r in self.readings[12:40] if r.get('machine_id') == 'machine-2'])
+
+    def test_missing_store_raises(self):
+        store = SqliteStore(self.path)
+        with self.assertRaises(FileNotFoundError):
+            store.tail(1)
+        with self.assertRaises(FileNotFoundError):
+            store.version()
+        self.assertFalse(store.exists())
+
+    def test_version_and_retention(self):
+        store = SqliteStore(self.path, max_records=25)
+        store.append_many(self.readings[:30])
+        before = store.version()
+        self.assertEqual(store.version(), before)
+        store.append_many(self.readings[30:])
+        self.assertNotEqual(store.version(), before)
+        self.assertEqual(store.read_all(), self.readings[-25:])
+
+    def test_durability_sets_synchronous(self):
+        store = SqliteStore(self.path, durability='commit')
+        store.append_many(self.readings[:2])
+        self.assertEqual(store._query('PRAGMA synchronous').fetchone()[0], 2)
+        self.assertEqual(store._query('PRAGMA journal_mode').fetchone()[0], 'wal')
+        store.sync()
+        with self.assertRaises(ValueError):
+            SqliteStore(self.path, durability='sometimes')
+
+    def test_aggregates_match_python(self):
+        """Pushed-down aggregates and deviations equal the pure-Python statistics."""
+        store = SqliteStore(self.path)
+        store.append_many(self.readings)
+        start, end = self.readings[5]['timestamp'], self.readings[55]['timestamp']
+        for machine_id in (None, 'machine-0'):
+            selected = [r for r in self.readings[5:55] if machine_id is None or r.get('machine_id') == machine_id]
+            aggregates = store.aggregate(start, end, machine_id)
+            self.assertEqual(aggregates['count'], len(selected))
+            self.assertEqual((aggregates['first'], aggregates['last']),
+                             (selected[0]['timestamp'], selected[-1]['timestamp']))
+
+            expected = analyze_values([r['temperature'] for r in selected])
+            self.assertEqual(aggregates['temperature']['min'], expected['min'])
+            self.assertEqual(aggregates['temperature']['max'], expected['max'])
+            average = aggregates['temperature']['sum'] / aggregates['count']
+            self.assertEqual(
+                store.find_deviations('temperature', average, 0.2, start, end, machine_id),
+                [(anomaly['index'], anomaly['value']) for anomaly in expected['anomalies']]
+            )
+        self.assertIsNone(store.aggregate(start=self.readings[-1]['timestamp'], end=self.readings[-1]['timestamp']))
+        with self.assertRaises(ValueError):
+            store.aggregate(fields=('status; DROP TABLE readings',))
+
+    def test_integer_readings_match_analyze_values(self):
+        """Integer readings keep their type, so analyze_sqlite equals analyze_values exactly."""
+        readings = [dict(make_reading(i), temperature=20 + i % 9 + (30 if i % 13 == 0 else 0), speed=40 + i % 7)
+                    for i in range(60)]
+        store = SqliteStore(self.path)
+        store.append_many(readings)
+        analysis = analyze_sqlite(store)
+        for field in ('temperature', 'speed'):
+            expected = analyze_values([r[field] for r in readings])
+            self.assertEqual(analysis[field], expected)
+            self.assertIsInstance(analysis[field]['max'], int)
+            for anomaly in analysis[field]['anomalies']:
+                self.assertIsInstance(anomaly['value'], int)
+        self.assertTrue(all(isinstance(r['temperature'], int) for r in store.read_all()))
+
+    def test_convert(self):
+        log = SegmentedLog(os.path.join(self.test_dir, 'machine_data'))
+        log.append_many(self.readings)
+        self.assertEqual(convert_to_sqlite(os.path.join(self.test_dir, 'machine_data.json'), self.path, 7), 60)
+        self.assertEqual(SqliteStore(self.path).read_all(), self.readings)
+        with self.assertRaises(FileExistsError):
+            convert_to_sqlite(os.path.join(self.test_dir, 'machine_data.json'), self.path)
+
+
+class TestSqliteBackend(unittest.TestCase):
+    def setUp(self):
+        """Switch the data files to SQLite as a deployment would."""
+        self.filename = 'sqlite_backend_test.json'
+        self.database = data_file_path('sqlite_backend_test.sqlite')
+        self.addCleanup(self.clean)
+        self.clean()
+        patcher = patch.dict(os.environ, {BACKEND_ENV: 'sqlite'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def clean(self):
+        sqlite_store._stores.pop(self.database, None)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.database + suffix):
+                os.remove(self.database + suffix)
+        filepath = data_file_path(self.filename)
+        for suffix in ('.rollups', '.status', '.anomalies'):
+            shutil.rmtree(filepath + suffix, ignore_errors=True)
+
+    def test_backend_is_chosen_by_environment(self):
+        store = open_writer(data_file_path(self.filename), max_records=100, durability='interval')
+        self.assertIsInstance(store, SqliteStore)
+        self.assertEqual(store.path, self.database)
+        self.assertEqual((store.max_records, store.durability), (100, 'interval'))
+        # Readers get the same store without resetting the writer's settings
+        self.assertIs(open_store(data_file_path(self.filename)), store)
+        self.assertEqual(store.max_records, 100)
+        self.assertIsInstance(open_store(data_file_path('other.sqlite')), SqliteStore)
+        with patch.dict(os.environ, {BACKEND_ENV: 'log'}):
+            self.assertIsInstance(open_store(data_file_path(self.filename)), SegmentedLog)
+
+    def test_generator_processor_and_analytics(self):
+        """The whole pipeline runs on SQLite, with analyze_data answered by aggregate queries."""
+        self.assertEqual(analyze_data(self.filename), {})
+        with patch('builtins.print'):
+            for _ in range(6):
+                save_data_to_json(self.filename)
+        store = open_store(data_file_path(self.filename))
+        self.assertEqual(len(store.read_all()), 6)
+        processed = process_machine_data(self.filename, window_size=5)
+        self.assertEqual(processed['timestamp'], store.tail(1)[0]['timestamp'])
+
+        readings = store.read_all()
+        analysis = analyze_data(self.filename)
+        expected = analyze_values([r['temperature'] for r in readings])
+        self.assertEqual(analysis['temperature'], expected)
+        self.assertEqual(analysis['period'], {'start': readings[0]['timestamp'], 'end': readings[-1]['timestamp']})
+        with patch.object(SqliteStore, 'iter_records', side_effect=AssertionError("rows were loaded")), \
+                patch.object(SqliteStore, 'iter_range', side_effect=AssertionError("rows were loaded")):
+            self.assertEqual(analyze_data(self.filename, start=readings[1]['timestamp'])['speed']['total_readings'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from unittest.mock import patch
+
+from data_process.status_store import MemoryStatusStore, SqliteStatusStore, open_status_store
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+
+from app import app
+from controllers import status_controller
+
+
+def update_many(path, worker, count):
+    store = SqliteStatusStore(path)
+    for i in range(count):
+        store.set(f'machine-{worker}-{i}', 'STARTED')
+
+
+class StatusStoreContract:
+    """Behavior shared by every status store backend."""
+
+    def test_set_and_get(self):
+        entry = self.store.set('machine-1', 'STARTED', '2024-01-01T00:00:00')
+        self.assertEqual(entry, {'machine_id': 'machine-1', 'current_status': 'STARTED',
+                                 'last_updated': '2024-01-01T00:00:00'})
+        self.assertEqual(self.store.get('machine-1'), entry)
+        self.assertIsNone(self.store.get('machine-2'))
+
+        self.store.set('machine-1', 'COMPLETED')
+        self.assertEqual(self.store.get('machine-1')['current_status'], 'COMPLETED')
+
+    def test_get_many(self):
+        for i in range(1200):
+            self.store.set(f'machine-{i}', 'IDLE')
+        self.assertEqual(len(self.store.get_many()), 1200)
+        wanted = [f'machine-{i}' for i in range(0, 1200, 2)] + ['unknown']
+        self.assertEqual(sorted(self.store.get_many(wanted)), sorted(wanted[:-1]))
+
+    def test_concurrent_updates(self):
+        def worker(n):
+            for i in range(50):
+                self.store.set(f'machine-{n}-{i}', 'IN_PROGRESS')
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.store.get_many()), 200)
+
+
+class TestMemoryStatusStore(StatusStoreContract, unittest.TestCase):
+    def setUp(self):
+        self.store = open_status_store()
+        self.assertIsInstance(self.store, MemoryStatusStore)
+
+
+class TestSqliteStatusStore(StatusStoreContract, unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'status', 'machine_status.db')
+        self.store = open_status_store(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_persists_and_is_shared(self):
+        """Entries survive reopening and are visible to other processes."""
+        self.store.set('machine-1', 'PAUSED')
+        self.assertEqual(SqliteStatusStore(self.path).get('machine-1')['current_status'], 'PAUSED')
+
+        processes = [multiprocessing.Process(target=update_many, args=(self.path, n, 25)) for n in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(len(self.store.get_many()), 76)
+
+
+class TestStatusEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.store_patch = patch.object(status_controller, '_status_store', MemoryStatusStore())
+        self.store_patch.start()
+
+    def tearDown(self):
+        self.store_patch.stop()
+
+    def test_update_and_read_many(self):
+        response = self.client.post('/api/status', json={'status': 'started', 'machine_id': 'machine-1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['current_status']['current_status'], 'STARTED')
+        self.client.post('/api/status', json={'status': 'paused', 'machine_id': 'machine-2'})
+        self.client.post('/api/status', json={'status': 'completed'})
+
+        machines = self.client.get('/api/status').get_json()['machines']
+        self.assertEqual(sorted(machines), ['default', 'machine-1', 'machine-2'])
+        machines = self.client.get('/api/status?machine_id=machine-1,machine-2&machine_id=nope').get_json()['machines']
+        self.assertEqual({k: v['current_status'] for k, v in machines.items()},
+                         {'machine-1': 'STARTED', 'machine-2': 'PAUSED'})
+
+    def test_validation(self):
+        self.assertEqual(self.client.post('/api/status', json={}).status_code, 400)
+        self.assertEqual(self.client.post('/api/status', json={'status': 'BROKEN'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/status', json={'status': 'IDLE', 'machine_id': 5}).status_code, 400)
+
+    def test_utilization(self):
+        self.client.post('/api/status', json={'status': 'started', 'machine_id': 'machine-1'})
+        self.client.post('/api/status', json={'status': 'completed', 'machine_id': 'machine-1'})
+
+        response = self.client.get('/api/status/utilization?from=2000-01-01T00:00:00')
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(report['machines'], 1)
+        self.assertEqual(report['transitions'], {'STARTED->COMPLETED': 1})
+        self.assertEqual(report['jobs']['completed'], 1)
+        self.assertEqual(self.client.get('/api/status/utilization').status_code, 400)
+        self.assertEqual(self.client.get('/api/status/utilization?from=yesterday').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
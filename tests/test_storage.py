@@ -0,0 +1,199 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+from data_process import storage
+from data_process.storage import JsonFileStore, SegmentedLog, open_store
+
+
+def make_reading(i):
+    return {'timestamp': f'2023-01-01T00:00:{i % 60:02d}', 'temperature': 20.0 + i, 'speed': 50.0, 'status': 'IDLE'}
+
+
+class TestSegmentedLog(unittest.TestCase):
+    def setUp(self):
+        """Create a temporary log directory."""
+        self.test_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.test_dir, 'machine_data')
+
+    def tearDown(self):
+        """Remove the temporary log directory."""
+        shutil.rmtree(self.test_dir)
+
+    def test_append_and_read_in_order(self):
+        """Readings come back oldest first across segment rollovers."""
+        log = SegmentedLog(self.log_dir, segment_max_records=4)
+        readings = [make_reading(i) for i in range(10)]
+        for reading in readings[:3]:
+            log.append(reading)
+        log.append_many(readings[3:])
+
+        self.assertEqual(log.read_all(), readings)
+        self.assertEqual(log.segment_starts(), [0, 4, 8])
+
+    def test_retention_keeps_recent_records(self):
+        """Whole segments older than max_records are dropped."""
+        log = SegmentedLog(self.log_dir, segment_max_records=5, max_records=5)
+        readings = [make_reading(i) for i in range(12)]
+        log.append_many(readings)
+
+        saved = log.read_all()
+        self.assertGreaterEqual(len(saved), 5)
+        self.assertLess(len(saved), 10)
+        self.assertEqual(saved, readings[-len(saved):])
+
+    def test_time_based_rollover(self):
+        """A segment_max_age of zero rolls over on every append."""
+        log = SegmentedLog(self.log_dir, segment_max_age=0)
+        for i in range(3):
+            log.append(make_reading(i))
+
+        self.assertEqual(len(log.segment_starts()), 3)
+
+    def test_reopen_continues_sequence(self):
+        """A new writer picks up where the previous one stopped."""
+        SegmentedLog(self.log_dir, segment_max_records=3).append_many([make_reading(i) for i in range(4)])
+        log = SegmentedLog(self.log_dir, segment_max_records=3)
+        log.append(make_reading(4))
+
+        self.assertEqual(log.segment_starts(), [0, 3])
+        self.assertEqual([r['temperature'] for r in log.read_all()], [20.0, 21.0, 22.0, 23.0, 24.0])
+
+    def test_tail_reads_last_records_across_segments(self):
+        """tail returns the newest readings oldest first, spanning segments."""
+        log = SegmentedLog(self.log_dir, segment_max_records=3)
+        readings = [make_reading(i) for i in range(8)]
+        log.append_many(readings)
+
+        self.assertEqual(log.tail(5), readings[-5:])
+        self.assertEqual(log.tail(100), readings)
+        self.assertEqual(log.tail(0), [])
+
+    def test_tail_skips_torn_record(self):
+        """A half-written final line is ignored and an older record takes its place."""
+        log = SegmentedLog(self.log_dir)
+        readings = [make_reading(i) for i in range(4)]
+        log.append_many(readings)
+        with open(log.segment_path(0), 'a') as f:
+            f.write('{"timestamp": "2023-')
+
+        self.assertEqual(log.tail(2), readings[-2:])
+
+    def test_tail_small_blocks(self):
+        """Lines spanning block boundaries are reassembled correctly."""
+        from data_process import storage
+        log = SegmentedLog(self.log_dir)
+        readings = [make_reading(i) for i in range(20)]
+        log.append_many(readings)
+
+        lines = list(storage._iter_lines_reversed(log.segment_path(0), block_size=7))
+        decoded = [storage._decode_line(line) for line in lines]
+        self.assertEqual([r for r in decoded if r is not None], readings[::-1])
+
+    def test_missing_log_raises(self):
+        """Reading a log that was never written raises FileNotFoundError."""
+        with self.assertRaises(FileNotFoundError):
+            SegmentedLog(self.log_dir).read_all()
+
+    def test_open_store_prefers_log_over_legacy_file(self):
+        """open_store reads legacy JSON only until a log exists."""
+        legacy_path = self.log_dir + '.json'
+        with open(legacy_path, 'w') as f:
+            f.write('[]')
+        self.assertIsInstance(open_store(legacy_path), JsonFileStore)
+
+        SegmentedLog(self.log_dir).append(make_reading(0))
+        self.assertIsInstance(open_store(legacy_path), SegmentedLog)
+
+    def test_unfinished_line_is_invisible(self):
+        """A record being written is skipped by every read until its newline is on disk."""
+        log = SegmentedLog(self.log_dir)
+        log.append_many([make_reading(i) for i in range(3)])
+        line = storage._encode_record(make_reading(3))
+        with open(log.segment_path(0), 'ab') as f:
+            f.write(line[:-1])
+
+        for read in (log.read_all, lambda: log.tail(10), lambda: log.read_range(start=make_reading(1)['timestamp'])):
+            self.assertNotIn(make_reading(3), read())
+        self.assertEqual(log.tail(1), [make_reading(2)])
+
+        with open(log.segment_path(0), 'ab') as f:
+            f.write(line[-1:])
+        self.assertEqual(log.tail(1), [make_reading(3)])
+        self.assertEqual(len(log.read_all()), 4)
+
+    def test_readers_see_whole_records_during_appends(self):
+        """Concurrent readers only ever see complete records, in order, and never an empty log."""
+        log = SegmentedLog(self.log_dir, segment_max_records=50)
+        log.append_many([{'seq': 0}])
+        done = threading.Event()
+        failures = []
+
+        def write():
+            for first in range(1, 2000, 20):
+                log.append_many([{'seq': i, 'pad': 'x' * 200} for i in range(first, first + 20)])
+            done.set()
+
+        def read():
+            while not done.is_set():
+                records = SegmentedLog(self.log_dir).read_all()
+                tail = SegmentedLog(self.log_dir).tail(5)
+                if [r['seq'] for r in records] != list(range(len(records))) or not tail:
+                    failures.append((len(records), tail))
+
+        writer = threading.Thread(target=write)
+        readers = [threading.Thread(target=read) for _ in range(2)]
+        for thread in readers + [writer]:
+            thread.start()
+        for thread in readers + [writer]:
+            thread.join()
+        self.assertEqual(failures, [])
+
+    def test_legacy_import_is_atomic(self):
+        """The legacy file is imported into a temporary folder that replaces the log folder in one step."""
+        legacy_path = self.log_dir + '.json'
+        with open(legacy_path, 'w') as f:
+            json.dump([make_reading(i) for i in range(3)], f)
+        with patch.object(storage.os, 'replace', wraps=os.replace) as replace:
+            log = storage.open_log(legacy_path)
+        self.addCleanup(storage._logs.pop, self.log_dir, None)
+        replace.assert_called_once_with(self.log_dir + '.tmp', self.log_dir)
+        self.assertEqual(len(log.read_all()), 3)
+        self.assertFalse(os.path.exists(self.log_dir + '.tmp'))
+
+    def count_fsyncs(self, log, batches):
+        with patch.object(storage.os, 'fsync', wraps=os.fsync) as fsync:
+            for batch in batches:
+                log.append_many(batch)
+            return fsync.call_count
+
+    def test_durability_modes(self):
+        """Commits are fsynced always, on an interval or never, depending on the mode."""
+        batches = [[make_reading(i), make_reading(i + 1)] for i in range(0, 10, 2)]
+        self.assertEqual(self.count_fsyncs(SegmentedLog(self.log_dir + '_none'), batches), 0)
+        # One per commit, plus the directory when the first segment is created
+        self.assertEqual(self.count_fsyncs(SegmentedLog(self.log_dir + '_commit', durability='commit'), batches), 6)
+
+        log = SegmentedLog(self.log_dir + '_interval', durability='interval', fsync_interval=3600)
+        self.assertEqual(self.count_fsyncs(log, batches), 0)
+        with patch.object(storage.os, 'fsync', wraps=os.fsync) as fsync:
+            log.sync()
+            log.sync()
+        self.assertEqual(fsync.call_count, 1)
+        self.assertEqual(len(log.read_all()), 10)
+
+        with self.assertRaises(ValueError):
+            SegmentedLog(self.log_dir, durability='sometimes')
+
+    def test_interval_durability_syncs_closed_segments(self):
+        """A segment that rolls over is fsynced before writes move to the next one."""
+        log = SegmentedLog(self.log_dir, segment_max_records=3, durability='interval', fsync_interval=3600)
+        self.assertEqual(self.count_fsyncs(log, [[make_reading(i) for i in range(7)]]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import json
+import os
+import random
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from analytics import streaming
+from analytics.streaming import RunningStats, analyze_data_streaming, iter_chunks
+from data_process.storage import SegmentedLog
+
+
+def make_readings(count, seed=0):
+    rng = random.Random(seed)
+    readings = []
+    for i in range(count):
+        readings.append({
+            'timestamp': f'2023-01-01T00:00:{i % 60:02d}',
+            'temperature': round(rng.uniform(20.0, 30.0), 2),
+            'speed': round(rng.uniform(40.0, 60.0), 2),
+            'status': 'RUNNING',
+            'machine_id': f'machine-{i % 3}'
+        })
+    readings[7]['temperature'] = 80.0
+    readings[11]['speed'] = 5.0
+    return readings
+
+
+class TestRunningStats(unittest.TestCase):
+    def test_matches_builtins(self):
+        """Single-pass statistics match sum/min/max over the same values."""
+        values = [round(random.Random(1).uniform(-5, 5), 3) for _ in range(1000)]
+        stats = RunningStats()
+        stats.update(values[:400])
+        stats.update(values[400:])
+
+        self.assertEqual(stats.count, len(values))
+        self.assertEqual(stats.mean, sum(values) / len(values))
+        self.assertEqual(stats.minimum, min(values))
+        self.assertEqual(stats.maximum, max(values))
+
+    def test_merge(self):
+        """Merged partial statistics equal statistics over the whole stream."""
+        values = [float(i % 17) for i in range(100)]
+        left, right, whole = RunningStats(), RunningStats(), RunningStats()
+        left.update(values[:30])
+        right.update(values[30:])
+        whole.update(values)
+        left.merge(right)
+
+        self.assertEqual((left.count, left.minimum, left.maximum), (whole.count, whole.minimum, whole.maximum))
+        self.assertAlmostEqual(left.mean, whole.mean)
+        self.assertAlmostEqual(left.variance, whole.variance)
+        self.assertEqual(RunningStats().merge(whole).maximum, whole.maximum)
+
+
+class TestStreamingAnalytics(unittest.TestCase):
+    def setUp(self):
+        """Point the data folder at a temporary directory."""
+        self.test_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.test_dir, 'data')
+        import data_process.storage as storage
+        self.storage = storage
+        self.original_dirname = storage.os.path.dirname
+        storage.os.path.dirname = lambda x: self.test_dir
+
+    def tearDown(self):
+        """Restore the data folder and remove the temporary directory."""
+        self.storage.os.path.dirname = self.original_dirname
+        shutil.rmtree(self.test_dir)
+
+    def test_matches_analyze_data(self):
+        """Chunked analysis returns exactly what analyze_data returns."""
+        from analytics.data_analytics import analyze_data
+        SegmentedLog(os.path.join(self.data_dir, 'machine_data'), segment_max_records=40).append_many(make_readings(250))
+
+        expected = analyze_data('machine_data.json')
+        self.assertEqual(analyze_data_streaming('machine_data.json', chunk_size=16), expected)
+        self.assertEqual(analyze_data('machine_data.json', streaming=True), expected)
+        self.assertEqual(
+            analyze_data_streaming('machine_data.json', machine_id='machine-1', chunk_size=7),
+            analyze_data('machine_data.json', machine_id='machine-1')
+        )
+
+    def test_passes_read_the_same_segments(self):
+        """Retention and appends between the passes do not shift anomaly indices."""
+        from analytics.data_analytics import analyze_data
+        log = SegmentedLog(os.path.join(self.data_dir, 'machine_data'), segment_max_records=40)
+        log.append_many(make_readings(250))
+        expected = analyze_data('machine_data.json')
+        first_pass_anomalies = streaming._anomalies_pass
+
+        def drop_oldest_segment(*args):
+            os.remove(log.segment_path(log.segment_starts()[0]))
+            log.append_many(make_readings(30, seed=1))
+            return first_pass_anomalies(*args)
+
+        with patch.object(streaming, '_anomalies_pass', side_effect=drop_oldest_segment):
+            analysis = analyze_data_streaming('machine_data.json', chunk_size=16)
+        for field in ('temperature', 'speed'):
+            self.assertEqual(analysis[field]['total_readings'], expected[field]['total_readings'])
+            kept = [anomaly for anomaly in expected[field]['anomalies'] if anomaly['index'] >= 40]
+            self.assertEqual(analysis[field]['anomalies'], kept)
+
+    def test_legacy_file_and_errors(self):
+        """Legacy files are supported and missing or empty data behave like analyze_data."""
+        os.makedirs(self.data_dir)
+        with open(os.path.join(self.data_dir, 'legacy.json'), 'w') as f:
+            json.dump(make_readings(20), f)
+        with open(os.path.join(self.data_dir, 'empty.json'), 'w') as f:
+            json.dump([], f)
+
+        self.assertEqual(analyze_data_streaming('legacy.json')['temperature']['total_readings'], 20)
+        self.assertEqual(analyze_data_streaming('missing.json'), {})
+        with self.assertRaises(ValueError):
+            analyze_data_streaming('empty.json')
+
+    def test_iter_chunks_sizes(self):
+        """Chunks never exceed chunk_size and cover every reading in order."""
+        log = SegmentedLog(os.path.join(self.data_dir, 'machine_data'))
+        readings = make_readings(25)
+        log.append_many(readings)
+
+        chunks = list(iter_chunks(log, chunk_size=10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertEqual([r for chunk in chunks for r in chunk], readings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from analytics.data_analytics import analyze_data
+from analytics.streaming import analyze_data_streaming
+from data_process.columnar_store import ColumnarStore
+from data_process.data_processor import process_machine_data
+from data_process.storage import JsonFileStore, SegmentedLog
+
+START = datetime(2023, 1, 1)
+
+
+def timestamp(seconds):
+    return (START + timedelta(seconds=seconds)).isoformat()
+
+
+def make_readings(count, step=1):
+    return [
+        {
+            'timestamp': timestamp(i * step),
+            'temperature': 20.0 + (i % 10) * 0.5,
+            'speed': 40.0 + (i % 7),
+            'status': 'RUNNING',
+            'machine_id': f'machine-{i % 2}'
+        }
+        for i in range(count)
+    ]
+
+
+def in_range(readings, start=None, end=None, machine_id=None):
+    return [
+        r for r in readings
+        if (start is None or r['timestamp'] >= start) and (end is None or r['timestamp'] < end)
+        and (machine_id is None or r['machine_id'] == machine_id)
+    ]
+
+
+class TestTimeRangeReads(unittest.TestCase):
+    def setUp(self):
+        """Create a temporary data directory."""
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary data directory."""
+        shutil.rmtree(self.test_dir)
+
+    def assert_ranges_match(self, store, readings):
+        bounds = [None, timestamp(-5), timestamp(0), timestamp(7), timestamp(15.5), timestamp(40),
+                  timestamp(99), timestamp(100), timestamp(500)]
+        for start in bounds:
+            for end in bounds:
+                self.assertEqual(store.read_range(start, end), in_range(readings, start, end), (start, end))
+        self.assertEqual(
+            store.read_range(timestamp(10), timestamp(30), 'machine-1'),
+            in_range(readings, timestamp(10), timestamp(30), 'machine-1')
+        )
+
+    def test_segmented_log_range(self):
+        """Binary search over segments returns exactly the readings in [start, end)."""
+        readings = make_readings(100)
+        for segment_max_records in (1, 7, 1000):
+            log = SegmentedLog(os.path.join(self.test_dir, f'log-{segment_max_records}'),
+                               segment_max_records=segment_max_records)
+            log.append_many(readings)
+            self.assert_ranges_match(log, readings)
+
+    def test_segmented_log_range_with_duplicates_and_torn_lines(self):
+        """Equal timestamps and undecodable lines do not confuse the search."""
+        log_dir = os.path.join(self.test_dir, 'machine_data')
+        readings = make_readings(30)
+        for reading in readings[10:20]:
+            reading['timestamp'] = timestamp(10)
+        log = SegmentedLog(log_dir)
+        log.append_many(readings[:15])
+        with open(log.segment_path(0), 'a') as f:
+            f.write('{"timestamp": "2023-01-01T00:00:1\n')
+        log.append_many(readings[15:])
+        reopened = SegmentedLog(log_dir)
+
+        self.assertEqual(reopened.read_range(timestamp(10), timestamp(11)), readings[10:20])
+        self.assertEqual(reopened.read_range(timestamp(10.5)), readings[20:])
+
+    def test_missing_log_raises(self):
+        """Reading a range of a missing log raises FileNotFoundError."""
+        with self.assertRaises(FileNotFoundError):
+            SegmentedLog(os.path.join(self.test_dir, 'missing')).read_range(timestamp(0))
+
+    def test_legacy_json_range(self):
+        """Legacy JSON files are filtered with the default scan."""
+        path = os.path.join(self.test_dir, 'legacy.json')
+        readings = make_readings(100)
+        with open(path, 'w') as f:
+            json.dump(readings, f)
+        self.assert_ranges_match(JsonFileStore(path), readings)
+
+    def test_columnar_range(self):
+        """Columnar stores find the range with searchsorted on the timestamps."""
+        store = ColumnarStore(os.path.join(self.test_dir, 'machine_data.columns'))
+        readings = make_readings(100)
+        store.append_many(readings)
+        self.assert_ranges_match(store, readings)
+        self.assertEqual(store.row_range(timestamp(10), timestamp(5)), (10, 10))
+
+
+class TestTimeRangeAnalytics(unittest.TestCase):
+    def setUp(self):
+        """Point the data folder at a temporary directory."""
+        self.test_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.test_dir, 'data')
+        import data_process.storage as storage
+        self.storage = storage
+        self.original_dirname = storage.os.path.dirname
+        storage.os.path.dirname = lambda x: self.test_dir
+
+        self.readings = make_readings(200, step=30)
+        SegmentedLog(os.path.join(self.data_dir, 'machine_data'), segment_max_records=16).append_many(self.readings)
+        ColumnarStore(os.path.join(self.data_dir, 'machine_data.columns')).append_many(self.readings)
+
+    def tearDown(self):
+        """Restore the data folder and remove the temporary directory."""
+        self.storage.os.path.dirname = self.original_dirname
+        shutil.rmtree(self.test_dir)
+
+    def test_analyze_data_range(self):
+        """Range analysis equals analyzing only the readings in the range."""
+        start, end = timestamp(3600), timestamp(5400)
+        subset = in_range(self.readings, start, end)
+        with open(os.path.join(self.data_dir, 'subset.json'), 'w') as f:
+            json.dump(subset, f)
+        expected = analyze_data('subset.json')
+
+        result = analyze_data('machine_data.json', start=start, end=end)
+        self.assertEqual(result, expected)
+        self.assertEqual(result['period'], {'start': start, 'end': subset[-1]['timestamp']})
+        self.assertEqual(result['temperature']['total_readings'], 60)
+        self.assertEqual(analyze_data_streaming('machine_data.json', start=start, end=end, chunk_size=7), expected)
+        self.assertEqual(analyze_data('machine_data.columns', start=start, end=end), expected)
+
+    def test_analyze_data_empty_range(self):
+        """A range without readings is an empty dataset."""
+        with self.assertRaises(ValueError):
+            analyze_data('machine_data.json', start=timestamp(100000))
+
+    def test_process_machine_data_range(self):
+        """The moving average covers the last readings before the end of the range."""
+        end = timestamp(600)
+        window = in_range(self.readings, end=end, machine_id='machine-1')[-5:]
+        processed = process_machine_data('machine_data.json', window_size=5, machine_id='machine-1', end=end)
+
+        self.assertEqual(processed['timestamp'], window[-1]['timestamp'])
+        self.assertEqual(processed['speed']['moving_average'], round(sum(r['speed'] for r in window) / 5, 2))
+        self.assertEqual(process_machine_data('machine_data.json', window_size=5, machine_id='machine-1',
+                                              start=timestamp(5900)), {})
+        # Readings of both machines are not averaged together
+        with patch('builtins.print'):
+            self.assertEqual(process_machine_data('machine_data.json', window_size=5, end=end), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
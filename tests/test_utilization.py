@@ -0,0 +1,251 @@
+import unittest
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from analytics.utilization import job_utilization, machine_utilization, utilization
+from data_process import status_events
+from data_process.data_generator import save_data_to_json
+from data_process.status_events import StatusEvents, get_status_events, status_events_directory
+from data_process.status_store import MemoryStatusStore, SqliteStatusStore
+from data_process.storage import SegmentedLog, data_file_path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'flask_api'))
+
+from app import app
+from controllers import data_controller
+
+START = datetime(2023, 1, 1)
+
+
+def timestamp(seconds):
+    return (START + timedelta(seconds=seconds)).isoformat()
+
+
+def make_readings(count, machines=3, seed=7):
+    rng = random.Random(seed)
+    statuses = {}
+    readings = []
+    for i in range(count):
+        machine_id = f'machine-{rng.randrange(machines)}'
+        if machine_id not in statuses or rng.random() < 0.2:
+            statuses[machine_id] = rng.choice(['IDLE', 'RUNNING', 'PAUSED'])
+        readings.append({
+            'timestamp': timestamp(i * 10),
+            'temperature': 25.0,
+            'speed': 50.0,
+            'status': statuses[machine_id],
+            'machine_id': machine_id
+        })
+    return readings
+
+
+def expected_utilization(readings, start, end, machine_id=None):
+    """Time in state, transitions and RUNNING job durations computed from every reading."""
+    start_at, end_at = datetime.fromisoformat(start), datetime.fromisoformat(end)
+    runs = {}
+    for reading in readings:
+        if machine_id is not None and reading['machine_id'] != machine_id:
+            continue
+        machine_runs = runs.setdefault(reading['machine_id'], [])
+        at = datetime.fromisoformat(reading['timestamp'])
+        if not machine_runs or machine_runs[-1][0] != reading['status']:
+            machine_runs.append([reading['status'], at])
+
+    seconds, transitions, jobs = {}, {}, []
+    for machine_runs in runs.values():
+        for i, (status, entered) in enumerate(machine_runs):
+            left = machine_runs[i + 1][1] if i + 1 < len(machine_runs) else end_at
+            overlap = (min(left, end_at) - max(entered, start_at)).total_seconds()
+            if overlap > 0:
+                seconds[status] = seconds.get(status, 0) + overlap
+            if i + 1 < len(machine_runs) and start_at <= left < end_at:
+                transition = f'{status}->{machine_runs[i + 1][0]}'
+                transitions[transition] = transitions.get(transition, 0) + 1
+                if status == 'RUNNING':
+                    jobs.append((left - entered).total_seconds())
+    return seconds, transitions, jobs
+
+
+class CountingLog(SegmentedLog):
+    """Segmented log that counts the records handed out by range reads."""
+
+    read = 0
+
+    def iter_range(self, start=None, end=None, machine_id=None):
+        for record in super().iter_range(start, end, machine_id):
+            self.read += 1
+            yield record
+
+
+class TestStatusEvents(unittest.TestCase):
+    def setUp(self):
+        """Create a raw log and its status events in a temporary directory."""
+        self.test_dir = tempfile.mkdtemp()
+        self.raw = SegmentedLog(os.path.join(self.test_dir, 'machine_data'))
+        self.events = StatusEvents(os.path.join(self.test_dir, 'machine_data.status'))
+        self.readings = make_readings(3000)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.test_dir)
+
+    def ingest(self, readings, events=None):
+        self.raw.append_many(readings)
+        (events or self.events).update_many(readings)
+
+    def test_only_changes_are_recorded(self):
+        """One event per run, each describing the run it ends."""
+        self.ingest(self.readings)
+        events = list(self.events.iter_events())
+        _, transitions, _ = expected_utilization(self.readings, timestamp(0), timestamp(10 ** 6))
+        self.assertEqual(len(events), sum(transitions.values()) + 3)
+        self.assertLess(len(events), len(self.readings) / 5)
+
+        second = [event for event in events if event['machine_id'] == 'machine-0'][1]
+        self.assertNotEqual(second['previous'], second['status'])
+        self.assertEqual(self.events.current()['machine-0']['status'],
+                         [r for r in self.readings if r['machine_id'] == 'machine-0'][-1]['status'])
+
+    def test_utilization_matches_readings(self):
+        """Time in state, transitions and job durations match a scan of every reading."""
+        self.ingest(self.readings)
+        ranges = [(0, 30000), (1234, 5678), (29000, 29500), (15000, 15001), (100, 40000)]
+        for first, last in ranges:
+            for machine_id in (None, 'machine-2'):
+                start, end = timestamp(first), timestamp(last)
+                seconds, transitions, jobs = expected_utilization(self.readings, start, end, machine_id)
+                report = utilization(self.events, start, end, machine_id)
+                self.assertEqual(report['time_in_state'], {s: round(v, 2) for s, v in sorted(seconds.items())})
+                self.assertEqual(report['transitions'], dict(sorted(transitions.items())))
+                self.assertEqual(report['jobs']['completed'], len(jobs))
+                if jobs:
+                    self.assertEqual(report['jobs']['mean_duration'], round(sum(jobs) / len(jobs), 2))
+                self.assertAlmostEqual(sum(report['utilization'].values()), 1, places=3)
+
+    def test_range_reads_only_its_events(self):
+        """A short range reads its own events, not the whole log or the raw readings."""
+        self.events.log = CountingLog(self.events.log.directory)
+        self.ingest(self.readings)
+        utilization(self.events, timestamp(20000), timestamp(20600))
+        self.assertLess(self.events.log.read, 30)
+
+    def test_restart_replays_only_new_readings(self):
+        """A restarted writer resumes from its checkpoint and rebuilds it when missing."""
+        self.ingest(self.readings[:1700])
+        restarted = StatusEvents(self.events.directory)
+        self.raw.append_many(self.readings[1700:2000])
+        restarted.catch_up(self.raw)
+        self.ingest(self.readings[2000:], restarted)
+        self.assertEqual(list(restarted.iter_events()), list(self.expected_events()))
+
+        os.remove(os.path.join(self.events.directory, 'state.json'))
+        rebuilt = StatusEvents(self.events.directory)
+        self.assertEqual(rebuilt.current(), restarted.current())
+
+        backfilled = StatusEvents(os.path.join(self.test_dir, 'backfilled.status'))
+        backfilled.catch_up(self.raw)
+        self.assertEqual(list(backfilled.iter_events()), list(restarted.iter_events()))
+
+    def test_checkpoint_only_when_something_changed(self):
+        """Catching up with nothing new, or replaying late readings, writes no checkpoint."""
+        checkpoint = os.path.join(self.events.directory, 'state.json')
+        self.events.catch_up(self.raw)
+        self.events.update_many([])
+        self.assertFalse(os.path.exists(self.events.directory))
+
+        self.ingest(self.readings[:10])
+        os.utime(checkpoint, ns=(0, 0))
+        restarted = StatusEvents(self.events.directory)
+        restarted.catch_up(self.raw)
+        restarted.update_many(self.readings[5:10])
+        self.assertEqual(os.stat(checkpoint).st_mtime_ns, 0)
+
+    def expected_events(self):
+        events = StatusEvents(os.path.join(self.test_dir, 'expected.status'))
+        events.update_many(self.readings)
+        return events.iter_events()
+
+
+class TestJobUtilization(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def check_store(self, store):
+        store.set('press-1', 'STARTED', timestamp(0))
+        store.set('press-1', 'IN_PROGRESS', timestamp(60))
+        store.set('press-1', 'IN_PROGRESS', timestamp(90))
+        store.set('press-1', 'COMPLETED', timestamp(600))
+        store.set('press-2', 'IDLE', timestamp(100))
+        store.set('press-2', 'STARTED', timestamp(1000))
+
+        self.assertEqual(len(list(store.iter_events())), 5)
+        self.assertEqual(store.current()['press-1'], {'status': 'COMPLETED', 'since': timestamp(600)})
+
+        report = job_utilization(store, timestamp(0), timestamp(1200))
+        self.assertEqual(report['time_in_state'],
+                         {'COMPLETED': 600.0, 'IDLE': 900.0, 'IN_PROGRESS': 540.0, 'STARTED': 260.0})
+        self.assertEqual(report['transition_count'], 3)
+        self.assertEqual(report['jobs'], {'completed': 1, 'mean_duration': 600.0})
+
+        report = job_utilization(store, timestamp(120), timestamp(300), machine_id='press-1')
+        self.assertEqual(report['time_in_state'], {'IN_PROGRESS': 180.0})
+        self.assertEqual(report['machines'], 1)
+
+    def test_memory_store(self):
+        self.check_store(MemoryStatusStore())
+
+    def test_sqlite_store(self):
+        self.check_store(SqliteStatusStore(os.path.join(self.test_dir, 'status.db')))
+
+
+class TestGeneratorStatusEvents(unittest.TestCase):
+    def setUp(self):
+        self.filename = 'utilization_test_machine_data.json'
+        self.clean()
+
+    def tearDown(self):
+        self.clean()
+
+    def clean(self):
+        filepath = data_file_path(self.filename)
+        shutil.rmtree(os.path.splitext(filepath)[0], ignore_errors=True)
+        shutil.rmtree(filepath + '.rollups', ignore_errors=True)
+        shutil.rmtree(status_events_directory(filepath), ignore_errors=True)
+        shutil.rmtree(filepath + '.anomalies', ignore_errors=True)
+        # The writer of the previous test still holds the statuses it saw
+        status_events._status_events.pop(filepath, None)
+
+    def test_generator_feeds_status_events(self):
+        """Saved readings are recorded in the status events of their data file."""
+        readings = [save_data_to_json(self.filename) for _ in range(5)]
+        events = get_status_events(data_file_path(self.filename))
+        self.assertEqual(events.current()['']['status'], readings[-1]['status'])
+
+        report = machine_utilization(self.filename, end=readings[-1]['timestamp'])
+        self.assertEqual(report['period']['start'], readings[0]['timestamp'])
+        self.assertEqual(report['machines'], 1)
+
+    def test_endpoint_status_codes(self):
+        """The API answers 404 before any status is recorded and 400 for an invalid range."""
+        def utilization_of_test_file(filename, *args, **kwargs):
+            return machine_utilization(self.filename, *args, **kwargs)
+
+        client = app.test_client()
+        with patch.object(data_controller, 'machine_utilization', utilization_of_test_file):
+            self.assertEqual(client.get('/api/data/utilization').status_code, 404)
+            readings = [save_data_to_json(self.filename) for _ in range(3)]
+            self.assertEqual(client.get(f"/api/data/utilization?to={readings[-1]['timestamp']}").status_code, 200)
+            self.assertEqual(client.get('/api/data/utilization?to=2000-01-01T00:00:00').status_code, 400)
+            self.assertEqual(client.get('/api/data/utilization?from=yesterday').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()